@@ -215,6 +215,50 @@ PARALLEL_EXECUTION = True
 # This option is ignored if PARALLEL_EXECUTION = False
 N_PROCESSES = cpu_count()
 
+# If True, topologies are built and their shortest paths computed once in the
+# main process before starting worker processes, which then share them instead
+# of computing them for each experiment.
+# This option is ignored if PARALLEL_EXECUTION = False
+SHARE_SCENARIO_ARTIFACTS = True
+
+# If True, experiments differing only in strategy, cache policy or network
+# model configuration are run together: their topology, cache and content
+# placement and workload are built once and the same requests are replayed to
+# all of them, which also reduces the variance of their comparison.
+# Results are then not comparable with those of runs without this option,
+# where each experiment draws its own requests.
+# Uncomment to enable
+#GROUP_SCENARIOS = True
+
+# Directory where topologies parsed from files (e.g. GEANT, TISCALI, GARR,
+# WIDE and ROCKET_FUEL) are cached after being built, so that later
+# experiments and simulation campaigns load them instead of parsing them again.
+# Cached topologies are rebuilt if the parsed files or the topology parameters
+# change. Relative paths are relative to the Icarus root directory, like the
+# paths below. Comment out to disable the cache
+TOPOLOGY_CACHE_DIR = 'resources/topologies/cache'
+
+# If True, shortest paths of cached topologies are cached as well
+TOPOLOGY_CACHE_PATHS = True
+
+# File where the durations of experiments are recorded, so that the duration
+# of experiments run later can be estimated. Estimates are used to run the
+# longest experiments first and to compute the ETA of the simulations.
+# Comment out to estimate durations from experiment parameters only
+EXPERIMENT_DURATIONS_FILE = 'resources/experiment-durations.json'
+
+# Directory where the results of each experiment are stored, so that
+# experiments with the same parameters run by later simulations, e.g. by
+# overlapping parameter sweeps, reuse them instead of being run again.
+# Stored results are not invalidated when the code of the simulator changes,
+# so the directory must be emptied after changing it.
+# Uncomment to enable the cache
+#RESULTS_CACHE_DIR = 'resources/results-cache'
+
+# Maximum size, in bytes, of the results stored in RESULTS_CACHE_DIR. The least
+# recently used results are removed beyond it. Comment out for no limit
+RESULTS_CACHE_MAX_SIZE = 2 * 1024**3
+
 # Granularity of caching.
 # Currently, only OBJECT is supported
 CACHING_GRANULARITY = 'OBJECT'
@@ -236,6 +280,7 @@ DATA_COLLECTORS = [
            'LATENCY',           # Measure request and response latency (based on static link delays)
            'LINK_LOAD',         # Measure link loads
            'PATH_STRETCH',      # Measure path stretch
+#          'REPLICA_LOOKUPS',   # Measure caches looked up per request by NRR
                    ]
 
 
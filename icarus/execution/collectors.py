@@ -8,13 +8,18 @@ latency, path stretch and link load.
 
 To create a new data collector, it is sufficient to create a new class
 inheriting from the `DataCollector` class and override all required methods.
+
+Requests and contents forwarded over a path are notified with a single
+`request_path` or `content_path` event. Collectors that only implement the
+per-hop `request_hop` and `content_hop` methods are notified of each hop of the
+path instead.
 """
 from __future__ import division
 import collections
 
 from icarus.registry import register_data_collector
 from icarus.tools import cdf
-from icarus.util import Tree, inheritdoc
+from icarus.util import Tree, inheritdoc, path_links
 
 
 __all__ = [
@@ -24,6 +29,8 @@ __all__ = [
     'LinkLoadCollector',
     'LatencyCollector',
     'PathStretchCollector',
+    'FrequencySketchCollector',
+    'ReplicaLookupCollector',
     'DummyCollector'
            ]
 
@@ -95,6 +102,17 @@ class DataCollector(object):
         """
         pass
 
+    def replica_lookups(self, n_lookups):
+        """Reports the number of caches looked up by the strategy to locate
+        the nearest replica of the requested content.
+
+        Parameters
+        ----------
+        n_lookups : int
+            The number of caches looked up
+        """
+        pass
+
     def request_hop(self, u, v, main_path=True):
         """Reports that a request has traversed the link *(u, v)*
 
@@ -128,6 +146,53 @@ class DataCollector(object):
         """
         pass
 
+    def request_path(self, path, main_path=True, shortest=False):
+        """Reports that a request has traversed all the links of a path
+
+        The default implementation reports each hop of the path to
+        `request_hop`.
+
+        Parameters
+        ----------
+        path : list
+            List of nodes traversed by the request (origin and destination
+            included)
+        main_path : bool, optional
+            If *True*, indicates that the path is on the main path that will
+            lead to hit a content. It is normally used to calculate latency
+            correctly in multicast cases. Default value is *True*
+        shortest : bool, optional
+            If *True*, indicates that the path is the shortest path between its
+            endpoints, so that its properties can be looked up rather than
+            computed from its links. Default value is *False*
+        """
+        for u, v in path_links(path):
+            self.request_hop(u, v, main_path)
+
+    def content_path(self, path, main_path=True, shortest=False):
+        """Reports that a content has traversed all the links of a path
+
+        The default implementation reports each hop of the path to
+        `content_hop`.
+
+        Parameters
+        ----------
+        path : list
+            List of nodes traversed by the content (origin and destination
+            included)
+        main_path : bool, optional
+            If *True*, indicates that this path is being traversed by content
+            that will be delivered to the receiver. This is needed to
+            calculate latency correctly in multicast cases. Default value is
+            *True*
+        shortest : bool, optional
+            If *True*, indicates that the path is the shortest path between its
+            endpoints, so that its properties can be looked up rather than
+            computed from its links. Default value is *False*
+        """
+        for u, v in path_links(path):
+            self.content_hop(u, v, main_path)
+
     def end_session(self, success=True):
         """Reports that the session is closed, i.e. the content has been
         successfully delivered to the receiver or a failure blocked the
@@ -161,10 +226,16 @@ class CollectorProxy(DataCollector):
     An instance of this class registers itself with the network controller and
     it receives notifications for all events. This class is responsible for
     dispatching events of interests to concrete collectors.
+
+    Path events are dispatched as such to collectors implementing them and
+    hop by hop to collectors implementing only per-hop events. Conversely,
+    single hops are dispatched as one-hop paths to collectors implementing
+    only path events.
     """
 
     EVENTS = ('start_session', 'end_session', 'cache_hit', 'cache_miss', 'server_hit',
-              'request_hop', 'content_hop', 'results')
+              'replica_lookups', 'request_hop', 'content_hop', 'request_path', 'content_path',
+              'results')
 
     def __init__(self, view, collectors):
         """Constructor
@@ -179,6 +250,14 @@ class CollectorProxy(DataCollector):
         self.view = view
         self.collectors = {e: [c for c in collectors if e in type(c).__dict__]
                            for e in self.EVENTS}
+        # Collectors only handling either per-hop or path events, to which the
+        # other type of event needs to be converted
+        for hop, path in (('request_hop', 'request_path'),
+                          ('content_hop', 'content_path')):
+            self.collectors[hop + '_only'] = [c for c in self.collectors[hop]
+                                              if c not in self.collectors[path]]
+            self.collectors[path + '_only'] = [c for c in self.collectors[path]
+                                               if c not in self.collectors[hop]]
 
     @inheritdoc(DataCollector)
     def start_session(self, timestamp, receiver, content):
@@ -200,15 +279,42 @@ class CollectorProxy(DataCollector):
         for c in self.collectors['server_hit']:
             c.server_hit(node)
 
+    @inheritdoc(DataCollector)
+    def replica_lookups(self, n_lookups):
+        for c in self.collectors['replica_lookups']:
+            c.replica_lookups(n_lookups)
+
     @inheritdoc(DataCollector)
     def request_hop(self, u, v, main_path=True):
         for c in self.collectors['request_hop']:
             c.request_hop(u, v, main_path)
+        for c in self.collectors['request_path_only']:
+            c.request_path((u, v), main_path)
 
     @inheritdoc(DataCollector)
     def content_hop(self, u, v, main_path=True):
         for c in self.collectors['content_hop']:
             c.content_hop(u, v, main_path)
+        for c in self.collectors['content_path_only']:
+            c.content_path((u, v), main_path)
+
+    @inheritdoc(DataCollector)
+    def request_path(self, path, main_path=True, shortest=False):
+        for c in self.collectors['request_path']:
+            c.request_path(path, main_path, shortest)
+        if self.collectors['request_hop_only']:
+            for u, v in path_links(path):
+                for c in self.collectors['request_hop_only']:
+                    c.request_hop(u, v, main_path)
+
+    @inheritdoc(DataCollector)
+    def content_path(self, path, main_path=True, shortest=False):
+        for c in self.collectors['content_path']:
+            c.content_path(path, main_path, shortest)
+        if self.collectors['content_hop_only']:
+            for u, v in path_links(path):
+                for c in self.collectors['content_hop_only']:
+                    c.content_hop(u, v, main_path)
 
     @inheritdoc(DataCollector)
     def end_session(self, success=True):
@@ -261,6 +367,18 @@ class LinkLoadCollector(DataCollector):
     def content_hop(self, u, v, main_path=True):
         self.cont_count[(u, v)] += 1
 
+    @inheritdoc(DataCollector)
+    def request_path(self, path, main_path=True, shortest=False):
+        req_count = self.req_count
+        for link in zip(path[:-1], path[1:]):
+            req_count[link] += 1
+
+    @inheritdoc(DataCollector)
+    def content_path(self, path, main_path=True, shortest=False):
+        cont_count = self.cont_count
+        for link in zip(path[:-1], path[1:]):
+            cont_count[link] += 1
+
     @inheritdoc(DataCollector)
     def results(self):
         duration = self.t_end - self.t_start
@@ -323,6 +441,39 @@ class LatencyCollector(DataCollector):
         if main_path:
             self.sess_latency += self.view.link_delay(u, v)
 
+    @inheritdoc(DataCollector)
+    def request_path(self, path, main_path=True, shortest=False):
+        if main_path:
+            self.sess_latency += self.path_delay(path, shortest)
+
+    @inheritdoc(DataCollector)
+    def content_path(self, path, main_path=True, shortest=False):
+        if main_path:
+            self.sess_latency += self.path_delay(path, shortest)
+
+    def path_delay(self, path, shortest=False):
+        """Return the delay of a path
+
+        The delay of a shortest path is looked up from the network view,
+        otherwise it is computed by summing the delays of its links.
+
+        Parameters
+        ----------
+        path : list
+            List of nodes of the path
+        shortest : bool, optional
+            If *True*, the path is the shortest path between its endpoints
+
+        Returns
+        -------
+        delay : float
+            The delay of the path
+        """
+        if shortest:
+            return self.view.path_delay(path[0], path[-1])
+        link_delay = self.view.link_delay
+        return sum(link_delay(u, v) for u, v in zip(path[:-1], path[1:]))
+
     @inheritdoc(DataCollector)
     def end_session(self, success=True):
         if not success:
@@ -471,12 +622,21 @@ class PathStretchCollector(DataCollector):
     def content_hop(self, u, v, main_path=True):
         self.cont_path_len += 1
 
+    @inheritdoc(DataCollector)
+    def request_path(self, path, main_path=True, shortest=False):
+        self.req_path_len += len(path) - 1
+
+    @inheritdoc(DataCollector)
+    def content_path(self, path, main_path=True, shortest=False):
+        self.cont_path_len += len(path) - 1
+
     @inheritdoc(DataCollector)
     def end_session(self, success=True):
         if not success:
             return
-        req_sp_len = len(self.view.shortest_path(self.receiver, self.source))
-        cont_sp_len = len(self.view.shortest_path(self.source, self.receiver))
+        # Shortest path lengths are measured in number of nodes
+        req_sp_len = self.view.path_hops(self.receiver, self.source) + 1
+        cont_sp_len = self.view.path_hops(self.source, self.receiver) + 1
         req_stretch = self.req_path_len / req_sp_len
         cont_stretch = self.cont_path_len / cont_sp_len
         stretch = (self.req_path_len + self.cont_path_len) / (req_sp_len + cont_sp_len)
@@ -500,6 +660,79 @@ class PathStretchCollector(DataCollector):
         return results
 
 
+@register_data_collector('FREQUENCY_SKETCH')
+class FrequencySketchCollector(DataCollector):
+    """Collector measuring the accuracy loss of caches estimating item
+    frequencies with a sketch rather than counting them exactly, e.g.
+    PERFECT_LFU caches with the *sketch* option enabled.
+
+    The error is measured at the end of the experiment. Caches not using a
+    sketch are ignored.
+    """
+
+    def __init__(self, view):
+        """Constructor
+
+        Parameters
+        ----------
+        view : NetworkView
+            The network view instance
+        """
+        self.view = view
+
+    @inheritdoc(DataCollector)
+    def results(self):
+        errors = {}
+        for v in self.view.cache_nodes():
+            error = self.view.cache_sketch_error(v)
+            if error is not None:
+                errors[v] = error
+        n_samples = sum(e['N_SAMPLES'] for e in errors.values())
+        results = Tree({'PER_NODE_MEAN_ABS_ERROR':
+                            {v: e['MEAN_ABS_ERROR'] for v, e in errors.items()},
+                        'PER_NODE_MEAN_REL_ERROR':
+                            {v: e['MEAN_REL_ERROR'] for v, e in errors.items()}})
+        if n_samples > 0:
+            results['MEAN_ABS_ERROR'] = sum(e['MEAN_ABS_ERROR'] * e['N_SAMPLES']
+                                            for e in errors.values()) / n_samples
+            results['MEAN_REL_ERROR'] = sum(e['MEAN_REL_ERROR'] * e['N_SAMPLES']
+                                            for e in errors.values()) / n_samples
+        return results
+
+
+@register_data_collector('REPLICA_LOOKUPS')
+class ReplicaLookupCollector(DataCollector):
+    """Collector measuring the number of caches looked up per request by
+    strategies locating the nearest replica of a content, e.g. NRR.
+    """
+
+    def __init__(self, view):
+        """Constructor
+
+        Parameters
+        ----------
+        view : NetworkView
+            The network view instance
+        """
+        self.view = view
+        self.sess_count = 0
+        self.n_lookups = 0
+
+    @inheritdoc(DataCollector)
+    def start_session(self, timestamp, receiver, content):
+        self.sess_count += 1
+
+    @inheritdoc(DataCollector)
+    def replica_lookups(self, n_lookups):
+        self.n_lookups += n_lookups
+
+    @inheritdoc(DataCollector)
+    def results(self):
+        return Tree({'MEAN': self.n_lookups / self.sess_count
+                             if self.sess_count > 0 else 0.0,
+                     'TOTAL': self.n_lookups})
+
+
 @register_data_collector('DUMMY')
 class DummyCollector(DataCollector):
     """Dummy collector to be used for test cases only."""
@@ -520,7 +753,7 @@ class DummyCollector(DataCollector):
     def start_session(self, timestamp, receiver, content):
         self.session = dict(timestamp=timestamp, receiver=receiver,
                             content=content, cache_misses=[],
-                            request_hops=[], content_hops=[])
+                            replica_lookups=0, request_hops=[], content_hops=[])
 
     @inheritdoc(DataCollector)
     def cache_hit(self, node):
@@ -530,6 +763,10 @@ class DummyCollector(DataCollector):
     def cache_miss(self, node):
         self.session['cache_misses'].append(node)
 
+    @inheritdoc(DataCollector)
+    def replica_lookups(self, n_lookups):
+        self.session['replica_lookups'] += n_lookups
+
     @inheritdoc(DataCollector)
     def server_hit(self, node):
         self.session['serving_node'] = node
@@ -5,8 +5,12 @@ experiments needs to be run, instantiates all the required classes and executes
 the experiment by iterating through the event provided by an event generator
 and providing them to a strategy instance.
 """
-from icarus.execution import NetworkModel, NetworkView, NetworkController, CollectorProxy
+import itertools
+
+from icarus.execution import NetworkModel, NetworkView, NetworkController, \
+                             CollectorProxy
 from icarus.registry import DATA_COLLECTOR, STRATEGY
+from icarus.tools.artifacts import shared_shortest_paths
 
 
 __all__ = ['exec_experiment']
@@ -21,10 +25,12 @@ def exec_experiment(topology, workload, netconf, strategy, cache_policy, collect
         The FNSS Topology object modelling the network topology on which
         experiments are run.
     workload : iterable
-        An iterable object whose elements are (time, event) tuples, where time
-        is a float type indicating the timestamp of the event to be executed
-        and event is a dictionary storing all the attributes of the event to
-        execute
+        An iterable object whose elements are either (time, event) tuples, where
+        time is a float type indicating the timestamp of the event to be
+        executed and event is a dictionary storing all the attributes of the
+        event to execute, or flat (time, receiver, content, log) tuples. The
+        format is detected from the first event and must be the same for all
+        events
     netconf : dict
         Dictionary of attributes to inizialize the network model
     strategy : tree
@@ -43,6 +49,10 @@ def exec_experiment(topology, workload, netconf, strategy, cache_policy, collect
     results : Tree
         A tree with the aggregated simulation results from all collectors
     """
+    if 'shortest_path' not in netconf:
+        # Shortest paths are shared with all experiments run on an identical
+        # topology, the network model copies them before any update
+        netconf = dict(netconf, shortest_path=shared_shortest_paths(topology))
     model = NetworkModel(topology, cache_policy, **netconf)
     view = NetworkView(model)
     controller = NetworkController(model)
@@ -56,8 +66,18 @@ def exec_experiment(topology, workload, netconf, strategy, cache_policy, collect
     strategy_args = {k: v for k, v in strategy.items() if k != 'name'}
     strategy_inst = STRATEGY[strategy_name](view, controller, **strategy_args)
 
-    for time, event in workload:
-        #print ("following event is goint to strategy.process_event")
-        #print (event)
-        strategy_inst.process_event(time, **event)
+    process_event = strategy_inst.process_event
+    events = iter(workload)
+    for first in events:
+        events = itertools.chain((first,), events)
+        break
+    else:
+        return collector.results()
+    if len(first) == 4:
+        # Flat events: no per-event dict is built and unpacked
+        for time, receiver, content, log in events:
+            process_event(time, receiver, content, log)
+    else:
+        for time, event in events:
+            process_event(time, **event)
     return collector.results()
@@ -13,14 +13,17 @@ The `NetworkController` is also responsible to notify a `DataCollectorProxy`
 of all relevant events.
 """
 import logging
+import copy
 
+import numpy as np
 import networkx as nx
 import fnss
 
 from icarus.registry import CACHE_POLICY
-from icarus.util import path_links, iround
+from icarus.util import iround, ShortestPaths
 
 __all__ = [
+    'ShortestPaths',
     'NetworkModel',
     'NetworkView',
     'NetworkController'
@@ -91,7 +94,7 @@ class NetworkView(object):
         nodes : set
             A set of all nodes currently storing the given content
         """
-        loc = set(v for v in self.model.cache if self.model.cache[v].has(k))
+        loc = set(self.model.content_locations.get(k, ()))
         source = self.content_source(k)
         #since in this simulation, we only have one source which is number 0,
         # to simplify the configure, skip the checking
@@ -138,11 +141,56 @@ class NetworkView(object):
 
         Return
         ------
-        all_pairs_shortest_paths : dict of lists
-            Shortest paths between all pairs
+        all_pairs_shortest_paths : ShortestPaths or dict of dicts
+            Shortest paths between all pairs, indexed as
+            `all_pairs_shortest_paths[s][t]`
         """
         return self.model.shortest_path
 
+    def path_delay(self, s, t):
+        """Return the delay of the shortest path from *s* to *t*
+
+        Parameters
+        ----------
+        s : any hashable type
+            Origin node
+        t : any hashable type
+            Destination node
+
+        Returns
+        -------
+        delay : float
+            The sum of the delays of all links of the shortest path
+        """
+        delay = self.model.path_delay.get((s, t))
+        if delay is None:
+            path = self.model.shortest_path[s][t]
+            link_delay = self.model.link_delay
+            delay = sum(link_delay[(u, v)] for u, v in zip(path[:-1], path[1:]))
+            self.model.path_delay[(s, t)] = delay
+        return delay
+
+    def path_hops(self, s, t):
+        """Return the number of hops of the shortest path from *s* to *t*
+
+        Parameters
+        ----------
+        s : any hashable type
+            Origin node
+        t : any hashable type
+            Destination node
+
+        Returns
+        -------
+        hops : int
+            The number of links of the shortest path
+        """
+        hops = self.model.path_hops.get((s, t))
+        if hops is None:
+            hops = len(self.model.shortest_path[s][t]) - 1
+            self.model.path_hops[(s, t)] = hops
+        return hops
+
     def cluster(self, v):
         """Return cluster to which a node belongs, if any
 
@@ -319,6 +367,29 @@ class NetworkView(object):
         if node in self.model.cache:
             return self.model.cache[node].dump()
 
+    def cache_sketch_error(self, node):
+        """Returns the accuracy loss of the frequency sketch used by the cache
+        of a specific node, if any
+
+        Parameters
+        ----------
+        node : any hashable type
+            The node identifier
+
+        Returns
+        -------
+        error : dict
+            Dictionary with the mean absolute and relative errors of the
+            estimated frequencies and the number of items on which they were
+            measured. If the node has no cache or its cache does not estimate
+            frequencies with a sketch, return *None*
+        """
+        if node in self.model.cache:
+            sketch_error = getattr(self.model.cache[node], 'sketch_error', None)
+            if sketch_error is not None:
+                return sketch_error()
+        return None
+
 
 class NetworkModel(object):
     """Models the internal state of the network.
@@ -338,8 +409,9 @@ class NetworkModel(object):
             cache policy descriptor. It has the name attribute which identify
             the cache policy name and keyworded arguments specific to the
             policy
-        shortest_path : dict of dict, optional
-            The all-pair shortest paths of the network
+        shortest_path : dict of dict or ShortestPaths, optional
+            The all-pair shortest paths of the network. If not provided, they
+            are computed and stored as a `ShortestPaths` instance
         """
         # Filter inputs
         if not isinstance(topology, fnss.Topology):
@@ -348,11 +420,17 @@ class NetworkModel(object):
 
         # Shortest paths of the network
         self.shortest_path = shortest_path if shortest_path is not None \
-                             else symmetrify_paths(nx.all_pairs_dijkstra_path(topology))
+                             else ShortestPaths(topology)
 
         # Network topology
         self.topology = topology
 
+        # Delay and number of hops of shortest paths keyed by (origin,
+        # destination) pair. They are computed the first time a pair is
+        # queried and invalidated whenever shortest paths are recomputed
+        self.path_delay = {}
+        self.path_hops = {}
+
         # Dictionary mapping each content object to its source
         # dict of location of contents keyed by content ID
         self.content_source = {}
@@ -398,6 +476,12 @@ class NetworkModel(object):
         self.cache = {node: CACHE_POLICY[policy_name](cache_size[node], **policy_args)
                           for node in cache_size}
 
+        # Dictionary mapping each content object to the set of nodes whose
+        # cache currently stores it. It is kept up to date by the controller
+        # on every insertion, eviction and removal, so that content locations
+        # can be looked up without querying every cache of the network
+        self.content_locations = {}
+
         # This is for a local un-coordinated cache (currently used only by
         # Hashrouting with edge cache)
         self.local_cache = {}
@@ -431,10 +515,35 @@ class NetworkController(object):
         model : NetworkModel
             Instance of the network model
         """
-        self.session = None
+        # Attributes of the current session. They are stored as plain
+        # attributes rather than in a dict because they are accessed on every
+        # hop of every request
+        self.session_timestamp = None
+        self.session_receiver = None
+        self.session_content = None
+        # True if the current session must be reported to the collector, i.e.
+        # the session is logged and a collector is attached
+        self.session_log = False
         self.model = model
         self.collector = None
 
+    @property
+    def session(self):
+        """Return the attributes of the current session
+
+        Returns
+        -------
+        session : dict
+            Dictionary of session attributes (timestamp, receiver, content and
+            log) or *None* if no session is open
+        """
+        if self.session_content is None:
+            return None
+        return dict(timestamp=self.session_timestamp,
+                    receiver=self.session_receiver,
+                    content=self.session_content,
+                    log=self.session_log)
+
     def attach_collector(self, collector):
         """Attach a data collector to which all events will be reported.
 
@@ -465,11 +574,11 @@ class NetworkController(object):
             *True* if this session needs to be reported to the collector,
             *False* otherwise
         """
-        self.session = dict(timestamp=timestamp,
-                            receiver=receiver,
-                            content=content,
-                            log=log)
-        if self.collector is not None and self.session['log']:
+        self.session_timestamp = timestamp
+        self.session_receiver = receiver
+        self.session_content = content
+        self.session_log = log and self.collector is not None
+        if self.session_log:
             self.collector.start_session(timestamp, receiver, content)
 
     def forward_request_path(self, s, t, path=None, main_path=True):
@@ -488,10 +597,11 @@ class NetworkController(object):
             lead to hit a content. It is normally used to calculate latency
             correctly in multicast cases. Default value is *True*
         """
-        if path is None:
+        shortest = path is None
+        if shortest:
             path = self.model.shortest_path[s][t]
-        for u, v in path_links(path):
-            self.forward_request_hop(u, v, main_path)
+        if self.session_log:
+            self.collector.request_path(path, main_path, shortest)
 
     def forward_content_path(self, u, v, path=None, main_path=True):
         """Forward a content from node *s* to node *t* over the provided path.
@@ -510,10 +620,11 @@ class NetworkController(object):
             calculate latency correctly in multicast cases. Default value is
             *True*
         """
-        if path is None:
+        shortest = path is None
+        if shortest:
             path = self.model.shortest_path[u][v]
-        for u, v in path_links(path):
-            self.forward_content_hop(u, v, main_path)
+        if self.session_log:
+            self.collector.content_path(path, main_path, shortest)
 
     def forward_request_hop(self, u, v, main_path=True):
         """Forward a request over link  u -> v.
@@ -529,7 +640,7 @@ class NetworkController(object):
             lead to hit a content. It is normally used to calculate latency
             correctly in multicast cases. Default value is *True*
         """
-        if self.collector is not None and self.session['log']:
+        if self.session_log:
             self.collector.request_hop(u, v, main_path)
 
     def forward_content_hop(self, u, v, main_path=True):
@@ -547,7 +658,7 @@ class NetworkController(object):
             calculate latency correctly in multicast cases. Default value is
             *True*
         """
-        if self.collector is not None and self.session['log']:
+        if self.session_log:
             self.collector.content_hop(u, v, main_path)
 
     def put_content(self, node):
@@ -569,7 +680,14 @@ class NetworkController(object):
             The evicted object or *None* if no contents were evicted.
         """
         if node in self.model.cache:
-            return self.model.cache[node].put(self.session['content'])
+            content = self.session_content
+            cache = self.model.cache[node]
+            evicted = cache.put(content)
+            if evicted is not None:
+                self._unindex_content(evicted, node)
+            if cache.has(content):
+                self._index_content(content, node)
+            return evicted
 
     def get_content(self, node):
         """Get a content from a server or a cache.
@@ -585,22 +703,34 @@ class NetworkController(object):
             True if the content is available, False otherwise
         """
         if node in self.model.cache:
-            cache_hit = self.model.cache[node].get(self.session['content'])
+            cache_hit = self.model.cache[node].get(self.session_content)
             if cache_hit:
-                if self.session['log']:
+                if self.session_log:
                     self.collector.cache_hit(node)
             else:
-                if self.session['log']:
+                if self.session_log:
                     self.collector.cache_miss(node)
             return cache_hit
         name, props = fnss.get_stack(self.model.topology, node)
-        if name == 'source' and self.session['content'] in props['contents']:
-            if self.collector is not None and self.session['log']:
+        if name == 'source' and self.session_content in props['contents']:
+            if self.session_log:
                 self.collector.server_hit(node)
             return True
         else:
             return False
 
+    def report_replica_lookups(self, n_lookups):
+        """Report the number of caches looked up to locate the nearest replica
+        of the content being handled.
+
+        Parameters
+        ----------
+        n_lookups : int
+            The number of caches looked up
+        """
+        if self.session_log:
+            self.collector.replica_lookups(n_lookups)
+
     def remove_content(self, node):
         """Remove the content being handled from the cache
 
@@ -615,7 +745,42 @@ class NetworkController(object):
             *True* if the entry was in the cache, *False* if it was not.
         """
         if node in self.model.cache:
-            return self.model.cache[node].remove(self.session['content'])
+            removed = self.model.cache[node].remove(self.session_content)
+            if removed:
+                self._unindex_content(self.session_content, node)
+            return removed
+
+    def _index_content(self, content, node):
+        """Record that the cache of a node stores a content
+
+        Parameters
+        ----------
+        content : any hashable type
+            The content identifier
+        node : any hashable type
+            The node whose cache stores the content
+        """
+        locations = self.model.content_locations
+        if content in locations:
+            locations[content].add(node)
+        else:
+            locations[content] = set([node])
+
+    def _unindex_content(self, content, node):
+        """Record that the cache of a node no longer stores a content
+
+        Parameters
+        ----------
+        content : any hashable type
+            The content identifier
+        node : any hashable type
+            The node whose cache no longer stores the content
+        """
+        locations = self.model.content_locations
+        if content in locations:
+            locations[content].discard(node)
+            if not locations[content]:
+                del locations[content]
 
     def end_session(self, success=True):
         """Close a session
@@ -625,9 +790,38 @@ class NetworkController(object):
         success : bool, optional
             *True* if the session was completed successfully, *False* otherwise
         """
-        if self.collector is not None and self.session['log']:
+        if self.session_log:
             self.collector.end_session(success)
-        self.session = None
+        self.session_timestamp = None
+        self.session_receiver = None
+        self.session_content = None
+        self.session_log = False
+
+    def _incremental_paths(self):
+        """Return the shortest paths of the network if they can be updated
+        incrementally, otherwise *None*. Shared shortest paths are replaced
+        by a private copy first.
+        """
+        shortest_path = self.model.shortest_path
+        if not isinstance(shortest_path, ShortestPaths):
+            return None
+        if shortest_path.read_only:
+            shortest_path = shortest_path.copy(self.model.topology)
+            self.model.shortest_path = shortest_path
+        return shortest_path
+
+    def _recompute_shortest_paths(self):
+        """Update all shortest paths of the network after changes to the
+        topology and invalidate the delays and hop counts previously computed
+        on them
+        """
+        shortest_path = self._incremental_paths()
+        if shortest_path is not None:
+            shortest_path.update()
+        else:
+            self.model.shortest_path = ShortestPaths(self.model.topology)
+        self.model.path_delay.clear()
+        self.model.path_hops.clear()
 
     def rewire_link(self, u, v, up, vp, recompute_paths=True):
         """Rewire an existing link to new endpoints
@@ -650,10 +844,18 @@ class NetworkController(object):
         """
         link = self.model.topology.edge[u][v]
         self.model.topology.remove_edge(u, v)
+        shortest_path = self._incremental_paths()
+        if shortest_path is not None:
+            shortest_path.remove_edge(u, v)
+            if self.model.topology.has_edge(up, vp):
+                # The link replaces an existing one, possibly with a
+                # different weight
+                shortest_path.remove_edge(up, vp)
         self.model.topology.add_edge(up, vp, **link)
+        if shortest_path is not None:
+            shortest_path.add_edge(up, vp)
         if recompute_paths:
-            shortest_path = nx.all_pairs_dijkstra_path(self.model.topology)
-            self.model.shortest_path = symmetrify_paths(shortest_path)
+            self._recompute_shortest_paths()
 
     def remove_link(self, u, v, recompute_paths=True):
         """Remove a link from the topology and update the network model.
@@ -675,13 +877,23 @@ class NetworkController(object):
         v : any hashable type
             Destination node
         recompute_paths: bool, optional
-            If True, recompute all shortest paths
+            If True, update all shortest paths affected by the change
         """
+        self._remove_link(u, v)
+        shortest_path = self._incremental_paths()
+        if shortest_path is not None:
+            shortest_path.remove_edge(u, v)
+        if recompute_paths:
+            self._recompute_shortest_paths()
+
+    def _remove_link(self, u, v):
+        """Remove a link from the topology without notifying shortest paths"""
         self.model.removed_links[(u, v)] = self.model.topology.edge[u][v]
         self.model.topology.remove_edge(u, v)
-        if recompute_paths:
-            shortest_path = nx.all_pairs_dijkstra_path(self.model.topology)
-            self.model.shortest_path = symmetrify_paths(shortest_path)
+
+    def _restore_link(self, u, v):
+        """Restore a link of the topology without notifying shortest paths"""
+        self.model.topology.add_edge(u, v, **self.model.removed_links.pop((u, v)))
 
     def restore_link(self, u, v, recompute_paths=True):
         """Restore a previously-removed link and update the network model
@@ -693,12 +905,14 @@ class NetworkController(object):
         v : any hashable type
             Destination node
         recompute_paths: bool, optional
-            If True, recompute all shortest paths
+            If True, update all shortest paths affected by the change
         """
-        self.model.topology.add_edge(u, v, **self.model.removed_links.pop((u, v)))
+        self._restore_link(u, v)
+        shortest_path = self._incremental_paths()
+        if shortest_path is not None:
+            shortest_path.add_edge(u, v)
         if recompute_paths:
-            shortest_path = nx.all_pairs_dijkstra_path(self.model.topology)
-            self.model.shortest_path = symmetrify_paths(shortest_path)
+            self._recompute_shortest_paths()
 
     def remove_node(self, v, recompute_paths=True):
         """Remove a node from the topology and update the network model.
@@ -731,17 +945,22 @@ class NetworkController(object):
         v : any hashable type
             Node to remove
         recompute_paths: bool, optional
-            If True, recompute all shortest paths
+            If True, update all shortest paths affected by the change
         """
         self.model.removed_nodes[v] = self.model.topology.node[v]
         # First need to remove all links the removed node as endpoint
         neighbors = self.model.topology.edge[v]
         self.model.disconnected_neighbors[v] = set(neighbors.keys())
         for u in self.model.disconnected_neighbors[v]:
-            self.remove_link(v, u, recompute_paths=False)
+            self._remove_link(v, u)
         self.model.topology.remove_node(v)
+        shortest_path = self._incremental_paths()
+        if shortest_path is not None:
+            shortest_path.remove_node(v)
         if v in self.model.cache:
             self.model.removed_caches[v] = self.model.cache.pop(v)
+            for content in self.model.removed_caches[v].dump():
+                self._unindex_content(content, v)
         if v in self.model.local_cache:
             self.model.removed_local_caches[v] = self.model.local_cache.pop(v)
         if v in self.model.source_node:
@@ -749,8 +968,7 @@ class NetworkController(object):
             for content in self.model.removed_sources[v]:
                 self.model.countent_source.pop(content)
         if recompute_paths:
-            shortest_path = nx.all_pairs_dijkstra_path(self.model.topology)
-            self.model.shortest_path = symmetrify_paths(shortest_path)
+            self._recompute_shortest_paths()
 
     def restore_node(self, v, recompute_paths=True):
         """Restore a previously-removed node and update the network model.
@@ -760,15 +978,20 @@ class NetworkController(object):
         v : any hashable type
             Node to restore
         recompute_paths: bool, optional
-            If True, recompute all shortest paths
+            If True, update all shortest paths affected by the change
         """
         self.model.topology.add_node(v, **self.model.removed_nodes.pop(v))
         for u in self.model.disconnected_neighbors[v]:
             if (v, u) in self.model.removed_links:
-                self.restore_link(v, u, recompute_paths=False)
+                self._restore_link(v, u)
         self.model.disconnected_neighbors.pop(v)
+        shortest_path = self._incremental_paths()
+        if shortest_path is not None:
+            shortest_path.add_node(v)
         if v in self.model.removed_caches:
             self.model.cache[v] = self.model.removed_caches.pop(v)
+            for content in self.model.cache[v].dump():
+                self._index_content(content, v)
         if v in self.model.removed_local_caches:
             self.model.local_cache[v] = self.model.removed_local_caches.pop(v)
         if v in self.model.removed_sources:
@@ -776,8 +999,7 @@ class NetworkController(object):
             for content in self.model.source_node[v]:
                 self.model.countent_source[content] = v
         if recompute_paths:
-            shortest_path = nx.all_pairs_dijkstra_path(self.model.topology)
-            self.model.shortest_path = symmetrify_paths(shortest_path)
+            self._recompute_shortest_paths()
 
     def reserve_local_cache(self, ratio=0.1):
         """Reserve a fraction of cache as local.
@@ -809,6 +1031,8 @@ class NetworkController(object):
             local_maxlen = iround(c.maxlen * (ratio))
             if local_maxlen > 0:
                 self.model.local_cache[v] = type(c)(local_maxlen)
+        # All coordinated caches have been replaced by empty ones
+        self.model.content_locations.clear()
 
     def get_content_local_cache(self, node):
         """Get content from local cache of node (if any)
@@ -823,12 +1047,12 @@ class NetworkController(object):
         """
         if node not in self.model.local_cache:
             return False
-        cache_hit = self.model.local_cache[node].get(self.session['content'])
+        cache_hit = self.model.local_cache[node].get(self.session_content)
         if cache_hit:
-            if self.session['log']:
+            if self.session_log:
                 self.collector.cache_hit(node)
         else:
-            if self.session['log']:
+            if self.session_log:
                 self.collector.cache_miss(node)
         return cache_hit
 
@@ -844,4 +1068,4 @@ class NetworkController(object):
             The node to query
         """
         if node in self.model.local_cache:
-            return self.model.local_cache[node].put(self.session['content'])
+            return self.model.local_cache[node].put(self.session_content)
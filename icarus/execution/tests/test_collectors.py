@@ -155,6 +155,24 @@ class TestLatencyCollector(unittest.TestCase):
         self.assertEqual((10 + 20 + 2 * (2 + 4)) / 2, res['MEAN'])
 
 
+    def test_shortest_path(self):
+
+        link_delay = {(1, 2): 2, (2, 3): 10, (3, 2): 20, (2, 1): 4}
+        view = type('MockNetworkView', (), {
+                'link_delay': lambda s, u, v: link_delay[(u, v)],
+                'path_delay': lambda s, u, v: 100})()
+
+        c = collectors.LatencyCollector(view)
+
+        c.start_session(3.0, 1, 'CONTENT')
+        c.request_path([1, 2, 3], shortest=True)
+        c.content_path([3, 2, 1])
+        c.end_session()
+
+        res = c.results()
+        self.assertEqual(100 + 20 + 4, res['MEAN'])
+
+
 class TestCacheHitRatioCollector(unittest.TestCase):
 
     def test_base(self):
@@ -236,3 +254,125 @@ class TestCacheHitRatioCollector(unittest.TestCase):
 
         res = c.results()
         self.assertEqual({1: 0.5, 2: 0.25}, res['PER_CONTENT'])
+
+
+class TestFrequencySketchCollector(unittest.TestCase):
+
+    def test_base(self):
+        errors = {1: {'MEAN_ABS_ERROR': 1.0, 'MEAN_REL_ERROR': 0.5, 'N_SAMPLES': 1},
+                  2: {'MEAN_ABS_ERROR': 4.0, 'MEAN_REL_ERROR': 2.0, 'N_SAMPLES': 3},
+                  3: None}
+        view = type('MockNetworkView', (), {})()
+        view.cache_nodes = lambda: [1, 2, 3]
+        view.cache_sketch_error = lambda v: errors[v]
+        c = collectors.FrequencySketchCollector(view)
+        res = c.results()
+        self.assertEqual({1: 1.0, 2: 4.0}, res['PER_NODE_MEAN_ABS_ERROR'])
+        self.assertEqual({1: 0.5, 2: 2.0}, res['PER_NODE_MEAN_REL_ERROR'])
+        self.assertEqual(13.0 / 4, res['MEAN_ABS_ERROR'])
+        self.assertEqual(6.5 / 4, res['MEAN_REL_ERROR'])
+
+
+class TestReplicaLookupCollector(unittest.TestCase):
+
+    def test_base(self):
+        c = collectors.ReplicaLookupCollector(None)
+        c.start_session(3.0, 1, 'CONTENT')
+        c.replica_lookups(3)
+        c.end_session()
+        c.start_session(5.0, 1, 'CONTENT')
+        c.replica_lookups(0)
+        c.end_session()
+        res = c.results()
+        self.assertEqual(1.5, res['MEAN'])
+        self.assertEqual(3, res['TOTAL'])
+
+    def test_proxy(self):
+        c = collectors.ReplicaLookupCollector(None)
+        c.name = 'REPLICA_LOOKUPS'
+        proxy = collectors.CollectorProxy(None, [c])
+        proxy.start_session(3.0, 1, 'CONTENT')
+        proxy.replica_lookups(2)
+        proxy.end_session()
+        self.assertEqual(2, proxy.results()['REPLICA_LOOKUPS']['MEAN'])
+
+
+class TestPathEvents(unittest.TestCase):
+
+    link_delay = {(1, 2): 2, (2, 3): 10, (2, 1): 4, (3, 2): 20}
+    link_type = {(1, 2): 'internal', (2, 3): 'external',
+                 (2, 1): 'internal', (3, 2): 'external'}
+
+    def setUp(self):
+        link_delay = self.link_delay
+        link_type = self.link_type
+        self.view = type('MockNetworkView', (), {
+                'link_delay': lambda s, u, v: link_delay[(u, v)],
+                'link_type': lambda s, u, v: link_type[(u, v)],
+                'content_source': lambda s, k: 3,
+                'shortest_path': lambda s, u, v: [u, 2, v],
+                'path_delay': lambda s, u, v: link_delay[(u, 2)] + link_delay[(2, v)],
+                'path_hops': lambda s, u, v: 2})()
+
+    def replay_hops(self, c):
+        c.start_session(3.0, 1, 'CONTENT')
+        c.request_hop(1, 2)
+        c.request_hop(2, 3)
+        c.request_hop(2, 1, main_path=False)
+        c.content_hop(3, 2)
+        c.content_hop(2, 1)
+        c.end_session()
+        c.start_session(5.0, 1, 'CONTENT')
+        c.request_hop(1, 2)
+        c.content_hop(2, 1)
+        c.end_session()
+        return c.results()
+
+    def replay_paths(self, c):
+        c.start_session(3.0, 1, 'CONTENT')
+        c.request_path([1, 2, 3])
+        c.request_path([2, 1], main_path=False)
+        c.content_path([3, 2, 1])
+        c.end_session()
+        c.start_session(5.0, 1, 'CONTENT')
+        c.request_path([1, 2])
+        c.content_path([2, 1])
+        c.end_session()
+        return c.results()
+
+    def test_path_hop_equivalence(self):
+        for name in ('LinkLoadCollector', 'LatencyCollector',
+                     'PathStretchCollector'):
+            cls = getattr(collectors, name)
+            self.assertEqual(self.replay_hops(cls(self.view)),
+                             self.replay_paths(cls(self.view)))
+
+    def test_proxy_hop_fallback(self):
+        dummy = collectors.DummyCollector(self.view)
+        latency = collectors.LatencyCollector(self.view)
+        proxy = collectors.CollectorProxy(self.view, [dummy, latency])
+        proxy.start_session(3.0, 1, 'CONTENT')
+        proxy.request_path([1, 2, 3])
+        proxy.content_path([3, 2, 1])
+        proxy.end_session()
+        summary = dummy.session_summary()
+        self.assertEqual([(1, 2), (2, 3)], summary['request_hops'])
+        self.assertEqual([(3, 2), (2, 1)], summary['content_hops'])
+        self.assertEqual(2 + 10 + 20 + 4, latency.results()['MEAN'])
+
+    def test_proxy_path_fallback(self):
+
+        class PathOnlyCollector(collectors.DataCollector):
+
+            def __init__(self, view):
+                self.view = view
+                self.paths = []
+
+            def request_path(self, path, main_path=True, shortest=False):
+                self.paths.append(list(path))
+
+        c = PathOnlyCollector(self.view)
+        proxy = collectors.CollectorProxy(self.view, [c])
+        proxy.request_hop(1, 2)
+        proxy.request_path([1, 2, 3])
+        self.assertEqual([[1, 2], [1, 2, 3]], c.paths)
@@ -0,0 +1,40 @@
+from __future__ import division
+import unittest
+
+import fnss
+
+from icarus.scenarios import IcnTopology
+from icarus.execution import exec_experiment
+
+
+class TestExecExperiment(unittest.TestCase):
+
+    @classmethod
+    def build_topology(cls):
+        # Topology sketch
+        #
+        # 0 ---- 1 ---- 2 ---- 3
+        #
+        topology = IcnTopology()
+        topology.add_path([0, 1, 2, 3])
+        fnss.add_stack(topology, 0, 'receiver', {'cache_size': 1})
+        fnss.add_stack(topology, 1, 'receiver', {'cache_size': 1})
+        fnss.add_stack(topology, 2, 'router')
+        fnss.add_stack(topology, 3, 'source', {'contents': [1, 2, 3]})
+        fnss.set_delays_constant(topology, 1, 'ms')
+        return topology
+
+    def run_experiment(self, workload):
+        return exec_experiment(self.build_topology(), workload, {},
+                               {'name': 'LCE'}, {'name': 'LRU'},
+                               {'CACHE_HIT_RATIO': {}, 'LATENCY': {}})
+
+    def test_flat_events(self):
+        requests = [(1.0, 0, 1, False), (2.0, 0, 1, True), (3.0, 1, 2, True),
+                    (4.0, 0, 2, True), (5.0, 1, 2, True)]
+        dict_workload = [(t, {'receiver': r, 'content': k, 'log': log})
+                         for t, r, k, log in requests]
+        flat_results = self.run_experiment(requests)
+        dict_results = self.run_experiment(dict_workload)
+        self.assertEqual(dict_results, flat_results)
+        self.assertEqual(0.5, flat_results['CACHE_HIT_RATIO']['MEAN'])
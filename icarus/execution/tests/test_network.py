@@ -1,4 +1,5 @@
 from __future__ import division
+import random
 import unittest
 
 import networkx as nx
@@ -20,6 +21,117 @@ class TestSymmetrifyPaths(unittest.TestCase):
         network.symmetrify_paths(path)
         self.assertEqual(list(path[1][5]), list(reversed(path[5][1])))
 
+class TestShortestPaths(unittest.TestCase):
+
+    def assert_same_paths(self, topology):
+        expected = network.symmetrify_paths(nx.all_pairs_dijkstra_path(topology))
+        shortest_paths = network.ShortestPaths(topology)
+        self.assertEqual(set(expected), set(shortest_paths))
+        for s in expected:
+            self.assertEqual(set(expected[s]), set(shortest_paths[s]))
+            for t in expected[s]:
+                self.assertEqual(expected[s][t], shortest_paths[s][t])
+
+    def test_ties(self):
+        topology = fnss.Topology()
+        topology.add_path([1, 2, 4, 5, 3, 6, 1])
+        self.assert_same_paths(topology)
+
+    def test_weighted(self):
+        topology = fnss.waxman_1_topology(40, alpha=0.6, beta=0.3, L=1, seed=1)
+        fnss.set_delays_geo_distance(topology, specific_delay=1)
+        fnss.set_weights_delays(topology)
+        self.assert_same_paths(topology)
+
+    def test_disconnected(self):
+        topology = fnss.Topology()
+        topology.add_path([1, 2, 3])
+        topology.add_path([4, 5])
+        shortest_paths = network.ShortestPaths(topology)
+        self.assertEqual([1, 2, 3], shortest_paths[1][3])
+        self.assertEqual([5], shortest_paths[5][5])
+        self.assertNotIn(4, shortest_paths[1])
+        self.assertRaises(KeyError, lambda: shortest_paths[1][4])
+        self.assertRaises(KeyError, lambda: shortest_paths[6])
+
+
+class TestIncrementalShortestPaths(unittest.TestCase):
+
+    def assert_same_paths(self, topology, shortest_paths):
+        expected = network.symmetrify_paths(nx.all_pairs_dijkstra_path(topology))
+        self.assertEqual(list(expected), list(shortest_paths))
+        for s in expected:
+            for t in expected[s]:
+                self.assertEqual(expected[s][t], shortest_paths[s][t])
+
+    def run_random_changes(self, topology, n_changes, seed):
+        rand = random.Random(seed)
+        model = network.NetworkModel(topology, cache_policy={'name': 'LRU'})
+        controller = network.NetworkController(model)
+        removed_links = []
+        removed_nodes = []
+        for _ in range(n_changes):
+            action = rand.choice(['remove_link', 'restore_link', 'remove_node',
+                                  'restore_node', 'rewire_link'])
+            if action == 'remove_link' and topology.number_of_edges() > 0:
+                link = rand.choice(sorted(topology.edges()))
+                controller.remove_link(*link)
+                removed_links.append(link)
+            elif action == 'restore_link' and removed_links:
+                link = removed_links.pop(rand.randrange(len(removed_links)))
+                if link in model.removed_links and \
+                        all(v in topology for v in link):
+                    controller.restore_link(*link)
+                else:
+                    removed_links.append(link)
+            elif action == 'remove_node' and topology.number_of_nodes() > 2:
+                v = rand.choice(sorted(topology.nodes()))
+                controller.remove_node(v)
+                removed_nodes.append(v)
+            elif action == 'restore_node' and removed_nodes:
+                controller.restore_node(removed_nodes.pop())
+            elif action == 'rewire_link' and topology.number_of_edges() > 0:
+                u, v = rand.choice(sorted(topology.edges()))
+                vp = rand.choice(sorted(topology.nodes()))
+                if vp != u:
+                    controller.rewire_link(u, v, u, vp)
+            self.assert_same_paths(topology, model.shortest_path)
+
+    def test_unweighted(self):
+        grid = nx.convert_node_labels_to_integers(nx.grid_2d_graph(5, 5))
+        topology = IcnTopology(grid)
+        for v in topology.nodes():
+            fnss.add_stack(topology, v, 'router')
+        self.run_random_changes(topology, 60, seed=1)
+
+    def test_weighted(self):
+        topology = IcnTopology(fnss.waxman_1_topology(30, alpha=0.6, beta=0.3,
+                                                      L=1, seed=2))
+        fnss.set_delays_geo_distance(topology, specific_delay=1)
+        fnss.set_weights_delays(topology)
+        for v in topology.nodes():
+            fnss.add_stack(topology, v, 'router')
+        self.run_random_changes(topology, 60, seed=3)
+
+    def test_recompute_only_affected_trees(self):
+        topology = fnss.Topology()
+        topology.add_path([1, 2, 3, 4])
+        topology.add_edge(4, 5)
+        shortest_paths = network.ShortestPaths(topology)
+        topology.remove_edge(4, 5)
+        shortest_paths.remove_edge(4, 5)
+        self.assertEqual(set([1, 2, 3, 4, 5]), shortest_paths._stale)
+        topology.add_edge(1, 4)
+        shortest_paths.add_edge(1, 4)
+        shortest_paths.update()
+        self.assertEqual([1, 4], shortest_paths[1][4])
+        topology.add_edge(1, 3, weight=5)
+        shortest_paths.add_edge(1, 3)
+        self.assertEqual(set(), shortest_paths._stale)
+        shortest_paths.update()
+        self.assert_same_paths(topology, shortest_paths)
+
+
 class TestNetworkMvc(unittest.TestCase):
 
     @classmethod
@@ -93,3 +205,91 @@ class TestNetworkMvc(unittest.TestCase):
         self.controller.rewire_link(1, 8, 1, 5, recompute_paths=True)
         self.assertEqual([0, 1, 2, 3, 4], self.view.shortest_path(0, 4))
         self.assertEqual(1, self.topology.edge[2][3]['a'])
+
+
+    def test_path_delay_hops(self):
+        topology = self.build_topology()
+        fnss.set_delays_constant(topology, 2, 'ms')
+        model = network.NetworkModel(topology, cache_policy={'name': 'FIFO'})
+        view = network.NetworkView(model)
+        controller = network.NetworkController(model)
+        self.assertEqual(4, view.path_hops(0, 4))
+        self.assertEqual(8, view.path_delay(0, 4))
+        self.assertEqual(0, view.path_hops(4, 4))
+        self.assertEqual(0, view.path_delay(4, 4))
+        controller.remove_link(2, 3, recompute_paths=True)
+        self.assertEqual(7, view.path_hops(0, 4))
+        self.assertEqual(14, view.path_delay(0, 4))
+        controller.restore_link(2, 3, recompute_paths=True)
+        self.assertEqual(4, view.path_hops(0, 4))
+        self.assertEqual(8, view.path_delay(0, 4))
+
+
+class TestContentLocations(unittest.TestCase):
+
+    def setUp(self):
+        # Topology sketch
+        #
+        # 0 ---- 1 ---- 2
+        #
+        topology = IcnTopology()
+        topology.add_path([0, 1, 2])
+        fnss.add_stack(topology, 0, 'receiver', {'cache_size': 1})
+        fnss.add_stack(topology, 1, 'receiver', {'cache_size': 1})
+        fnss.add_stack(topology, 2, 'source', {'contents': [1, 2, 3]})
+        self.model = network.NetworkModel(topology, cache_policy={'name': 'LRU'})
+        self.view = network.NetworkView(self.model)
+        self.controller = network.NetworkController(self.model)
+
+    def assert_locations_consistent(self):
+        for k in (1, 2, 3):
+            expected = set(v for v, c in self.model.cache.items() if c.has(k))
+            expected.add(2)
+            self.assertEqual(expected, self.view.content_locations(k))
+
+    def test_put_evict(self):
+        self.controller.start_session(1, 0, 1, False)
+        self.controller.put_content(0)
+        self.controller.put_content(1)
+        self.controller.end_session()
+        self.assertEqual(set([0, 1, 2]), self.view.content_locations(1))
+        self.controller.start_session(2, 0, 2, False)
+        self.assertEqual(1, self.controller.put_content(0))
+        self.controller.end_session()
+        self.assertEqual(set([1, 2]), self.view.content_locations(1))
+        self.assertEqual(set([0, 2]), self.view.content_locations(2))
+        self.assert_locations_consistent()
+
+    def test_remove(self):
+        self.controller.start_session(1, 0, 3, False)
+        self.controller.put_content(0)
+        self.assertTrue(self.controller.remove_content(0))
+        self.assertFalse(self.controller.remove_content(0))
+        self.controller.end_session()
+        self.assertEqual(set([2]), self.view.content_locations(3))
+        self.assertNotIn(3, self.model.content_locations)
+
+    def test_remove_restore_node(self):
+        self.controller.start_session(1, 0, 1, False)
+        self.controller.put_content(0)
+        self.controller.end_session()
+        self.controller.remove_node(0)
+        self.assertEqual(set([2]), self.view.content_locations(1))
+        self.controller.restore_node(0)
+        self.assertEqual(set([0, 2]), self.view.content_locations(1))
+        self.assert_locations_consistent()
+
+    def test_reserve_local_cache(self):
+        self.controller.start_session(1, 0, 1, False)
+        self.controller.put_content(0)
+        self.controller.end_session()
+        self.controller.reserve_local_cache(0.5)
+        self.assert_locations_consistent()
+
+    def test_session(self):
+        self.assertIsNone(self.controller.session)
+        self.controller.start_session(1, 0, 1, True)
+        self.assertEqual(dict(timestamp=1, receiver=0, content=1, log=False),
+                         self.controller.session)
+        self.controller.end_session()
+        self.assertIsNone(self.controller.session)
@@ -1,2 +1,3 @@
 from .policies import *
+from .arrays import *
 from .systems import *
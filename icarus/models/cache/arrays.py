@@ -0,0 +1,545 @@
+"""Array-backed implementations of cache replacement policies for integer
+items.
+
+Policies of this module store cached items and the links ordering them in
+arrays of machine integers rather than in one linked-list node object per item
+and a dictionary. They behave exactly as their counterparts of the `policies`
+module, but only accept non-negative integer items, like the content
+identifiers generated by all workloads provided by Icarus.
+
+Items and links are stored in arrays with one entry per cache slot and the
+slot of each item is found in an open-addressing hash table with two to four
+entries per slot, all preallocated when the cache is created. A cache
+therefore requires between 29 and 37 bytes per slot, whatever the size of the
+catalogue, against about 150 bytes per item for its counterpart. In exchange,
+looking up an item requires hashing it and probing the table in Python code,
+so operations are slightly slower than dictionary lookups.
+"""
+from __future__ import division
+from array import array
+
+import numpy as np
+
+from icarus.util import inheritdoc, apportionment
+from icarus.registry import register_cache_policy
+
+from .policies import Cache, SegmentedLruCache
+
+
+__all__ = [
+    'ArrayLinkedLists',
+    'LruArrayCache',
+    'FifoArrayCache',
+    'SlruArrayCache',
+          ]
+
+
+class ArrayLinkedLists(object):
+    """A set of doubly-linked lists of distinct integer items sharing a
+    bounded number of slots stored in preallocated arrays.
+
+    Each item is stored in a slot. Arrays indexed by slot store the item,
+    the slots above and below it and the list it belongs to, while a hash
+    table with linear probing, at most half full, stores the slot of each
+    item. All operations have O(1) expected time complexity.
+    """
+
+    def __init__(self, capacity, lists=1):
+        """Constructor
+
+        Parameters
+        ----------
+        capacity : int
+            The maximum number of items stored in all lists
+        lists : int, optional
+            The number of lists
+        """
+        self.capacity = int(capacity)
+        if self.capacity <= 0:
+            raise ValueError('capacity must be positive')
+        if lists <= 0 or lists > 127:
+            raise ValueError('lists must be between 1 and 127')
+        self._item = array('q', [0]) * self.capacity
+        self._up = array('i', [-1]) * self.capacity
+        self._down = array('i', [-1]) * self.capacity
+        self._list = array('b', [-1]) * self.capacity
+        # Stack of free slots
+        self._free = array('i', range(self.capacity - 1, -1, -1))
+        # Hash table of the slots of the items stored, -1 if empty. Its size
+        # is the smallest power of two at least twice the capacity
+        bits = max(1, (2 * self.capacity - 1).bit_length())
+        self._shift = 64 - bits
+        self._mask = (1 << bits) - 1
+        self._table = array('i', [-1]) * (1 << bits)
+        self._n = 0
+        self._top = [-1] * lists
+        self._bottom = [-1] * lists
+        self._len = [0] * lists
+
+    def __len__(self):
+        return self._n
+
+    def __contains__(self, k):
+        return k >= 0 and self._table[self._find(k)] >= 0
+
+    def _home(self, k):
+        """Return the position of an item in the hash table if there are no
+        collisions (Fibonacci hashing)"""
+        return ((k * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> self._shift
+
+    def _find(self, k):
+        """Return the position of an item in the hash table or, if the item
+        is not stored, the empty position where it would be inserted"""
+        table, item, mask = self._table, self._item, self._mask
+        i = self._home(k)
+        while True:
+            s = table[i]
+            if s < 0 or item[s] == k:
+                return i
+            i = (i + 1) & mask
+
+    def _slot(self, k):
+        """Return the slot of an item stored"""
+        s = self._table[self._find(k)]
+        if s < 0:
+            raise KeyError('Item %s not in the set' % str(k))
+        return s
+
+    def _unindex(self, k):
+        """Remove an item from the hash table, shifting back the items
+        following it in its probe sequence so that no tombstone is needed"""
+        table, item, mask = self._table, self._item, self._mask
+        i = self._find(k)
+        j = i
+        while True:
+            j = (j + 1) & mask
+            s = table[j]
+            if s < 0:
+                break
+            h = self._home(item[s])
+            # Move the item unless its home position is cyclically in (i, j]
+            if (i < h <= j) if i <= j else (h > i or h <= j):
+                continue
+            table[i] = s
+            i = j
+        table[i] = -1
+
+    def length(self, l):
+        """Return the number of items of a list
+
+        Parameters
+        ----------
+        l : int
+            The list
+
+        Returns
+        -------
+        length : int
+            The number of items of the list
+        """
+        return self._len[l]
+
+    def list_of(self, k):
+        """Return the list an item belongs to
+
+        Parameters
+        ----------
+        k : int
+            The item
+
+        Returns
+        -------
+        l : int
+            The list
+        """
+        return self._list[self._slot(k)]
+
+    def items(self, l):
+        """Return the items of a list from top to bottom
+
+        Parameters
+        ----------
+        l : int
+            The list
+
+        Returns
+        -------
+        items : list
+            The items of the list
+        """
+        items = []
+        item, down = self._item, self._down
+        s = self._top[l]
+        while s >= 0:
+            items.append(item[s])
+            s = down[s]
+        return items
+
+    def bottom(self, l):
+        """Return the item at the bottom of a list
+
+        Parameters
+        ----------
+        l : int
+            The list
+
+        Returns
+        -------
+        bottom : int
+            The item at the bottom or *None* if the list is empty
+        """
+        s = self._bottom[l]
+        return self._item[s] if s >= 0 else None
+
+    def _link_top(self, s, l):
+        """Link a slot at the top of a list"""
+        top = self._top[l]
+        self._up[s] = -1
+        self._down[s] = top
+        if top >= 0:
+            self._up[top] = s
+        else:
+            self._bottom[l] = s
+        self._top[l] = s
+        self._list[s] = l
+        self._len[l] += 1
+
+    def _unlink(self, s):
+        """Unlink a slot from its list"""
+        l = self._list[s]
+        up = self._up[s]
+        down = self._down[s]
+        if up >= 0:
+            self._down[up] = down
+        else:
+            self._top[l] = down
+        if down >= 0:
+            self._up[down] = up
+        else:
+            self._bottom[l] = up
+        self._len[l] -= 1
+
+    def append_top(self, k, l=0):
+        """Append an item at the top of a list
+
+        Parameters
+        ----------
+        k : int
+            The item to append
+        l : int, optional
+            The list
+        """
+        if k in self:
+            raise KeyError('The item %s is already in the set' % str(k))
+        if k < 0:
+            raise ValueError('Items must be non-negative integers')
+        if not self._free:
+            raise ValueError('No slot available')
+        s = self._free.pop()
+        self._item[s] = k
+        self._table[self._find(k)] = s
+        self._n += 1
+        self._link_top(s, l)
+
+    def move_to_top(self, k, l=None):
+        """Move an item to the top of a list
+
+        Parameters
+        ----------
+        k : int
+            The item to move
+        l : int, optional
+            The list to which the item is moved. If *None*, the item is moved
+            to the top of its own list
+        """
+        s = self._slot(k)
+        if l is None:
+            l = self._list[s]
+            if self._top[l] == s:
+                return
+        self._unlink(s)
+        self._link_top(s, l)
+
+    def pop_bottom(self, l=0):
+        """Pop the item at the bottom of a list
+
+        Parameters
+        ----------
+        l : int, optional
+            The list
+
+        Returns
+        -------
+        bottom : int
+            The item at the bottom or *None* if the list is empty
+        """
+        s = self._bottom[l]
+        if s < 0:
+            return None
+        k = self._item[s]
+        self._unlink(s)
+        self._unindex(k)
+        self._n -= 1
+        self._free.append(s)
+        return k
+
+    def remove(self, k):
+        """Remove an item
+
+        Parameters
+        ----------
+        k : int
+            The item to remove
+        """
+        if k not in self:
+            raise KeyError('Item %s not in the set' % str(k))
+        s = self._slot(k)
+        self._unlink(s)
+        self._unindex(k)
+        self._n -= 1
+        self._free.append(s)
+
+    def index(self, k):
+        """Return the index of an item in its list
+
+        This operation has a O(n) time complexity, with n being the length of
+        the list.
+
+        Parameters
+        ----------
+        k : int
+            The item whose index is queried
+
+        Returns
+        -------
+        index : int
+            The index of the item
+        """
+        target = self._slot(k)
+        up = self._up
+        index = 0
+        s = up[target]
+        while s >= 0:
+            index += 1
+            s = up[s]
+        return index
+
+    def clear(self):
+        """Remove all items"""
+        self._table = array('i', [-1]) * len(self._table)
+        self._n = 0
+        self._free = array('i', range(self.capacity - 1, -1, -1))
+        for l in range(len(self._top)):
+            self._top[l] = self._bottom[l] = -1
+            self._len[l] = 0
+
+
+@register_cache_policy('LRU_ARRAY')
+class LruArrayCache(Cache):
+    """Least Recently Used (LRU) cache eviction policy for integer items,
+    backed by preallocated arrays.
+
+    It behaves as `LruCache` but requires less memory per cached item.
+    """
+
+    @inheritdoc(Cache)
+    def __init__(self, maxlen, *args, **kwargs):
+        self._maxlen = int(maxlen)
+        if self._maxlen <= 0:
+            raise ValueError('maxlen must be positive')
+        # One more slot holds an inserted item before the eviction
+        self._cache = ArrayLinkedLists(self._maxlen + 1)
+
+    @inheritdoc(Cache)
+    def __len__(self):
+        return len(self._cache)
+
+    @property
+    @inheritdoc(Cache)
+    def maxlen(self):
+        return self._maxlen
+
+    @inheritdoc(Cache)
+    def dump(self):
+        return self._cache.items(0)
+
+    def position(self, k, *args, **kwargs):
+        """Return the current position of an item in the cache. Position *0*
+        refers to the head of cache (i.e. most recently used item), while
+        position *maxlen - 1* refers to the tail of the cache (i.e. the least
+        recently used item).
+
+        This method does not change the internal state of the cache.
+
+        Parameters
+        ----------
+        k : int
+            The item looked up in the cache
+
+        Returns
+        -------
+        position : int
+            The current position of the item in the cache
+        """
+        if not k in self._cache:
+            raise ValueError('The item %s is not in the cache' % str(k))
+        return self._cache.index(k)
+
+    @inheritdoc(Cache)
+    def has(self, k, *args, **kwargs):
+        return k in self._cache
+
+    @inheritdoc(Cache)
+    def get(self, k, *args, **kwargs):
+        if k not in self._cache:
+            return False
+        self._cache.move_to_top(k)
+        return True
+
+    def put(self, k, *args, **kwargs):
+        """Insert an item in the cache if not already inserted.
+
+        If the element is already present in the cache, it will pushed to the
+        top of the cache.
+
+        Parameters
+        ----------
+        k : int
+            The item to be inserted
+
+        Returns
+        -------
+        evicted : int
+            The evicted object or *None* if no contents were evicted.
+        """
+        if k in self._cache:
+            self._cache.move_to_top(k)
+            return None
+        self._cache.append_top(k)
+        return self._cache.pop_bottom() if len(self._cache) > self._maxlen else None
+
+    @inheritdoc(Cache)
+    def remove(self, k, *args, **kwargs):
+        if k not in self._cache:
+            return False
+        self._cache.remove(k)
+        return True
+
+    @inheritdoc(Cache)
+    def clear(self):
+        self._cache.clear()
+
+
+@register_cache_policy('FIFO_ARRAY')
+class FifoArrayCache(LruArrayCache):
+    """First In First Out (FIFO) cache implementation for integer items,
+    backed by preallocated arrays.
+
+    It behaves as `FifoCache` but requires less memory per cached item.
+    """
+
+    @inheritdoc(Cache)
+    def get(self, k, *args, **kwargs):
+        return k in self._cache
+
+    @inheritdoc(Cache)
+    def put(self, k, *args, **kwargs):
+        if k in self._cache:
+            return None
+        self._cache.append_top(k)
+        return self._cache.pop_bottom() if len(self._cache) > self._maxlen else None
+
+
+@register_cache_policy('SLRU_ARRAY')
+class SlruArrayCache(Cache):
+    """Segmented Least Recently Used (SLRU) cache eviction policy for integer
+    items, backed by preallocated arrays.
+
+    It behaves as `SegmentedLruCache` but requires less memory per cached
+    item. All segments share the same arrays.
+    """
+
+    @inheritdoc(SegmentedLruCache)
+    def __init__(self, maxlen, segments=2, alloc=None, *args, **kwargs):
+        self._maxlen = int(maxlen)
+        if self._maxlen <= 0:
+            raise ValueError('maxlen must be positive')
+        if not isinstance(segments, int) or segments <= 0 or segments > maxlen:
+            raise ValueError('segments must be an integer and 0 < segments <= maxlen')
+        if alloc:
+            if len(alloc) != segments:
+                raise ValueError('alloc must be an iterable with as many entries as segments')
+            if np.abs(np.sum(alloc) - 1) > 0.001:
+                raise ValueError('All alloc entries must sum up to 1')
+        else:
+            alloc = [1 / segments for _ in range(segments)]
+        self._segment_maxlen = apportionment(maxlen, alloc)
+        self._segments = segments
+        # One more slot holds an inserted item before the eviction
+        self._cache = ArrayLinkedLists(self._maxlen + 1, segments)
+
+    @inheritdoc(Cache)
+    def __len__(self):
+        return len(self._cache)
+
+    @property
+    @inheritdoc(Cache)
+    def maxlen(self):
+        return self._maxlen
+
+    @inheritdoc(Cache)
+    def has(self, k, *args, **kwargs):
+        return k in self._cache
+
+    def _promote(self, k):
+        """Promote an item in cache to the segment above"""
+        cache = self._cache
+        seg = cache.list_of(k)
+        if seg == 0:
+            cache.move_to_top(k)
+            return
+        cache.move_to_top(k, seg - 1)
+        if cache.length(seg - 1) > self._segment_maxlen[seg - 1]:
+            cache.move_to_top(cache.bottom(seg - 1), seg)
+
+    @inheritdoc(Cache)
+    def get(self, k, *args, **kwargs):
+        if k not in self._cache:
+            return False
+        self._promote(k)
+        return True
+
+    @inheritdoc(SegmentedLruCache)
+    def put(self, k, *args, **kwargs):
+        if k in self._cache:
+            self._promote(k)
+            return None
+        last = self._segments - 1
+        self._cache.append_top(k, last)
+        if self._cache.length(last) > self._segment_maxlen[last]:
+            return self._cache.pop_bottom(last)
+        return None
+
+    @inheritdoc(Cache)
+    def remove(self, k, *args, **kwargs):
+        if k not in self._cache:
+            return False
+        self._cache.remove(k)
+        return True
+
+    @inheritdoc(SegmentedLruCache)
+    def position(self, k, *args, **kwargs):
+        if not k in self._cache:
+            raise ValueError('The item %s is not in the cache' % str(k))
+        seg = self._cache.list_of(k)
+        return sum(self._cache.length(i) for i in range(seg)) + \
+            self._cache.index(k)
+
+    @inheritdoc(SegmentedLruCache)
+    def dump(self, serialized=True):
+        dump = [self._cache.items(i) for i in range(self._segments)]
+        return sum(dump, []) if serialized else dump
+
+    @inheritdoc(Cache)
+    def clear(self):
+        self._cache.clear()
@@ -4,10 +4,13 @@ This module contains the implementations of all the cache replacement policies
 provided by Icarus.
 """
 from __future__ import division
-from collections import deque, defaultdict
+import itertools
+import heapq
 import random
 import abc
 import copy
+import numbers
+import zlib
 
 import numpy as np
 
@@ -17,6 +20,8 @@ from icarus.registry import register_cache_policy
 
 __all__ = [
         'LinkedSet',
+        'IndexedLinkedSet',
+        'CountMinSketch',
         'Cache',
         'NullCache',
         'BeladyMinCache',
@@ -24,6 +29,7 @@ __all__ = [
         'SegmentedLruCache',
         'InCacheLfuCache',
         'PerfectLfuCache',
+        'WTinyLfuCache',
         'FifoCache',
         'ClimbCache',
         'RandEvictionCache',
@@ -45,9 +51,15 @@ class LinkedSet(object):
     remove from any position, move to top, move to bottom, insert after or
     before a given item.
     """
+    __slots__ = ('_top', '_bottom', '_map')
+
     class _Node(object):
         """Class implementing a node of the linked list"""
 
+        # Nodes have no instance dictionary to minimize the memory overhead
+        # of each item
+        __slots__ = ('val', 'up', 'down')
+
         def __init__(self, val, up=None, down=None):
             """Constructor
 
@@ -449,6 +461,333 @@ class LinkedSet(object):
         self._map.clear()
 
 
+class IndexedLinkedSet(LinkedSet):
+    """A doubly-linked set whose items can be located by index in logarithmic
+    time.
+
+    Each item is labelled with an integer stamp such that stamps increase
+    from top to bottom. Items appended or moved to the top or to the bottom
+    take a stamp smaller or greater than any other and items swapped with a
+    neighbor swap their stamps. A Fenwick tree counts the stamps in use, so
+    that the index of an item is the number of stamps in use smaller than
+    its own. When no stamp is left at one end, all items are relabelled.
+
+    This provides O(log n) time complexity for searching the index of an
+    item and amortized O(log n) time complexity for all operations supported
+    in constant time by `LinkedSet`, except inserting an item above or below
+    another one, which takes O(n) time.
+    """
+    __slots__ = ('_tree', '_lo', '_hi')
+
+    class _Node(LinkedSet._Node):
+        """Class implementing a node of the linked list labelled with a
+        stamp"""
+
+        __slots__ = ('stamp',)
+
+    def __init__(self, iterable=[]):
+        """Constructor
+
+        Parameters
+        ----------
+        iterable : iterable type
+            An iterable type to inizialize the data structure.
+            It must contain only one instance of each element
+        """
+        self._tree = [0]
+        self._lo = self._hi = 0
+        super(IndexedLinkedSet, self).__init__(iterable)
+
+    def _add(self, stamp, value):
+        """Add a value to the count of a stamp in the Fenwick tree"""
+        tree = self._tree
+        size = len(tree)
+        i = stamp + 1
+        while i < size:
+            tree[i] += value
+            i += i & -i
+
+    def _relabel(self):
+        """Relabel all items with consecutive stamps, leaving as many free
+        stamps above and below them as there are items
+        """
+        n = len(self._map)
+        size = max(64, 4 * (n + 1))
+        self._lo = self._hi = (size - n) // 2
+        tree = [0] * (size + 1)
+        cur = self._top
+        while cur:
+            cur.stamp = self._hi
+            tree[self._hi + 1] = 1
+            self._hi += 1
+            cur = cur.down
+        # Build the Fenwick tree in linear time
+        for i in range(1, size + 1):
+            j = i + (i & -i)
+            if j <= size:
+                tree[j] += tree[i]
+        self._tree = tree
+
+    def _stamp_top(self, k):
+        n = self._map[k]
+        self._lo -= 1
+        n.stamp = self._lo
+        self._add(n.stamp, 1)
+
+    def _stamp_bottom(self, k):
+        n = self._map[k]
+        n.stamp = self._hi
+        self._hi += 1
+        self._add(n.stamp, 1)
+
+    def _swap_stamps(self, n, m):
+        if n is not None and m is not None:
+            n.stamp, m.stamp = m.stamp, n.stamp
+
+    @inheritdoc(LinkedSet)
+    def pop_top(self):
+        if self._top is not None:
+            self._add(self._top.stamp, -1)
+        return super(IndexedLinkedSet, self).pop_top()
+
+    @inheritdoc(LinkedSet)
+    def pop_bottom(self):
+        if self._bottom is not None:
+            self._add(self._bottom.stamp, -1)
+        return super(IndexedLinkedSet, self).pop_bottom()
+
+    @inheritdoc(LinkedSet)
+    def append_top(self, k):
+        if self._lo == 0:
+            self._relabel()
+        super(IndexedLinkedSet, self).append_top(k)
+        self._stamp_top(k)
+
+    @inheritdoc(LinkedSet)
+    def append_bottom(self, k):
+        if self._hi == len(self._tree) - 1:
+            self._relabel()
+        super(IndexedLinkedSet, self).append_bottom(k)
+        self._stamp_bottom(k)
+
+    @inheritdoc(LinkedSet)
+    def move_up(self, k):
+        if k in self._map:
+            n = self._map[k]
+            self._swap_stamps(n, n.up)
+        super(IndexedLinkedSet, self).move_up(k)
+
+    @inheritdoc(LinkedSet)
+    def move_down(self, k):
+        if k in self._map:
+            n = self._map[k]
+            self._swap_stamps(n, n.down)
+        super(IndexedLinkedSet, self).move_down(k)
+
+    @inheritdoc(LinkedSet)
+    def move_to_top(self, k):
+        if k not in self._map:
+            raise KeyError('Item %s not in the set' % str(k))
+        if self._lo == 0:
+            self._relabel()
+        self._add(self._map[k].stamp, -1)
+        super(IndexedLinkedSet, self).move_to_top(k)
+        self._stamp_top(k)
+
+    @inheritdoc(LinkedSet)
+    def move_to_bottom(self, k):
+        if k not in self._map:
+            raise KeyError('Item %s not in the set' % str(k))
+        if self._hi == len(self._tree) - 1:
+            self._relabel()
+        self._add(self._map[k].stamp, -1)
+        super(IndexedLinkedSet, self).move_to_bottom(k)
+        self._stamp_bottom(k)
+
+    @inheritdoc(LinkedSet)
+    def insert_above(self, i, k):
+        super(IndexedLinkedSet, self).insert_above(i, k)
+        self._relabel()
+
+    @inheritdoc(LinkedSet)
+    def insert_below(self, i, k):
+        super(IndexedLinkedSet, self).insert_below(i, k)
+        self._relabel()
+
+    def index(self, k):
+        """Return index of a given element.
+
+        This operation has a O(log n) time complexity, with n being the size
+        of the set.
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item whose index is queried
+
+        Returns
+        -------
+        index : int
+            The index of the item
+        """
+        if not k in self._map:
+            raise KeyError('The item %s is not in the set' % str(k))
+        # Count stamps in use smaller than the stamp of the item
+        tree = self._tree
+        index = 0
+        i = self._map[k].stamp
+        while i > 0:
+            index += tree[i]
+            i -= i & -i
+        return index
+
+    @inheritdoc(LinkedSet)
+    def remove(self, k):
+        if k in self._map:
+            self._add(self._map[k].stamp, -1)
+        super(IndexedLinkedSet, self).remove(k)
+
+    @inheritdoc(LinkedSet)
+    def clear(self):
+        super(IndexedLinkedSet, self).clear()
+        self._tree = [0]
+        self._lo = self._hi = 0
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(x):
+    """Return a 64-bit integer scrambling the bits of another one
+    (SplitMix64 finalizer)"""
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+def _stable_hash(k):
+    """Return a hash of an item that, unlike the builtin hash of strings, is
+    the same in all processes"""
+    if isinstance(k, numbers.Integral):
+        return int(k) & _MASK64
+    if isinstance(k, bytes):
+        data = k
+    elif isinstance(k, str):
+        data = k.encode('utf-8')
+    else:
+        data = repr(k).encode('utf-8')
+    return zlib.crc32(data) & 0xffffffff
+
+
+class CountMinSketch(object):
+    """A count-min sketch, i.e. a compact data structure estimating the
+    number of occurrences of items with bounded memory.
+
+    Each item is mapped by a different hash function to one counter of each
+    row of a table. Adding an item increments the smallest of its counters
+    (conservative update) and the estimated count of an item is its smallest
+    counter, which is never lower than the actual count.
+
+    Optionally, counters are aged as proposed for TinyLFU [1]_: after a
+    given number of items have been added, all counters are halved so that
+    the sketch reflects recent popularity.
+
+    References
+    ----------
+    .. [1] G. Einziger, R. Friedman, B. Manes, TinyLFU: A Highly Efficient
+           Cache Admission Policy, ACM Transactions on Storage, 2017
+    """
+
+    def __init__(self, width, depth=4, sample_size=None, seed=0):
+        """Constructor
+
+        Parameters
+        ----------
+        width : int
+            The number of counters of each row
+        depth : int, optional
+            The number of rows, i.e. of hash functions
+        sample_size : int, optional
+            The number of additions after which all counters are halved. If
+            *None*, counters are never aged
+        seed : int, optional
+            The seed of the hash functions. Items are mapped to the same
+            counters by all processes using the same seed
+        """
+        self.width = int(width)
+        self.depth = int(depth)
+        if self.width <= 0 or self.depth <= 0:
+            raise ValueError('width and depth must be positive')
+        if sample_size is not None and sample_size <= 0:
+            raise ValueError('sample_size must be positive')
+        self.sample_size = sample_size
+        self._seed = seed
+        self._seed_hash = _mix64(_stable_hash(seed))
+        self._rows = [[0] * self.width for _ in range(self.depth)]
+        self._additions = 0
+
+    def _indexes(self, k):
+        # Row hash functions are derived from two hashes of the item by
+        # double hashing, which preserves the accuracy of the sketch
+        h1 = _mix64(_stable_hash(k) ^ self._seed_hash)
+        h2 = _mix64(h1) | 1
+        width = self.width
+        return [(h1 + i * h2) % width for i in range(self.depth)]
+
+    def add(self, k):
+        """Add an occurrence of an item
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item
+
+        Returns
+        -------
+        aged : bool
+            *True* if counters have been aged after this addition
+        """
+        indexes = self._indexes(k)
+        rows = self._rows
+        count = min(row[i] for row, i in zip(rows, indexes))
+        for row, i in zip(rows, indexes):
+            if row[i] == count:
+                row[i] += 1
+        self._additions += 1
+        if self.sample_size is not None and self._additions >= self.sample_size:
+            self.age()
+            return True
+        return False
+
+    def estimate(self, k):
+        """Return the estimated number of occurrences of an item
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item
+
+        Returns
+        -------
+        count : int
+            The estimated count
+        """
+        return min(row[i] for row, i in zip(self._rows, self._indexes(k)))
+
+    def age(self):
+        """Halve all counters"""
+        for row in self._rows:
+            row[:] = [c >> 1 for c in row]
+        self._additions >>= 1
+
+    def clear(self):
+        """Reset all counters"""
+        for row in self._rows:
+            row[:] = [0] * self.width
+        self._additions = 0
+
+
 class Cache(object):
     """Base implementation of a cache object"""
 
@@ -609,6 +948,62 @@ class Cache(object):
         """
         raise NotImplementedError('This method is not implemented')
 
+    def replay(self, keys, warmup=0):
+        """Feed a sequence of requests to the cache in read-through mode,
+        i.e. each requested item is retrieved and, if not in the cache,
+        inserted.
+
+        Subclasses may override this method with a faster implementation.
+
+        Parameters
+        ----------
+        keys : iterable
+            The sequence of requested items
+        warmup : int, optional
+            The number of initial requests used to warm up the cache, whose
+            outcome is not returned
+
+        Returns
+        -------
+        hits : array of bool
+            Array whose *i*-th entry is *True* if request *warmup + i* was a
+            cache hit and *False* otherwise
+        """
+        keys, hits = _replay_setup(keys, warmup)
+        get = self.get
+        put = self.put
+        for i, k in enumerate(keys):
+            if get(k):
+                hits[i] = 1
+            else:
+                put(k)
+        return _replay_hits(hits, warmup)
+
+    def _replay_overridden(self):
+        """Return whether the cache operations have been replaced on this
+        instance, e.g. by a wrapper like `ttl_cache`, so that an optimized
+        `replay` implementation cannot be used
+        """
+        return 'get' in self.__dict__ or 'put' in self.__dict__
+
+
+def _replay_setup(keys, warmup):
+    """Return the requests to replay as a list and a buffer for the outcome
+    of each request"""
+    if isinstance(keys, np.ndarray):
+        # Convert to Python scalars, faster to hash and stored in caches
+        keys = keys.tolist()
+    elif not isinstance(keys, (list, tuple)):
+        keys = list(keys)
+    if warmup < 0 or warmup > len(keys):
+        raise ValueError('warmup must be between 0 and the number of requests')
+    return keys, bytearray(len(keys))
+
+
+def _replay_hits(hits, warmup):
+    """Return the outcome of the requests measured after the warmup"""
+    return np.frombuffer(bytes(hits), dtype=np.bool_)[warmup:]
+
 
 @register_cache_policy('NULL')
 class NullCache(Cache):
@@ -736,6 +1131,56 @@ class NullCache(Cache):
     def clear(self):
         pass
 
+def _next_use(trace):
+    """Compute, for each request of a trace, the position of the next request
+    for the same item
+
+    Parameters
+    ----------
+    trace : iterable
+        Trace of requests
+
+    Returns
+    -------
+    next_use : array
+        Array whose *i*-th entry is the position of the first request for
+        item *trace[i]* after position *i*, or *len(trace)* if the item is
+        not requested again
+    first_use : dict
+        Dictionary mapping each item to the position of its first request
+    """
+    if not hasattr(trace, '__len__'):
+        trace = list(trace)
+    n = len(trace)
+    dtype = np.int32 if n < np.iinfo(np.int32).max else np.int64
+    if n == 0:
+        return np.zeros(0, dtype=dtype), {}
+    try:
+        items = np.asarray(trace)
+    except ValueError:
+        items = None
+    if items is not None and items.ndim == 1 and items.dtype.kind in 'biuf':
+        keys, codes = np.unique(items, return_inverse=True)
+        keys = keys.tolist()
+    else:
+        # Items are not numbers and are indexed one by one
+        index = {}
+        codes = np.fromiter((index.setdefault(k, len(index)) for k in trace),
+                            dtype=np.int64, count=n)
+        keys = list(index)
+    # Once positions are sorted by item, each position is followed by the
+    # position of the next request for the same item, if any
+    order = np.argsort(codes, kind='mergesort')
+    sorted_codes = codes[order]
+    same = sorted_codes[1:] == sorted_codes[:-1]
+    next_use = np.full(n, n, dtype=dtype)
+    next_use[order[:-1][same]] = order[1:][same]
+    starts = np.flatnonzero(np.concatenate(([True], ~same)))
+    first_use = dict(zip((keys[c] for c in sorted_codes[starts].tolist()),
+                         order[starts].tolist()))
+    return next_use, first_use
+
+
 @register_cache_policy('MIN')
 class BeladyMinCache(Cache):
     """Belady's MIN cache replacement policy
@@ -747,6 +1192,12 @@ class BeladyMinCache(Cache):
     This policy is not implementable in practice because it requires knowledge
     of future requests, however it is very useful as a theoretical performance
     upper bound.
+
+    The position of the next request for the same item of each request of the
+    trace is computed once when the cache is created. Items in cache are kept
+    in a max-heap ordered by the position of their next request, which is
+    updated lazily, so that replacement is executed in amortized logarithmic
+    time.
     """
 
     @inheritdoc(Cache)
@@ -763,12 +1214,15 @@ class BeladyMinCache(Cache):
         self._maxlen = int(maxlen)
         if self._maxlen <= 0:
             raise ValueError('maxlen must be positive')
-        self._next = defaultdict(deque)
-        for i, k in enumerate(trace):
-            self._next[k].append(i)
-        for k in self._next.values():
-            k.append(np.infty)
+        self._next_use, self._cursor = _next_use(trace)
+        # Position meaning that an item is never requested again
+        self._end = len(self._next_use)
+        # Dict mapping items in cache to the position of their next request
         self._cache = {}
+        # Heap of (-next request position, sequence number, item) entries,
+        # some of which may be stale
+        self._heap = []
+        self._seq = itertools.count()
 
     @inheritdoc(Cache)
     def __len__(self):
@@ -787,22 +1241,65 @@ class BeladyMinCache(Cache):
     def has(self, k, *args, **kwargs):
         return k in self._cache
 
+    def _next(self, k):
+        """Return the position of the next request for an item"""
+        return self._cursor.get(k, self._end)
+
+    def _push(self, k):
+        """Push the next request position of an item in cache to the heap"""
+        heapq.heappush(self._heap, (-self._cache[k], next(self._seq), k))
+        # Rebuild the heap when it holds too many stale entries
+        if len(self._heap) > 2 * len(self._cache) + 64:
+            self._heap = [(-i, next(self._seq), x) for x, i in self._cache.items()]
+            heapq.heapify(self._heap)
+
     @inheritdoc(Cache)
     def get(self, k, *args, **kwargs):
-        self._next[k].popleft()
-        return k in self._cache
+        i = self._next(k)
+        if i < self._end:
+            self._cursor[k] = int(self._next_use[i])
+        if k in self._cache:
+            self._cache[k] = self._next(k)
+            self._push(k)
+            return True
+        return False
 
     def put(self, k, *args, **kwargs):
-        if len(self) < self.maxlen:
-            self._cache[k] = self._next[k]
+        """Insert an item in the cache if not already inserted.
+
+        If the cache is full, the item is inserted only if it is requested
+        next before the item in cache requested next the latest, which is
+        evicted.
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to be inserted
+
+        Returns
+        -------
+        evicted : any hashable type
+            The evicted object or *None* if no contents were evicted.
+        """
+        if k in self._cache:
             return None
-        next_cache = max(self._cache, key=lambda k: self._cache[k][0])
-        if self._next[k][0] < self._next[next_cache][0]:
-            self._cache.pop(next_cache)
-            self._cache[k] = self._next[k]
-            return next_cache
-        else:
+        if len(self._cache) < self._maxlen:
+            self._cache[k] = self._next(k)
+            self._push(k)
             return None
+        heap = self._heap
+        # Discard stale entries
+        while heap[0][2] not in self._cache or \
+                self._cache[heap[0][2]] != -heap[0][0]:
+            heapq.heappop(heap)
+        i, _, evicted = heap[0]
+        if self._next(k) < -i:
+            heapq.heappop(heap)
+            self._cache.pop(evicted)
+            self._cache[k] = self._next(k)
+            self._push(k)
+            return evicted
+        return None
 
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
@@ -814,6 +1311,7 @@ class BeladyMinCache(Cache):
     @inheritdoc(Cache)
     def clear(self):
         self._cache.clear()
+        del self._heap[:]
 
 
 @register_cache_policy('LRU')
@@ -871,6 +1369,9 @@ class LruCache(Cache):
         """
         if not k in self._cache:
             raise ValueError('The item %s is not in the cache' % str(k))
+        # The index of positions is built only if positions are queried
+        if not isinstance(self._cache, IndexedLinkedSet):
+            self._cache = IndexedLinkedSet(self._cache)
         return self._cache.index(k)
 
     @inheritdoc(Cache)
@@ -910,6 +1411,27 @@ class LruCache(Cache):
         self._cache.append_top(k)
         return self._cache.pop_bottom() if len(self._cache) > self._maxlen else None
 
+    @inheritdoc(Cache)
+    def replay(self, keys, warmup=0):
+        if self._replay_overridden():
+            return Cache.replay(self, keys, warmup)
+        keys, hits = _replay_setup(keys, warmup)
+        cache = self._cache
+        contains = cache._map.__contains__
+        move_to_top = cache.move_to_top
+        append_top = cache.append_top
+        pop_bottom = cache.pop_bottom
+        maxlen = self._maxlen
+        for i, k in enumerate(keys):
+            if contains(k):
+                move_to_top(k)
+                hits[i] = 1
+            else:
+                append_top(k)
+                if len(cache) > maxlen:
+                    pop_bottom()
+        return _replay_hits(hits, warmup)
+
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
         if k not in self._cache:
@@ -1070,6 +1592,9 @@ class SegmentedLruCache(Cache):
         """
         if not k in self._cache:
             raise ValueError('The item %s is not in the cache' % str(k))
+        # The index of positions is built only if positions are queried
+        if not isinstance(self._segment[0], IndexedLinkedSet):
+            self._segment = [IndexedLinkedSet(s) for s in self._segment]
         seg = self._cache[k]
         position = self._segment[seg].index(k)
         return sum(len(self._segment[i]) for i in range(seg)) + position
@@ -1102,15 +1627,23 @@ class InCacheLfuCache(Cache):
     policy in which a counter is maintained also when the content is evicted.
 
     In-cache LFU performs better than LRU under IRM demands.
-    However, its implementation is computationally expensive since it
-    cannot be implemented in such a way that both search and replacement tasks
-    can be executed in constant time. This makes it particularly unfit for
-    large caches and line speed operations.
+
+    Among items requested the same number of times, the one inserted first is
+    evicted. Since an item is evicted only upon the insertion of a new item,
+    whose counter is 1, the evicted item is always the one inserted first
+    among those never requested since their insertion. These items are kept
+    in insertion order, so that both search and replacement are executed in
+    constant time.
     """
 
     @inheritdoc(Cache)
     def __init__(self, maxlen, *args, **kwargs):
+        # Dict mapping each item in cache to a (frequency, insertion time)
+        # tuple
         self._cache = {}
+        # Items never requested since insertion, i.e. with frequency 1, in
+        # order of insertion
+        self._freq1 = LinkedSet()
         self.t = 0
         self._maxlen = int(maxlen)
         if self._maxlen <= 0:
@@ -1137,6 +1670,8 @@ class InCacheLfuCache(Cache):
     def get(self, k, *args, **kwargs):
         if self.has(k):
             freq, t = self._cache[k]
+            if freq == 1:
+                self._freq1.remove(k)
             self._cache[k] = freq + 1, t
             return True
         else:
@@ -1147,8 +1682,9 @@ class InCacheLfuCache(Cache):
         if not self.has(k):
             self.t += 1
             self._cache[k] = (1, self.t)
+            self._freq1.append_top(k)
             if len(self._cache) > self._maxlen:
-                evicted = min(self._cache, key=lambda x: self._cache[x])
+                evicted = self._freq1.pop_bottom()
                 self._cache.pop(evicted)
                 return evicted
         return None
@@ -1156,7 +1692,9 @@ class InCacheLfuCache(Cache):
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
         if k in self._cache:
-            self._cache.pop(k)
+            freq, _ = self._cache.pop(k)
+            if freq == 1:
+                self._freq1.remove(k)
             return True
         else:
             return False
@@ -1164,6 +1702,7 @@ class InCacheLfuCache(Cache):
     @inheritdoc(Cache)
     def clear(self):
         self._cache.clear()
+        self._freq1.clear()
 
 
 
@@ -1181,22 +1720,125 @@ class PerfectLfuCache(Cache):
     counters for every item, even for those not in the cache.
 
     In contrast to LRU, Perfect-LFU has been shown to perform optimally under
-    IRM demands. However, its implementation is computationally expensive since
-    it cannot be implemented in such a way that both search and replacement
-    tasks can be executed in constant time. This makes it particularly unfit
-    for large caches and line speed operations.
+    IRM demands.
+
+    Among items requested the same number of times, the one requested first
+    is evicted. Items in cache are kept in a heap ordered by (frequency, time
+    of first request), which is updated lazily whenever their counter
+    changes, so that search is executed in constant time and replacement in
+    amortized logarithmic time.
+
+    Since counters are kept for all items ever requested, memory grows with
+    the number of distinct items. Alternatively, counters can be replaced by
+    a `CountMinSketch`, whose memory does not depend on the number of
+    items, with periodic aging as in TinyLFU. In this case, frequencies are
+    estimated and, among items with the same estimated frequency, the one
+    inserted first is evicted. The accuracy loss caused by the sketch is
+    measured on a bounded sample of items and returned by `sketch_error`.
     """
 
-    @inheritdoc(Cache)
-    def __init__(self, maxlen, *args, **kwargs):
+    def __init__(self, maxlen, sketch=False, sketch_width=None, sketch_depth=4,
+                 sketch_aging=None, error_sample=1024, *args, **kwargs):
+        """Constructor
+
+        Parameters
+        ----------
+        maxlen : int
+            The maximum number of items the cache can store
+        sketch : bool, optional
+            If *True*, frequencies are estimated by a count-min sketch rather
+            than counted exactly
+        sketch_width : int, optional
+            The number of counters of each row of the sketch. Default is 8
+            times the cache size
+        sketch_depth : int, optional
+            The number of rows of the sketch
+        sketch_aging : int, optional
+            The number of requests after which all sketch counters are
+            halved. Default is 10 times the cache size. If 0, counters are
+            never aged
+        error_sample : int, optional
+            The number of items whose exact frequency is tracked to measure
+            the accuracy of the sketch
+        """
         # Dict storing counter for all contents, not only those in cache
         self._counter = {}
         # Set storing only items currently in cache
         self._cache = set()
+        # Heap of (frequency, time, sequence number, item) entries of items in
+        # cache. Entries become stale when the counter of the item changes or
+        # the item leaves the cache and are discarded when they reach the top
+        self._heap = []
+        self._seq = itertools.count()
         self.t = 0
         self._maxlen = int(maxlen)
         if self._maxlen <= 0:
             raise ValueError('maxlen must be positive')
+        if sketch:
+            if sketch_width is None:
+                sketch_width = 8 * self._maxlen
+            if sketch_aging is None:
+                sketch_aging = 10 * self._maxlen
+            self._sketch = CountMinSketch(sketch_width, sketch_depth,
+                                          sketch_aging if sketch_aging > 0 else None)
+            # Insertion time of items in cache
+            self._time = {}
+            # Exact counters of a sample of items
+            self._sample = {}
+            self._error_sample = error_sample
+        else:
+            self._sketch = None
+
+    def _key(self, k):
+        """Return the (frequency, time) key according to which an item in
+        cache is evicted
+        """
+        if self._sketch is None:
+            return self._counter[k]
+        return self._sketch.estimate(k), self._time[k]
+
+    def _count(self, k):
+        """Record a request for an item when using a sketch"""
+        sample = self._sample
+        if k in sample:
+            sample[k] += 1
+        elif len(sample) < self._error_sample:
+            sample[k] = 1
+        if self._sketch.add(k):
+            # Counters were aged: age sampled counters in the same way and
+            # rebuild the heap since all keys changed
+            for x in sample:
+                sample[x] >>= 1
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [key + (next(self._seq), x)
+                      for x in self._cache for key in (self._key(x),)]
+        heapq.heapify(self._heap)
+
+    def sketch_error(self):
+        """Return the accuracy loss of the frequency sketch
+
+        The error is measured on a sample of items whose frequency is also
+        counted exactly.
+
+        Returns
+        -------
+        error : dict
+            Dictionary with the mean absolute error (*MEAN_ABS_ERROR*) and
+            mean relative error (*MEAN_REL_ERROR*) of estimated frequencies
+            and the number of sampled items (*N_SAMPLES*), or *None* if
+            frequencies are counted exactly
+        """
+        if self._sketch is None:
+            return None
+        errors = [(self._sketch.estimate(k) - count, count)
+                  for k, count in self._sample.items() if count > 0]
+        if not errors:
+            return {'MEAN_ABS_ERROR': 0.0, 'MEAN_REL_ERROR': 0.0, 'N_SAMPLES': 0}
+        return {'MEAN_ABS_ERROR': sum(e for e, _ in errors) / len(errors),
+                'MEAN_REL_ERROR': sum(e / c for e, c in errors) / len(errors),
+                'N_SAMPLES': len(errors)}
 
     @inheritdoc(Cache)
     def __len__(self):
@@ -1209,21 +1851,49 @@ class PerfectLfuCache(Cache):
 
     @inheritdoc(Cache)
     def dump(self):
-        return sorted(self._cache, key=lambda x: self._counter[x], reverse=True)
+        return sorted(self._cache, key=self._key, reverse=True)
 
     @inheritdoc(Cache)
     def has(self, k, *args, **kwargs):
         return k in self._cache
 
+    def _push(self, k):
+        """Push the current counter of an item in cache to the heap"""
+        freq, t = self._key(k)
+        heapq.heappush(self._heap, (freq, t, next(self._seq), k))
+        # Rebuild the heap when it holds too many stale entries
+        if len(self._heap) > 2 * len(self._cache) + 64:
+            self._rebuild_heap()
+
+    def _pop_lfu(self):
+        """Remove and return the least frequently used item in cache"""
+        while True:
+            freq, t, _, k = heapq.heappop(self._heap)
+            if k not in self._cache:
+                continue
+            key = self._key(k)
+            if key == (freq, t):
+                self._cache.remove(k)
+                if self._sketch is not None:
+                    del self._time[k]
+                return k
+            if self._sketch is not None and key[1] == t:
+                # The estimated frequency has grown because of collisions
+                # with other items in the sketch
+                heapq.heappush(self._heap, key + (next(self._seq), k))
+
     @inheritdoc(Cache)
     def get(self, k, *args, **kwargs):
         self.t += 1
-        if k in self._counter:
+        if self._sketch is not None:
+            self._count(k)
+        elif k in self._counter:
             freq, t = self._counter[k]
             self._counter[k] = freq + 1, t
         else:
             self._counter[k] = 1, self.t
         if self.has(k):
+            self._push(k)
             return True
         else:
             return False
@@ -1231,24 +1901,30 @@ class PerfectLfuCache(Cache):
     @inheritdoc(Cache)
     def put(self, k, *args, **kwargs):
         if not self.has(k):
-            if k in self._counter:
-                freq, t = self._counter[k]
-                self._counter[k] = (freq + 1, t)
+            if self._sketch is not None:
+                self._time[k] = self.t
+                self._cache.add(k)
+                self._count(k)
             else:
-                # If I always call a get before a put, this line should never
-                # be executed
-                self._counter[k] = (1, self.t)
-            self._cache.add(k)
+                if k in self._counter:
+                    freq, t = self._counter[k]
+                    self._counter[k] = (freq + 1, t)
+                else:
+                    # If I always call a get before a put, this line should
+                    # never be executed
+                    self._counter[k] = (1, self.t)
+                self._cache.add(k)
+            self._push(k)
             if len(self._cache) > self._maxlen:
-                evicted = min(self._cache, key=lambda x: self._counter[x])
-                self._cache.remove(evicted)
-                return evicted
+                return self._pop_lfu()
         return None
 
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
         if k in self._cache:
-            self._cache.pop(k)
+            self._cache.remove(k)
+            if self._sketch is not None:
+                del self._time[k]
             return True
         else:
             return False
@@ -1257,6 +1933,198 @@ class PerfectLfuCache(Cache):
     def clear(self):
         self._cache.clear()
         self._counter.clear()
+        del self._heap[:]
+        if self._sketch is not None:
+            self._sketch.clear()
+            self._time.clear()
+            self._sample.clear()
+
+
+@register_cache_policy('W_TINYLFU')
+class WTinyLfuCache(Cache):
+    """Window TinyLFU (W-TinyLFU) cache implementation [1]_
+
+    The cache space is divided into a small window region and a main region.
+    Items are inserted in the window, which operates according to an LRU
+    policy. Items evicted from the window are candidates for admission to
+    the main region, which operates according to an SLRU policy with a
+    probationary and a protected segment. If the main region is full, a
+    candidate is admitted only if its frequency is greater than the
+    frequency of the least recently used item of the probationary segment,
+    which is evicted in its place. Otherwise, the candidate is evicted.
+
+    Item frequencies are estimated by a `CountMinSketch` recording all
+    requests, i.e. calls to `get`, and periodically aged, so that memory
+    does not depend on the number of distinct items requested. All
+    operations are executed in constant time.
+
+    References
+    ----------
+    .. [1] G. Einziger, R. Friedman, B. Manes, TinyLFU: A Highly Efficient
+           Cache Admission Policy, ACM Transactions on Storage, 2017
+    """
+
+    # Identifiers of the regions in which items are located
+    _WINDOW, _PROBATION, _PROTECTED = range(3)
+
+    def __init__(self, maxlen, window=0.01, protected=0.8, sketch_width=None,
+                 sketch_depth=4, sketch_aging=None, *args, **kwargs):
+        """Constructor
+
+        Parameters
+        ----------
+        maxlen : int
+            The maximum number of items the cache can store
+        window : float, optional
+            The fraction of caching space allocated to the window region
+        protected : float, optional
+            The fraction of the main region allocated to the protected segment
+        sketch_width : int, optional
+            The number of counters of each row of the frequency sketch.
+            Default is 4 times the cache size
+        sketch_depth : int, optional
+            The number of rows of the frequency sketch
+        sketch_aging : int, optional
+            The number of requests after which all sketch counters are
+            halved. Default is 10 times the cache size
+        """
+        self._maxlen = int(maxlen)
+        if self._maxlen <= 0:
+            raise ValueError('maxlen must be positive')
+        if not 0 <= window < 1:
+            raise ValueError('window must be in [0, 1)')
+        if not 0 <= protected <= 1:
+            raise ValueError('protected must be in [0, 1]')
+        # The main region stores at least one item
+        self._window_maxlen = min(int(round(window * self._maxlen)),
+                                  self._maxlen - 1)
+        self._main_maxlen = self._maxlen - self._window_maxlen
+        self._protected_maxlen = int(round(protected * self._main_maxlen))
+        if sketch_width is None:
+            sketch_width = 4 * self._maxlen
+        if sketch_aging is None:
+            sketch_aging = 10 * self._maxlen
+        self._sketch = CountMinSketch(sketch_width, sketch_depth, sketch_aging)
+        self._segment = [LinkedSet() for _ in range(3)]
+        # Map each item in cache to the region in which it is located
+        self._cache = {}
+
+    @inheritdoc(Cache)
+    def __len__(self):
+        return len(self._cache)
+
+    @property
+    @inheritdoc(Cache)
+    def maxlen(self):
+        return self._maxlen
+
+    @inheritdoc(Cache)
+    def has(self, k, *args, **kwargs):
+        return k in self._cache
+
+    def _hit(self, k):
+        """Update the position of an item in cache after a hit"""
+        seg = self._cache[k]
+        if seg == self._PROBATION:
+            self._segment[seg].remove(k)
+            protected = self._segment[self._PROTECTED]
+            protected.append_top(k)
+            self._cache[k] = self._PROTECTED
+            if len(protected) > self._protected_maxlen:
+                demoted = protected.pop_bottom()
+                self._segment[self._PROBATION].append_top(demoted)
+                self._cache[demoted] = self._PROBATION
+        else:
+            self._segment[seg].move_to_top(k)
+
+    @inheritdoc(Cache)
+    def get(self, k, *args, **kwargs):
+        self._sketch.add(k)
+        if k not in self._cache:
+            return False
+        self._hit(k)
+        return True
+
+    def put(self, k, *args, **kwargs):
+        """Insert an item in the cache if not already inserted.
+
+        If the element is already present in the cache, it is updated as if
+        it was hit.
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to be inserted
+
+        Returns
+        -------
+        evicted : any hashable type
+            The evicted object or *None* if no contents were evicted. The
+            evicted object may be the inserted item itself if it is not
+            admitted.
+        """
+        if k in self._cache:
+            self._hit(k)
+            return None
+        window = self._segment[self._WINDOW]
+        window.append_top(k)
+        self._cache[k] = self._WINDOW
+        if len(window) <= self._window_maxlen:
+            return None
+        candidate = window.pop_bottom()
+        probation = self._segment[self._PROBATION]
+        if len(self._cache) <= self._maxlen:
+            # There is still space in the main region
+            probation.append_top(candidate)
+            self._cache[candidate] = self._PROBATION
+            return None
+        # Items are demoted to the probationary segment only when the
+        # protected segment is full, so the probationary segment may be empty
+        # if the protected segment takes all space of the main region
+        victim = probation.bottom if len(probation) > 0 \
+                 else self._segment[self._PROTECTED].bottom
+        if self._sketch.estimate(candidate) > self._sketch.estimate(victim):
+            self._segment[self._cache.pop(victim)].remove(victim)
+            probation.append_top(candidate)
+            self._cache[candidate] = self._PROBATION
+            return victim
+        self._cache.pop(candidate)
+        return candidate
+
+    @inheritdoc(Cache)
+    def remove(self, k, *args, **kwargs):
+        if k not in self._cache:
+            return False
+        seg = self._cache.pop(k)
+        self._segment[seg].remove(k)
+        return True
+
+    def dump(self, serialized=True):
+        """Return a dump of all the elements currently in the cache.
+
+        Parameters
+        ----------
+        serialized : bool, optional
+            If *True*, return a single list of items of the window region,
+            the protected segment and the probationary segment, each sorted
+            from the most to the least recently used. Otherwise, return a
+            list of one such list per region or segment
+
+        Returns
+        -------
+        cache_dump : list
+            The dump of the cache
+        """
+        dump = [list(self._segment[seg]) for seg in
+                (self._WINDOW, self._PROTECTED, self._PROBATION)]
+        return sum(dump, []) if serialized else dump
+
+    @inheritdoc(Cache)
+    def clear(self):
+        self._cache.clear()
+        for s in self._segment:
+            s.clear()
+        self._sketch.clear()
 
 
 @register_cache_policy('FIFO')
@@ -1273,9 +2141,8 @@ class FifoCache(Cache):
 
     @inheritdoc(Cache)
     def __init__(self, maxlen, *args, **kwargs):
-        self._cache = set()
+        self._cache = LinkedSet()
         self._maxlen = int(maxlen)
-        self._d = deque()
         if self._maxlen <= 0:
             raise ValueError('maxlen must be positive')
 
@@ -1290,7 +2157,7 @@ class FifoCache(Cache):
 
     @inheritdoc(Cache)
     def dump(self):
-        return list(self._d)
+        return list(iter(self._cache))
 
     @inheritdoc(Cache)
     def has(self, k, *args, **kwargs):
@@ -1314,12 +2181,12 @@ class FifoCache(Cache):
         position : int
             The current position of the item in the cache
         """
-        i = 0
-        for c in self._d:
-            if c == k:
-                return i
-            i += 1
-        raise ValueError('The item %s is not in the cache' % str(k))
+        if not k in self._cache:
+            raise ValueError('The item %s is not in the cache' % str(k))
+        # The index of positions is built only if positions are queried
+        if not isinstance(self._cache, IndexedLinkedSet):
+            self._cache = IndexedLinkedSet(self._cache)
+        return self._cache.index(k)
 
     @inheritdoc(Cache)
     def get(self, k, *args, **kwargs):
@@ -1329,18 +2196,34 @@ class FifoCache(Cache):
     def put(self, k, *args, **kwargs):
         evicted = None
         if not self.has(k):
-            self._cache.add(k)
-            self._d.appendleft(k)
+            self._cache.append_top(k)
         if len(self._cache) > self.maxlen:
-            evicted = self._d.pop()
-            self._cache.remove(evicted)
+            evicted = self._cache.pop_bottom()
         return evicted
 
+    @inheritdoc(Cache)
+    def replay(self, keys, warmup=0):
+        if self._replay_overridden():
+            return Cache.replay(self, keys, warmup)
+        keys, hits = _replay_setup(keys, warmup)
+        cache = self._cache
+        contains = cache._map.__contains__
+        append_top = cache.append_top
+        pop_bottom = cache.pop_bottom
+        maxlen = self._maxlen
+        for i, k in enumerate(keys):
+            if contains(k):
+                hits[i] = 1
+            else:
+                append_top(k)
+                if len(cache) > maxlen:
+                    pop_bottom()
+        return _replay_hits(hits, warmup)
+
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
         if k in self._cache:
             self._cache.remove(k)
-            self._d.remove(k)
             return True
         else:
             return False
@@ -1348,7 +2231,6 @@ class FifoCache(Cache):
     @inheritdoc(Cache)
     def clear(self):
         self._cache.clear()
-        self._d.clear()
 
 
 @register_cache_policy('CLIMB')
@@ -1400,6 +2282,9 @@ class ClimbCache(Cache):
         """
         if not k in self._cache:
             raise ValueError('The item %s is not in the cache' % str(k))
+        # The index of positions is built only if positions are queried
+        if not isinstance(self._cache, IndexedLinkedSet):
+            self._cache = IndexedLinkedSet(self._cache)
         return self._cache.index(k)
 
     @inheritdoc(Cache)
@@ -1473,17 +2358,30 @@ class RandEvictionCache(Cache):
     achieves the same cache hit ratio of the FIFO replacement policy.
     """
 
-    @inheritdoc(Cache)
-    def __init__(self, maxlen, *args, **kwargs):
+    def __init__(self, maxlen, seed=None, *args, **kwargs):
+        """Constructor
+
+        Parameters
+        ----------
+        maxlen : int
+            The maximum number of items the cache can store
+        seed : any hashable type, optional
+            If not *None*, items to evict are selected by a dedicated random
+            number generator initialized with this seed. Otherwise, the
+            global random number generator is used
+        """
         self._maxlen = int(maxlen)
         if self._maxlen <= 0:
             raise ValueError('maxlen must be positive')
-        self._cache = set()
-        self._a = [None for _ in range(self._maxlen)]
+        self._random = random.Random(seed) if seed is not None else random
+        # Items in cache, stored contiguously
+        self._a = []
+        # Dict mapping each item in cache to its position in self._a
+        self._pos = {}
 
     @inheritdoc(Cache)
     def __len__(self):
-        return len(self._cache)
+        return len(self._a)
 
     @property
     def maxlen(self):
@@ -1491,11 +2389,11 @@ class RandEvictionCache(Cache):
 
     @inheritdoc(Cache)
     def dump(self):
-        return list(self._cache)
+        return list(self._a)
 
     @inheritdoc(Cache)
     def has(self, k, *args, **kwargs):
-        return k in self._cache
+        return k in self._pos
 
     @inheritdoc(Cache)
     def get(self, k, *args, **kwargs):
@@ -1505,29 +2403,55 @@ class RandEvictionCache(Cache):
     def put(self, k, *args, **kwargs):
         evicted = None
         if not self.has(k):
-            if len(self._cache) == self._maxlen:
-                evicted_index = random.randint(0, self.maxlen - 1)
+            if len(self._a) == self._maxlen:
+                evicted_index = self._random.randint(0, self.maxlen - 1)
                 evicted = self._a[evicted_index]
                 self._a[evicted_index] = k
-                self._cache.remove(evicted)
+                self._pos[k] = evicted_index
+                del self._pos[evicted]
             else:
-                self._a[len(self._cache)] = k
-            self._cache.add(k)
+                self._pos[k] = len(self._a)
+                self._a.append(k)
         return evicted
 
+    @inheritdoc(Cache)
+    def replay(self, keys, warmup=0):
+        if self._replay_overridden():
+            return Cache.replay(self, keys, warmup)
+        keys, hits = _replay_setup(keys, warmup)
+        a = self._a
+        pos = self._pos
+        randint = self._random.randint
+        maxlen = self._maxlen
+        for i, k in enumerate(keys):
+            if k in pos:
+                hits[i] = 1
+            elif len(a) == maxlen:
+                j = randint(0, maxlen - 1)
+                del pos[a[j]]
+                a[j] = k
+                pos[k] = j
+            else:
+                pos[k] = len(a)
+                a.append(k)
+        return _replay_hits(hits, warmup)
+
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
-        if k not in self._cache:
+        if k not in self._pos:
             return False
-        index = self._a.index(k)
-        self._a[index] = self._a[len(self._cache) - 1]
-        self._a[len(self._cache) - 1] = None
-        self._cache.remove(k)
+        # Fill the slot of the removed item with the last item
+        index = self._pos.pop(k)
+        last = self._a.pop()
+        if index < len(self._a):
+            self._a[index] = last
+            self._pos[last] = index
         return True
 
     @inheritdoc(Cache)
     def clear(self):
-        self._cache.clear()
+        del self._a[:]
+        self._pos.clear()
 
 
 def insert_after_k_hits_cache(cache, k=2, memory=None):
@@ -1821,6 +2745,10 @@ def ttl_cache(cache, f_time):
     However, if other operations like *position* or *len* are executed,
     results may take into account also expired items. In such cases, it is then
     advisable to execute a *purge* first.
+
+    Expiration times are indexed by a heap whose entries are invalidated
+    lazily, so that inserting an item takes logarithmic time and purging
+    takes logarithmic time per expired item.
     """
     if not isinstance(cache, Cache):
         raise TypeError('cache must be an instance of Cache or its subclasses')
@@ -1833,7 +2761,11 @@ def ttl_cache(cache, f_time):
     cache.f_time = f_time
     cache.expiry = {}
 
-    cache._exp_list = LinkedSet()
+    # Heap of (expiration time, sequence number, item) entries. Entries of
+    # items evicted, removed or whose expiration time changed are stale and
+    # are skipped when popped
+    cache._exp_heap = []
+    seq = itertools.count()
 
     c_put = cache.put
     c_get = cache.get
@@ -1850,11 +2782,20 @@ def ttl_cache(cache, f_time):
         expiry : float
             Cutoff expiration time
         """
-        while cache._exp_list.bottom is not None and \
-              cache.expiry[cache._exp_list.bottom] < expiry:
-            expired = cache._exp_list.pop_bottom()
-            cache.expiry.pop(expired)
-            c_remove(expired)
+        heap = cache._exp_heap
+        while heap and heap[0][0] < expiry:
+            expires, _, expired = heapq.heappop(heap)
+            if cache.expiry.get(expired) == expires:
+                cache.expiry.pop(expired)
+                c_remove(expired)
+
+    def _push(k, expires):
+        """Index the expiration time of an item"""
+        heapq.heappush(cache._exp_heap, (expires, next(seq), k))
+        # Rebuild the heap when it holds too many stale entries
+        if len(cache._exp_heap) > 2 * len(cache.expiry) + 64:
+            cache._exp_heap = [(e, next(seq), x) for x, e in cache.expiry.items()]
+            heapq.heapify(cache._exp_heap)
 
     def purge():
         """Purge all expired items"""
@@ -1862,7 +2803,8 @@ def ttl_cache(cache, f_time):
 
     def get(k, *args, **kwargs):
         if c_get(k):
-            if cache.f_time() < cache.expiry[k]:
+            expires = cache.expiry[k]
+            if expires == np.infty or cache.f_time() < expires:
                 return True
             else:
                 remove(k)
@@ -1911,29 +2853,20 @@ def ttl_cache(cache, f_time):
         evicted = c_put(k)
         if evicted is not None:
             cache.expiry.pop(evicted)
-            cache._exp_list.remove(evicted)
         if k not in cache.expiry or cache.expiry[k] < expires:
             cache.expiry[k] = expires
-            if k in cache._exp_list:
-                cache._exp_list.remove(k)
-            if len(cache._exp_list) == 0:
-                cache._exp_list.append_top(k)
-            else:
-                for i in cache._exp_list:
-                    if expires >= cache.expiry[i]:
-                        cache._exp_list.insert_above(i, k)
-                        break
-                else:
-                    cache._exp_list.append_bottom(k)
+            _push(k, expires)
         return evicted
 
     def has(k, *args, **kwargs):
-        return c_has(k) and cache.f_time() <= cache.expiry[k]
+        if not c_has(k):
+            return False
+        expires = cache.expiry[k]
+        return expires == np.infty or cache.f_time() <= expires
 
     def remove(k, *args, **kwargs):
         c_remove(k)
         cache.expiry.pop(k)
-        cache._exp_list.remove(k)
 
     def dump():
         """Return a dump of all the elements currently in the cache possibly
@@ -1952,7 +2885,7 @@ def ttl_cache(cache, f_time):
     def clear():
         c_clear()
         cache.expiry.clear()
-        cache._exp_list.clear()
+        del cache._exp_heap[:]
 
     cache._purge_till = _purge_till
 
@@ -0,0 +1,113 @@
+from __future__ import division
+import unittest
+import random
+
+import icarus.models as cache
+from icarus.registry import CACHE_POLICY
+
+
+class TestArrayLinkedLists(unittest.TestCase):
+
+    def test_lists(self):
+        c = cache.ArrayLinkedLists(4, lists=2)
+        for k in (1, 2, 3):
+            c.append_top(k)
+        c.append_top(10, 1)
+        self.assertEqual(4, len(c))
+        self.assertEqual([3, 2, 1], c.items(0))
+        self.assertEqual([10], c.items(1))
+        self.assertRaises(ValueError, c.append_top, 4)
+        self.assertRaises(KeyError, c.append_top, 1, 1)
+        c.move_to_top(1)
+        self.assertEqual([1, 3, 2], c.items(0))
+        c.move_to_top(3, 1)
+        self.assertEqual([1, 2], c.items(0))
+        self.assertEqual([3, 10], c.items(1))
+        self.assertEqual(1, c.list_of(3))
+        self.assertEqual(1, c.index(10))
+        self.assertEqual(10, c.bottom(1))
+        self.assertEqual(2, c.pop_bottom())
+        self.assertNotIn(2, c)
+        c.remove(3)
+        self.assertRaises(KeyError, c.remove, 3)
+        self.assertEqual([10], c.items(1))
+        self.assertEqual(2, c.length(0) + c.length(1))
+        c.clear()
+        self.assertEqual(0, len(c))
+        self.assertEqual([], c.items(0))
+        self.assertNotIn(1, c)
+        self.assertNotIn(-1, c)
+        self.assertIsNone(c.pop_bottom())
+
+    def test_hash_collisions(self):
+        # Items colliding in the hash table are removed in arbitrary order
+        rand = random.Random(0)
+        c = cache.ArrayLinkedLists(16)
+        items = set()
+        for _ in range(2000):
+            k = rand.randint(0, 40) * 2**20
+            if k in items:
+                c.remove(k)
+                items.remove(k)
+            elif len(items) < 16:
+                c.append_top(k)
+                items.add(k)
+            self.assertEqual(items, set(c.items(0)))
+            for k in range(0, 41 * 2**20, 2**20):
+                self.assertEqual(k in items, k in c)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, cache.ArrayLinkedLists, 0)
+        c = cache.ArrayLinkedLists(2)
+        self.assertRaises(ValueError, c.append_top, -1)
+
+
+class TestArrayCaches(unittest.TestCase):
+
+    def assert_equivalent(self, policy, array_policy, **params):
+        rand = random.Random(0)
+        for maxlen in (1, 3, 20):
+            c = CACHE_POLICY[policy](maxlen, **params)
+            a = CACHE_POLICY[array_policy](maxlen, **params)
+            for _ in range(3000):
+                k = rand.randint(0, 3 * maxlen) * rand.choice((1, 7919))
+                op = rand.random()
+                if op < 0.45:
+                    self.assertEqual(c.get(k), a.get(k))
+                elif op < 0.9:
+                    self.assertEqual(c.put(k), a.put(k))
+                elif op < 0.98:
+                    self.assertEqual(c.remove(k), a.remove(k))
+                    self.assertEqual(len(c), len(a))
+                else:
+                    self.assertEqual(c.dump(), a.dump())
+                    for k in c.dump():
+                        self.assertEqual(c.position(k), a.position(k))
+            c.clear()
+            a.clear()
+            self.assertEqual([], a.dump())
+            self.assertEqual(0, len(a))
+
+    def test_lru(self):
+        self.assert_equivalent('LRU', 'LRU_ARRAY')
+
+    def test_fifo(self):
+        self.assert_equivalent('FIFO', 'FIFO_ARRAY')
+
+    def test_slru(self):
+        self.assert_equivalent('SLRU', 'SLRU_ARRAY', segments=1)
+        rand = random.Random(1)
+        c = cache.SegmentedLruCache(20, segments=3, alloc=[0.2, 0.3, 0.5])
+        a = cache.SlruArrayCache(20, segments=3, alloc=[0.2, 0.3, 0.5])
+        for _ in range(5000):
+            k = rand.randint(0, 60)
+            self.assertEqual(c.get(k), a.get(k))
+            self.assertEqual(c.put(k), a.put(k))
+        self.assertEqual(c.dump(serialized=False), a.dump(serialized=False))
+        for k in c.dump():
+            self.assertEqual(c.position(k), a.position(k))
+
+    def test_slru_invalid(self):
+        self.assertRaises(ValueError, cache.SlruArrayCache, 0)
+        self.assertRaises(ValueError, cache.SlruArrayCache, 2, segments=3)
+        self.assertRaises(ValueError, cache.SlruArrayCache, 10, alloc=[0.5, 0.6])
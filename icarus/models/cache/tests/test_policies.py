@@ -1,10 +1,18 @@
 from __future__ import division
 import unittest
 import collections
+import itertools
+import random
 
 import numpy as np
 
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
 import icarus.models as cache
+from icarus.registry import CACHE_POLICY
 
 class TestLinkedSet(unittest.TestCase):
 
@@ -213,6 +221,111 @@ class TestLinkedSet(unittest.TestCase):
         self.assertIsNotNone(cache.LinkedSet(iterable=[1, 0, None]))
 
 
+class TestIndexedLinkedSet(unittest.TestCase):
+
+    def assert_consistent(self, linked_set, expected):
+        self.assertEqual(expected, list(linked_set))
+        self.assertEqual(expected[::-1], list(reversed(linked_set)))
+        for i, k in enumerate(expected):
+            self.assertEqual(i, linked_set.index(k))
+
+    def test_init(self):
+        c = cache.IndexedLinkedSet([3, 1, 2])
+        self.assert_consistent(c, [3, 1, 2])
+        c = cache.IndexedLinkedSet(cache.LinkedSet(range(100)))
+        self.assert_consistent(c, list(range(100)))
+        self.assertRaises(KeyError, c.index, 100)
+
+    def test_random_operations(self):
+        rand = random.Random(0)
+        c = cache.IndexedLinkedSet()
+        expected = []
+        inserted = itertools.count(1)
+        for _ in range(3000):
+            op = rand.randint(0, 9)
+            if op < 2 or not expected:
+                k = rand.randint(1, 10 ** 6)
+                if k in expected:
+                    continue
+                if op == 0:
+                    c.append_top(k)
+                    expected.insert(0, k)
+                else:
+                    c.append_bottom(k)
+                    expected.append(k)
+                continue
+            i = rand.randrange(len(expected))
+            k = expected[i]
+            if op == 2:
+                c.move_to_top(k)
+                expected.insert(0, expected.pop(i))
+            elif op == 3:
+                c.move_to_bottom(k)
+                expected.append(expected.pop(i))
+            elif op == 4:
+                c.move_up(k)
+                if i > 0:
+                    expected[i - 1], expected[i] = expected[i], expected[i - 1]
+            elif op == 5:
+                c.move_down(k)
+                if i < len(expected) - 1:
+                    expected[i + 1], expected[i] = expected[i], expected[i + 1]
+            elif op == 6:
+                c.remove(k)
+                expected.pop(i)
+            elif op == 7:
+                self.assertEqual(expected.pop(), c.pop_bottom())
+            elif op == 8:
+                self.assertEqual(expected.pop(0), c.pop_top())
+            else:
+                new = -next(inserted)
+                c.insert_above(k, new)
+                expected.insert(i, new)
+            if k in expected:
+                self.assertEqual(expected.index(k), c.index(k))
+        self.assert_consistent(c, expected)
+        c.clear()
+        self.assert_consistent(c, [])
+        c.append_bottom(1)
+        self.assert_consistent(c, [1])
+
+
+@unittest.skipIf(tracemalloc is None, 'tracemalloc not available')
+class TestMemoryFootprint(unittest.TestCase):
+
+    def entry_size(self, policy, n=10000):
+        # Items are created beforehand because they are not part of the
+        # overhead of the cache
+        items = list(range(10 ** 6, 10 ** 6 + n))
+        tracemalloc.start()
+        try:
+            c = CACHE_POLICY[policy](n)
+            for k in items:
+                # Second insertion fills all segments of SLRU caches
+                c.put(k)
+                c.put(k)
+            size = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(n, len(c))
+        return size / n
+
+    def test_linked_set_node(self):
+        c = cache.LinkedSet([1])
+        self.assertFalse(hasattr(c._top, '__dict__'))
+        self.assertFalse(hasattr(c, '__dict__'))
+        c = cache.IndexedLinkedSet([1])
+        self.assertFalse(hasattr(c._top, '__dict__'))
+        self.assertFalse(hasattr(c, '__dict__'))
+
+    def test_entry_size(self):
+        # One node with three references and one dictionary entry per item,
+        # plus one more dictionary entry mapping items to segments in SLRU
+        for policy, size in (('LRU', 100), ('FIFO', 100), ('CLIMB', 100),
+                             ('SLRU', 160)):
+            self.assertLess(self.entry_size(policy), size)
+
+
 class TestCache(unittest.TestCase):
 
     def test_do(self):
@@ -240,6 +353,37 @@ class TestCache(unittest.TestCase):
         self.assertFalse(c.do('GET', 2))
         self.assertEquals(c.dump(), [])
 
+    def test_replay(self):
+        rand = random.Random(0)
+        keys = [rand.randint(0, 30) for _ in range(2000)]
+        for policy, params in (('LRU', {}), ('FIFO', {}), ('SLRU', {}),
+                               ('CLIMB', {}), ('RAND', {'seed': 3}),
+                               ('LRU_ARRAY', {})):
+            c = CACHE_POLICY[policy](10, **params)
+            expected = []
+            for k in keys:
+                hit = c.get(k)
+                if not hit:
+                    c.put(k)
+                expected.append(hit)
+            r = CACHE_POLICY[policy](10, **params)
+            hits = r.replay(np.array(keys), warmup=500)
+            self.assertEqual(1500, len(hits))
+            self.assertEqual(expected[500:], hits.tolist())
+            self.assertEqual(c.dump(), r.dump())
+
+    def test_replay_wrapped(self):
+        c = cache.insert_after_k_hits_cache(cache.LruCache(2), k=2)
+        self.assertEqual([False, False, True, True],
+                         c.replay([1, 1, 1, 1]).tolist())
+        c = cache.ttl_cache(cache.FifoCache(2), lambda: 0)
+        self.assertEqual([False, True], c.replay(iter([1, 1])).tolist())
+
+    def test_replay_invalid_warmup(self):
+        c = cache.LruCache(2)
+        self.assertRaises(ValueError, c.replay, [1, 2], warmup=3)
+        self.assertRaises(ValueError, c.replay, [1, 2], warmup=-1)
+
 
 class TestMinCache(unittest.TestCase):
 
@@ -275,6 +419,40 @@ class TestMinCache(unittest.TestCase):
             self.assertIsNone(c.put(i))
             self.assertEqual(set(range(min(i + 1, size))), set(c.dump()))
 
+    def test_next_use(self):
+        next_use, first_use = cache.policies._next_use([1, 2, 1, 3, 2, 1])
+        np.testing.assert_array_equal([2, 4, 5, 6, 6, 6], next_use)
+        self.assertEqual({1: 0, 2: 1, 3: 3}, first_use)
+        next_use, first_use = cache.policies._next_use(['a', (1, 2), 'a'])
+        np.testing.assert_array_equal([2, 3, 3], next_use)
+        self.assertEqual({'a': 0, (1, 2): 1}, first_use)
+
+    def test_optimal(self):
+        trace = [1, 2, 3, 1, 2, 4, 1, 2, 3, 4, 5, 3, 4, 5]
+        c = cache.BeladyMinCache(3, iter(trace))
+        hits = 0
+        for k in trace:
+            if c.get(k):
+                hits += 1
+            else:
+                c.put(k)
+        self.assertEqual(8, hits)
+        self.assertEqual({3, 4, 5}, set(c.dump()))
+
+    def test_remove(self):
+        trace = [1, 2, 3, 1, 3]
+        c = cache.BeladyMinCache(2, trace)
+        for k in (1, 2):
+            c.get(k)
+            c.put(k)
+        self.assertTrue(c.remove(1))
+        self.assertFalse(c.remove(1))
+        c.get(3)
+        self.assertIsNone(c.put(3))
+        self.assertEqual({2, 3}, set(c.dump()))
+        c.clear()
+        self.assertEqual(0, len(c))
+
 
 class TestLruCache(unittest.TestCase):
 
@@ -331,6 +509,26 @@ class TestLruCache(unittest.TestCase):
         self.assertEqual(c.position(3), 2)
         self.assertEqual(c.position(4), 3)
 
+class TestPosition(unittest.TestCase):
+
+    def test_position(self):
+        rand = random.Random(0)
+        for policy in ('LRU', 'FIFO', 'SLRU', 'CLIMB'):
+            c = CACHE_POLICY[policy](20)
+            for i in range(2000):
+                k = rand.randint(0, 40)
+                if not c.get(k):
+                    c.put(k)
+                if i % 50 == 0 and rand.random() < 0.5:
+                    c.remove(rand.randint(0, 40))
+                if i > 1000:
+                    # Positions are indexed after the first query
+                    dump = c.dump()
+                    for k in dump:
+                        self.assertEqual(dump.index(k), c.position(k))
+            self.assertRaises(ValueError, c.position, 41)
+
+
 class TestSlruCache(unittest.TestCase):
 
     def test_alloc(self):
@@ -610,6 +808,39 @@ class TestRandCache(unittest.TestCase):
             self.assertTrue(c.has(v))
 
 
+    def test_remove_consistency(self):
+        c = cache.RandEvictionCache(10, seed=1)
+        for k in range(10):
+            c.put(k)
+        for k in (0, 9, 4, 4, 11):
+            c.remove(k)
+        self.assertEqual(7, len(c))
+        self.assertEqual({1, 2, 3, 5, 6, 7, 8}, set(c.dump()))
+        for k, i in c._pos.items():
+            self.assertEqual(k, c._a[i])
+        for k in range(20, 23):
+            self.assertIsNone(c.put(k))
+        self.assertIsNotNone(c.put(23))
+        self.assertEqual(10, len(c))
+        self.assertEqual(10, len(set(c.dump())))
+
+    def test_clear(self):
+        c = cache.RandEvictionCache(3)
+        for k in (1, 2, 3):
+            c.put(k)
+        c.clear()
+        self.assertEqual([], c.dump())
+        for k in (4, 5, 6):
+            self.assertIsNone(c.put(k))
+        self.assertEqual({4, 5, 6}, set(c.dump()))
+
+    def test_seed(self):
+        def evictions(seed):
+            c = cache.RandEvictionCache(5, seed=seed)
+            return [c.put(k) for k in range(100)]
+        self.assertEqual(evictions(3), evictions(3))
+        self.assertNotEqual(evictions(3), evictions(4))
+
 class TestInCacheLfuCache(unittest.TestCase):
 
     def test_lfu(self):
@@ -640,6 +871,34 @@ class TestInCacheLfuCache(unittest.TestCase):
         self.assertEquals(len(c), 0)
         self.assertEquals(c.dump(), [])
 
+    def test_tie_break(self):
+        c = cache.InCacheLfuCache(3)
+        c.put(1)
+        c.put(2)
+        c.put(3)
+        c.get(1)
+        c.get(2)
+        # 3 is the only item requested once
+        self.assertEquals(c.put(4), 3)
+        # 4 was inserted after 1 and 2 were requested, so it is evicted
+        c.get(1)
+        c.get(2)
+        self.assertEquals(c.put(5), 4)
+        c.get(5)
+        # 1, 2 and 5 have been requested twice, 6 was inserted last
+        self.assertEquals(c.put(6), 6)
+        self.assertEquals(c.dump(), [2, 1, 5])
+
+    def test_remove(self):
+        c = cache.InCacheLfuCache(2)
+        c.put(1)
+        c.put(2)
+        self.assertTrue(c.remove(1))
+        self.assertFalse(c.remove(1))
+        c.put(3)
+        self.assertEquals(c.put(4), 2)
+        self.assertEquals(c.dump(), [4, 3])
+
 
 class TestPerfectLfuCache(unittest.TestCase):
 
@@ -693,6 +952,210 @@ class TestPerfectLfuCache(unittest.TestCase):
         self.assertEquals(len(c), 0)
         self.assertEquals(c.dump(), [])
 
+    def test_remove(self):
+        c = cache.PerfectLfuCache(2)
+        for k in (1, 2):
+            c.get(k)
+            c.put(k)
+        self.assertTrue(c.remove(1))
+        self.assertFalse(c.remove(1))
+        self.assertFalse(c.has(1))
+        self.assertEquals(c.dump(), [2])
+        c.get(3)
+        c.put(3)
+        c.get(4)
+        # 2 and 3 have the same frequency, but 2 was requested first
+        self.assertEquals(c.put(4), 2)
+
+    def test_many_hits(self):
+        c = cache.PerfectLfuCache(10)
+        for k in range(10):
+            c.get(k)
+            c.put(k)
+        for _ in range(100):
+            for k in range(1, 10):
+                c.get(k)
+        c.get(10)
+        self.assertEquals(c.put(10), 0)
+        self.assertEquals(c.dump(), list(range(9, 0, -1)) + [10])
+
+    def test_sketch_lfu(self):
+        c = cache.PerfectLfuCache(3, sketch=True, sketch_aging=0)
+        for k, n in ((1, 5), (2, 4), (3, 3)):
+            for _ in range(n):
+                c.get(k)
+            c.put(k)
+        self.assertEquals(c.dump(), [1, 2, 3])
+        c.get(5)
+        self.assertEquals(c.put(5), 5)
+        for _ in range(5):
+            c.get(5)
+        self.assertEquals(c.put(5), 3)
+        self.assertEquals(c.dump(), [5, 1, 2])
+        self.assertTrue(c.remove(5))
+        self.assertFalse(c.has(5))
+        c.clear()
+        self.assertEquals(len(c), 0)
+        self.assertEquals(c.dump(), [])
+
+    def test_sketch_constant_memory(self):
+        c = cache.PerfectLfuCache(10, sketch=True, error_sample=50)
+        for k in range(10000):
+            c.get(k)
+            c.put(k)
+        self.assertEquals(len(c), 10)
+        self.assertEquals(c._counter, {})
+        self.assertEquals(len(c._time), 10)
+        self.assertEquals(len(c._sample), 50)
+        self.assertLessEqual(len(c._heap), 2 * 10 + 64)
+
+    def test_sketch_error(self):
+        self.assertIsNone(cache.PerfectLfuCache(10).sketch_error())
+        c = cache.PerfectLfuCache(10, sketch=True, sketch_width=16, sketch_aging=0)
+        for k in range(1000):
+            c.get(k % 100)
+        error = c.sketch_error()
+        self.assertEquals(error['N_SAMPLES'], 100)
+        self.assertGreaterEqual(error['MEAN_ABS_ERROR'], 0)
+        self.assertGreaterEqual(error['MEAN_REL_ERROR'], 0)
+        c = cache.PerfectLfuCache(10, sketch=True, sketch_width=10000, sketch_aging=0)
+        for k in range(1000):
+            c.get(k % 100)
+        self.assertEquals(c.sketch_error()['MEAN_ABS_ERROR'], 0)
+
+
+class TestWTinyLfuCache(unittest.TestCase):
+
+    def test_registry(self):
+        c = CACHE_POLICY['W_TINYLFU'](10, window=0.2, protected=0.5)
+        self.assertIsInstance(c, cache.WTinyLfuCache)
+        self.assertEquals(c.maxlen, 10)
+        self.assertEquals(c._window_maxlen, 2)
+        self.assertEquals(c._main_maxlen, 8)
+        self.assertEquals(c._protected_maxlen, 4)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, cache.WTinyLfuCache, 0)
+        self.assertRaises(ValueError, cache.WTinyLfuCache, 10, window=1)
+        self.assertRaises(ValueError, cache.WTinyLfuCache, 10, protected=1.5)
+
+    def test_admission(self):
+        c = cache.WTinyLfuCache(4, window=0.25, protected=0.5)
+        for k in (1, 2, 3, 4):
+            self.assertFalse(c.get(k))
+            self.assertIsNone(c.put(k))
+        self.assertEquals(len(c), 4)
+        self.assertEquals(c.dump(serialized=False), [[4], [], [3, 2, 1]])
+        # 5 moves 4 out of the window, which is not more frequent than 1
+        c.get(5)
+        self.assertEquals(c.put(5), 4)
+        self.assertEquals(c.dump(serialized=False), [[5], [], [3, 2, 1]])
+        # 6 is more frequent than 1 and replaces it when leaving the window
+        for _ in range(3):
+            c.get(6)
+        c.put(6)
+        self.assertEquals(c.put(7), 1)
+        self.assertEquals(c.dump(serialized=False), [[7], [], [6, 3, 2]])
+
+    def test_promotion(self):
+        c = cache.WTinyLfuCache(4, window=0.25, protected=0.5)
+        for k in (1, 2, 3, 4):
+            c.get(k)
+            c.put(k)
+        self.assertTrue(c.get(1))
+        self.assertTrue(c.get(2))
+        self.assertEquals(c.dump(serialized=False), [[4], [2, 1], [3]])
+        # Promoting 3 demotes 1 to the probationary segment
+        self.assertTrue(c.get(3))
+        self.assertEquals(c.dump(serialized=False), [[4], [3, 2], [1]])
+        self.assertTrue(c.get(4))
+        self.assertEquals(c.dump(), [4, 3, 2, 1])
+
+    def test_scan_resistance(self):
+        c = cache.WTinyLfuCache(10, window=0.1)
+        hot = list(range(9))
+        for _ in range(5):
+            for k in hot:
+                if not c.get(k):
+                    c.put(k)
+        # One-time requests interleaved with requests for hot items
+        for i in range(1000):
+            for k in (100 + i, hot[i % len(hot)]):
+                if not c.get(k):
+                    c.put(k)
+        for k in hot:
+            self.assertTrue(c.has(k))
+        self.assertEquals(len(c), 10)
+
+    def test_remove_clear(self):
+        c = cache.WTinyLfuCache(4, window=0.25)
+        for k in (1, 2, 3):
+            c.get(k)
+            c.put(k)
+        self.assertTrue(c.remove(3))
+        self.assertFalse(c.remove(3))
+        self.assertFalse(c.has(3))
+        self.assertEquals(len(c), 2)
+        c.clear()
+        self.assertEquals(len(c), 0)
+        self.assertEquals(c.dump(), [])
+        self.assertEquals(c._sketch.estimate(1), 0)
+
+    def test_no_window(self):
+        c = cache.WTinyLfuCache(2, window=0)
+        for k in (1, 2):
+            c.get(k)
+            c.put(k)
+        c.get(3)
+        self.assertEquals(c.put(3), 3)
+        self.assertEquals(c.dump(), [2, 1])
+
+
+class TestCountMinSketch(unittest.TestCase):
+
+    def test_overestimate(self):
+        sketch = cache.CountMinSketch(32, 4)
+        counts = collections.Counter()
+        for i in range(1000):
+            k = (i * 7919) % 97 % (1 + i % 13)
+            counts[k] += 1
+            sketch.add(k)
+        for k, n in counts.items():
+            self.assertGreaterEqual(sketch.estimate(k), n)
+        self.assertEquals(sketch.estimate('missing') >= 0, True)
+
+    def test_exact_without_collisions(self):
+        sketch = cache.CountMinSketch(100000, 4)
+        for k in range(10):
+            for _ in range(k):
+                sketch.add(k)
+        for k in range(10):
+            self.assertEquals(sketch.estimate(k), k)
+
+    def test_aging(self):
+        sketch = cache.CountMinSketch(1000, 4, sample_size=10)
+        for _ in range(9):
+            self.assertFalse(sketch.add(1))
+        self.assertEquals(sketch.estimate(1), 9)
+        self.assertTrue(sketch.add(1))
+        self.assertEquals(sketch.estimate(1), 5)
+        sketch.clear()
+        self.assertEquals(sketch.estimate(1), 0)
+
+    def test_deterministic_hash(self):
+        # Counters of strings do not depend on the hash randomization of the
+        # process, only on the seed
+        self.assertEqual([245, 504, 763, 22],
+                         cache.CountMinSketch(1000, 4)._indexes('content-1'))
+        self.assertEqual(cache.CountMinSketch(1000, 4, seed=1)._indexes(5),
+                         cache.CountMinSketch(1000, 4, seed=1)._indexes(5))
+        self.assertNotEqual(cache.CountMinSketch(1000, 4, seed=0)._indexes(5),
+                            cache.CountMinSketch(1000, 4, seed=1)._indexes(5))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, cache.CountMinSketch, 0)
+        self.assertRaises(ValueError, cache.CountMinSketch, 10, 0)
+
 
 class TestInsertAfterKHits(unittest.TestCase):
 
@@ -915,6 +1378,23 @@ class TestKeyValCache(unittest.TestCase):
 
 class TestTtlCache(unittest.TestCase):
 
+    def test_purge_order(self):
+        curr_time = [0]
+        c = cache.ttl_cache(cache.LruCache(100), lambda: curr_time[0])
+        # Refreshing expiration times leaves stale index entries behind
+        for i in range(50):
+            for k in range(10):
+                c.put(k, ttl=10 * k + i + 1)
+        self.assertLessEqual(len(c._exp_heap), 2 * 10 + 64)
+        c.put('a', expires=55)
+        c.put('b')
+        curr_time[0] = 65
+        c.purge()
+        self.assertEqual({2, 3, 4, 5, 6, 7, 8, 9, 'b'},
+                         set(k for k, _ in c.dump()))
+        curr_time[0] = 1000
+        self.assertEqual([('b', np.infty)], c.dump())
+
     def test_put_dump(self):
         curr_time = 1
         f_time = lambda: curr_time
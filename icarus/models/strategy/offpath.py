@@ -1,9 +1,8 @@
 """Implementations of all off-path strategies"""
 from __future__ import division
 
-import networkx as nx
-
 from icarus.registry import register_strategy
+from icarus.tools.artifacts import shared_path_lengths
 from icarus.util import inheritdoc, path_links
 
 from .base import Strategy
@@ -54,21 +53,70 @@ class NearestReplicaRouting(Strategy):
         self.metacaching = 'LCD'
         self.implementation = implementation
         self.radius = radius
-        self.distance = nx.all_pairs_dijkstra_path_length(self.view.topology(),
-                                                          weight='delay')
+        self.distance = shared_path_lengths(self.view.topology(), weight='delay')
+        # Caching nodes sorted by distance from each receiver, as a list of
+        # (node, distance) tuples. Built lazily the first time a receiver
+        # issues a request
+        self.cache_order = {}
+        # Number of caches looked up to locate the nearest replica in the
+        # latest request and cumulatively across all requests
+        self.last_lookups = 0
+        self.n_lookups = 0
+        self.n_requests = 0
+
+    def nearest_replica(self, receiver, content):
+        """Return the node holding a copy of a content closest to a receiver
+
+        Caching nodes are looked up in increasing order of distance from the
+        receiver and the search stops at the first node holding the content or
+        as soon as the remaining caches are farther than the content source.
+        In case of ties, a cache is preferred over the source.
+
+        Parameters
+        ----------
+        receiver : any hashable type
+            The receiver node requesting a content
+        content : any hashable type
+            The content identifier requested by the receiver
+
+        Returns
+        -------
+        nearest_replica : any hashable type
+            The closest node holding the content
+        """
+        if receiver not in self.cache_order:
+            distance = self.distance[receiver]
+            self.cache_order[receiver] = sorted(
+                ((v, distance[v]) for v in self.view.cache_nodes() if v in distance),
+                key=lambda x: x[1])
+        source = self.view.content_source(content)
+        source_distance = self.distance[receiver][source]
+        nearest_replica = source
+        lookups = 0
+        for v, d in self.cache_order[receiver]:
+            if d > source_distance:
+                break
+            lookups += 1
+            if self.view.cache_lookup(v, content):
+                nearest_replica = v
+                break
+        self.last_lookups = lookups
+        self.n_lookups += lookups
+        self.n_requests += 1
+        return nearest_replica
 
     @inheritdoc(Strategy)
     def process_event(self, time, receiver, content, log):
+        self.controller.start_session(time, receiver, content, log)
         # get all required data
-        locations = self.view.content_locations(content)
-        #print (receiver, content, locations)
-        nearest_replica = min(locations, key=lambda x: self.distance[receiver][x])
+        nearest_replica = self.nearest_replica(receiver, content)
+        self.controller.report_replica_lookups(self.last_lookups)
         # Route request to nearest replica
-        self.controller.start_session(time, receiver, content, log)
         if self.implementation == 'ideal':
             self.controller.forward_request_path(receiver, nearest_replica)
         elif self.implementation == 'approx_1':
             # Floods actual request packets
+            locations = self.view.content_locations(content)
             paths = {loc: len(self.view.shortest_path(receiver, loc)[:self.radius])
                      for loc in locations}
             # TODO: Continue
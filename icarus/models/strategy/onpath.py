@@ -5,6 +5,7 @@ import random
 import networkx as nx
 
 from icarus.registry import register_strategy
+from icarus.tools.artifacts import shared_betweenness_centrality
 from icarus.util import inheritdoc, path_links
 
 from .base import Strategy
@@ -297,7 +298,7 @@ class CacheLessForMore(Strategy):
             self.betw = dict((v, nx.betweenness_centrality(nx.ego_graph(topology, v))[v])
                              for v in topology.nodes_iter())
         else:
-            self.betw = nx.betweenness_centrality(topology)
+            self.betw = shared_betweenness_centrality(topology)
 
     @inheritdoc(Strategy)
     def process_event(self, time, receiver, content, log):
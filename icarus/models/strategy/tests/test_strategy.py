@@ -1892,3 +1892,34 @@ class TestNrr(unittest.TestCase):
         self.assertSetEqual(set(exp_req_hops), set(summary['request_hops']))
         self.assertSetEqual(set(exp_cont_hops), set(summary['content_hops']))
         self.assertEqual(3, summary['serving_node'])
+
+    def test_nearest_replica_lookups(self):
+        # Topology sketch
+        #
+        # 0 ---- 1 ---- 2 ---- s
+        #
+        topology = IcnTopology(fnss.Topology())
+        topology.add_path([0, 1, 2, "s"])
+        fnss.add_stack(topology, "s", 'source', {'contents': (1, 2)})
+        for v in (0, 1, 2):
+            fnss.add_stack(topology, v, 'receiver', {'cache_size': 1})
+        fnss.set_delays_constant(topology, 1, 'ms')
+        model = NetworkModel(topology, cache_policy={'name': 'FIFO'})
+        view = NetworkView(model)
+        controller = NetworkController(model)
+        collector = DummyCollector(view)
+        controller.attach_collector(collector)
+        nrr = strategy.NearestReplicaRouting(view, controller)
+        nrr.process_event(1, 0, 1, True)
+        self.assertEqual("s", collector.session_summary()['serving_node'])
+        self.assertEqual(3, nrr.last_lookups)
+        self.assertEqual(3, collector.session_summary()['replica_lookups'])
+        # Caches farther than the source are not looked up
+        nrr.process_event(2, 2, 1, True)
+        self.assertEqual("s", collector.session_summary()['serving_node'])
+        self.assertEqual(2, nrr.last_lookups)
+        nrr.process_event(3, 0, 1, True)
+        self.assertEqual(1, nrr.last_lookups)
+        self.assertEqual(0, collector.session_summary()['serving_node'])
+        self.assertEqual(6, nrr.n_lookups)
+        self.assertEqual(3, nrr.n_requests)
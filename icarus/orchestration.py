@@ -9,18 +9,27 @@ import collections
 import multiprocessing as mp
 import logging
 import copy
+import json
+import math
+import os
 import sys
 import signal
+import tempfile
 import traceback
 
 from icarus.execution import exec_experiment
 from icarus.registry import TOPOLOGY_FACTORY, CACHE_PLACEMENT, CONTENT_PLACEMENT, \
                             CACHE_POLICY, WORKLOAD, DATA_COLLECTOR, STRATEGY
-from icarus.results import ResultSet
-from icarus.util import SequenceNumber, timestr
+from icarus.results import ResultSet, ResultStore, experiment_fingerprint
+from icarus.scenarios.topology import set_topology_cache
+from icarus.scenarios.workload import RecordedWorkload
+from icarus.tools.artifacts import precompute_shared_artifacts, \
+                                   set_shared_artifacts_cache_size
+from icarus.util import Settings, SequenceNumber, Tree, timestr
 
 
-__all__ = ['Orchestrator', 'run_scenario']
+__all__ = ['Orchestrator', 'ExperimentCostModel', 'run_scenario',
+           'run_scenario_group']
 
 
 logger = logging.getLogger('orchestration')
@@ -33,7 +42,7 @@ class Orchestrator(object):
     aggregate results.
     """
 
-    def __init__(self, settings, summary_freq=4):
+    def __init__(self, settings, summary_freq=4, journal=None):
         """Constructor
 
         Parameters
@@ -43,17 +52,98 @@ class Orchestrator(object):
         summary_freq : int
             Frequency (in number of experiment) at which summary messages
             are displayed
+        journal : ResultsJournal, optional
+            Journal to which the results of each experiment are appended as
+            soon as it completes. Experiments whose results were read from
+            the journal when opening it are not run again
         """
         self.settings = settings
         self.results = ResultSet()
         self.seq = SequenceNumber()
-        self.exp_durations = collections.deque(maxlen=30)
         self.n_success = 0
         self.n_fail = 0
         self.summary_freq = summary_freq
+        self.eta = None
+        self.journal = journal
+        # Keys identifying experiments scheduled but not completed in the
+        # journal and results cache, keyed by sequence number
+        self._exp_keys = {}
+        if 'RESULTS_CACHE_DIR' in self.settings:
+            max_size = self.settings.RESULTS_CACHE_MAX_SIZE \
+                       if 'RESULTS_CACHE_MAX_SIZE' in self.settings else None
+            self.result_store = ResultStore(
+                        settings_path(self.settings.RESULTS_CACHE_DIR), max_size)
+        else:
+            self.result_store = None
+        if 'EXPERIMENT_DURATIONS_FILE' in self.settings:
+            self.cost_model = ExperimentCostModel.load(
+                        settings_path(self.settings.EXPERIMENT_DURATIONS_FILE))
+        else:
+            self.cost_model = ExperimentCostModel()
+        # Signatures and cost units of experiments scheduled but not
+        # completed, keyed by sequence number
+        self._pending = {}
+        # Cost units and number of experiments scheduled but not completed,
+        # keyed by signatures
+        self._pending_units = {}
         self._stop = False
         if self.settings.PARALLEL_EXECUTION:
-            self.pool = mp.Pool(settings.N_PROCESSES)
+            if 'SHARE_SCENARIO_ARTIFACTS' in self.settings and \
+                    self.settings.SHARE_SCENARIO_ARTIFACTS:
+                # Must be done before forking worker processes
+                self.precompute_artifacts()
+            self.pool = mp.Pool(settings.N_PROCESSES, initializer=init_worker,
+                                initargs=(worker_settings(settings),))
+
+    def precompute_artifacts(self):
+        """Build all topologies of the experiment queue and compute the
+        artifacts shared by all experiments run on them
+
+        Worker processes forked afterwards inherit these artifacts and do not
+        need to compute them again. Their artifact cache is sized to hold all
+        the artifacts computed.
+        """
+        configure_topology_cache(self.settings)
+        # Topology specs and artifacts required on each topology, keyed by
+        # topology spec
+        topologies = collections.OrderedDict()
+        for experiment in self.settings.EXPERIMENT_QUEUE:
+            topology_spec = experiment['topology']
+            key = repr(sorted(topology_spec.items()))
+            if key not in topologies:
+                # Topology spec, path length weights, betweenness centrality
+                topologies[key] = [topology_spec, set(), False]
+            for component in ('strategy', 'cache_placement'):
+                params = experiment.get(component)
+                if not params:
+                    continue
+                artifacts = SHARED_ARTIFACTS.get((component, params.get('name')))
+                if artifacts is None:
+                    continue
+                weights, betweenness = artifacts(params)
+                topologies[key][1].update(weights)
+                topologies[key][2] = topologies[key][2] or betweenness
+        if len(topologies) > MAX_SHARED_TOPOLOGIES:
+            logger.info('Experiments use %d topologies, too many to share '
+                        'their artifacts', len(topologies))
+            return
+        n_artifacts = 0
+        for topology_spec, path_lengths, betweenness in topologies.values():
+            topology_spec = copy.deepcopy(topology_spec)
+            topology_name = topology_spec.pop('name')
+            if topology_name not in TOPOLOGY_FACTORY:
+                continue
+            try:
+                topology = TOPOLOGY_FACTORY[topology_name](**topology_spec)
+            except Exception:
+                # The error is reported by the experiments using the topology
+                continue
+            n_artifacts += precompute_shared_artifacts(topology, path_lengths,
+                                                       betweenness)
+        if n_artifacts > 0:
+            set_shared_artifacts_cache_size(n_artifacts)
+        logger.info('Computed %d shared artifacts of %d topologies',
+                    n_artifacts, len(topologies))
 
     def stop(self):
         """Stop the execution of the orchestrator
@@ -71,88 +161,741 @@ class Orchestrator(object):
         methods returns only after all experiments are executed.
         """
         # Create queue of experiment configurations
-        queue = collections.deque(self.settings.EXPERIMENT_QUEUE)
+        queue = list(self.settings.EXPERIMENT_QUEUE)
+        if self.settings.PARALLEL_EXECUTION:
+            # Schedule the longest experiments first, so that the shortest
+            # ones keep all processes busy until the end of the simulations
+            costs = [self.cost_model.estimate(experiment) for experiment in queue]
+            queue = [queue[i] for i in sorted(range(len(queue)),
+                                              key=lambda i: -costs[i])]
+        # Each experiment is identified in the journal and results cache by
+        # the fingerprint of its parameters and its replication index, i.e.
+        # its index among the experiments with the same fingerprint
+        journaled = {}
+        if self.journal is not None:
+            for key, params, results in self.journal.records:
+                journaled[key] = (params, results)
+        experiments = []
+        replications = collections.defaultdict(int)
+        n_stored = 0
+        for experiment in queue:
+            fingerprint = experiment_fingerprint(experiment)
+            for _ in range(self.settings.N_REPLICATIONS):
+                key = (fingerprint, replications[fingerprint])
+                replications[fingerprint] += 1
+                if key in journaled:
+                    self.results.add(*journaled[key])
+                    continue
+                if self.result_store is not None:
+                    # Reuse results of experiments run by earlier simulations
+                    params, results = self.result_store.get(
+                                                self.result_store.key(*key))
+                    if params is not None:
+                        self.results.add(params, results)
+                        n_stored += 1
+                        continue
+                experiments.append((key, experiment))
         # Calculate number of experiments and number of processes
-        self.n_exp = len(queue) * self.settings.N_REPLICATIONS
+        self.n_exp = len(experiments)
         self.n_proc = self.settings.N_PROCESSES \
                       if self.settings.PARALLEL_EXECUTION \
                       else 1
+        if len(self.results) > n_stored:
+            logger.info('Resuming simulations: %d experiments completed before',
+                        len(self.results) - n_stored)
+        if n_stored > 0:
+            logger.info('Found results of %d experiments in results cache',
+                        n_stored)
         logger.info('Starting simulations: %d experiments, %d process(es)'
                     % (self.n_exp, self.n_proc))
 
+        # Experiments are run in groups sharing the same scenario if requested,
+        # otherwise individually. Replications of an experiment are always in
+        # different groups, so that they are run with different requests
+        group_scenarios = 'GROUP_SCENARIOS' in self.settings and \
+                          self.settings.GROUP_SCENARIOS
+        groups = collections.OrderedDict()
+        for key, experiment in experiments:
+            curr_exp = self.schedule(experiment)
+            self._exp_keys[curr_exp] = key
+            group = (scenario_fingerprint(experiment), key[1]) \
+                    if group_scenarios else curr_exp
+            groups.setdefault(group, []).append((experiment, curr_exp))
+        groups = list(groups.values())
+        if group_scenarios and self.settings.PARALLEL_EXECUTION:
+            # Schedule the longest groups first
+            rate = self.cost_model.rate
+            def cost(group):
+                return sum(cost_units * rate(signatures) for signatures, cost_units
+                           in (self._pending[curr_exp] for _, curr_exp in group))
+            groups.sort(key=cost, reverse=True)
+        if group_scenarios:
+            logger.info('Grouped experiments in %d scenarios', len(groups))
+        jobs = [(group, self.n_exp) for group in groups]
+        if self.cost_model.history:
+            self.eta = self.remaining_time()
+            logger.info('Estimated duration: %s', timestr(self.eta, False))
+
         if self.settings.PARALLEL_EXECUTION:
-            # This job queue is used only to keep track of which jobs have
-            # finished and which are still running. Currently this information
-            # is used only to handle keyboard interrupts correctly
-            job_queue = collections.deque()
-            # Schedule experiments from the queue
-            while queue:
-                experiment = queue.popleft()
-                for _ in range(self.settings.N_REPLICATIONS):
-                    job_queue.append(self.pool.apply_async(run_scenario,
-                            args=(self.settings, experiment,
-                                  self.seq.assign(), self.n_exp),
-                            callback=self.experiment_callback))
+            # Results are returned as soon as each experiment completes,
+            # irrespective of the order in which experiments were scheduled,
+            # and processed in this process
+            results = self.pool.imap_unordered(run_scenario_job, jobs)
             self.pool.close()
-            # This solution is probably not optimal, but at least makes
-            # KeyboardInterrupt work fine, which is crucial if launching the
-            # simulation remotely via screen.
-            # What happens here is that we keep waiting for possible
-            # KeyboardInterrupts till the last process terminates successfully.
-            # We may have to wait up to 5 seconds after the last process
-            # terminates before exiting, which is really negligible
+            # Waiting for a result with a timeout, rather than blocking
+            # indefinitely, makes KeyboardInterrupt work fine, which is
+            # crucial if launching the simulation remotely via screen. A
+            # completed experiment still wakes up this loop immediately.
             try:
-                while job_queue:
-                    job = job_queue.popleft()
-                    while not job.ready():
-                        time.sleep(5)
+                while not self._stop:
+                    try:
+                        group_results = results.next(timeout=1)
+                    except mp.TimeoutError:
+                        continue
+                    except StopIteration:
+                        break
+                    for curr_exp, result in group_results:
+                        self.experiment_callback(result, curr_exp)
             except KeyboardInterrupt:
                 self.pool.terminate()
             self.pool.join()
 
         else:  # Single-process execution
-            while queue:
-                experiment = queue.popleft()
-                for _ in range(self.settings.N_REPLICATIONS):
-                    self.experiment_callback(run_scenario(self.settings,
-                                            experiment, self.seq.assign(),
-                                            self.n_exp))
-                    if self._stop:
-                        self.stop()
-
+            for group, n_exp in jobs:
+                group_results = run_scenario_group(self.settings, group, n_exp)
+                for (_, curr_exp), result in zip(group, group_results):
+                    self.experiment_callback(result, curr_exp)
+                if self._stop:
+                    self.stop()
+                    break
+
+        self.save_cost_model()
         logger.info('END | Planned: %d, Completed: %d, Succeeded: %d, Failed: %d',
                     self.n_exp, self.n_fail + self.n_success, self.n_success, self.n_fail)
 
 
-    def experiment_callback(self, args):
+    def schedule(self, experiment):
+        """Schedule an experiment, so that its estimated duration is accounted
+        for by the ETA until it completes
+
+        Parameters
+        ----------
+        experiment : Tree
+            The experiment parameters
+
+        Returns
+        -------
+        curr_exp : int
+            The sequence number assigned to the experiment
+        """
+        curr_exp = self.seq.assign()
+        signatures = self.cost_model.signatures(experiment)
+        cost_units = self.cost_model.cost_units(experiment)
+        self._pending[curr_exp] = (signatures, cost_units)
+        pending = self._pending_units.setdefault(signatures, [0.0, 0])
+        pending[0] += cost_units
+        pending[1] += 1
+        return curr_exp
+
+    def remaining_time(self):
+        """Return the estimated time needed to complete all experiments
+        scheduled and not completed yet
+
+        Returns
+        -------
+        remaining_time : float
+            The remaining time, in seconds
+        """
+        n_cores = min(mp.cpu_count(), self.n_proc)
+        rate = self.cost_model.rate
+        return sum(cost_units * rate(signatures) for signatures, (cost_units, _)
+                   in self._pending_units.items()) / n_cores
+
+    def save_cost_model(self):
+        """Save the durations of the experiments completed so far, if
+        requested by the settings
+        """
+        if 'EXPERIMENT_DURATIONS_FILE' in self.settings:
+            try:
+                self.cost_model.save(
+                        settings_path(self.settings.EXPERIMENT_DURATIONS_FILE))
+            except (IOError, OSError) as e:
+                logger.warning('Could not save experiment durations: %s', e)
+
+    def experiment_callback(self, args, curr_exp=None):
         """Callback method called by run_scenario
 
         Parameters
         ----------
         args : tuple
             Tuple of arguments
+        curr_exp : int, optional
+            Sequence number of the experiment, as returned by `schedule`
         """
+        signatures, cost_units = self._pending.pop(curr_exp, (None, None))
+        exp_key = self._exp_keys.pop(curr_exp, None)
+        if signatures is not None:
+            pending = self._pending_units[signatures]
+            pending[1] -= 1
+            if pending[1] == 0:
+                del self._pending_units[signatures]
+            else:
+                pending[0] -= cost_units
         # If args is None, that means that an exception was raised during the
         # execution of the experiment. In such case, ignore it
         if not args:
             self.n_fail += 1
-            return
-        # Extract parameters
-        params, results, duration = args
-        self.n_success += 1
-        # Store results
-        self.results.add(params, results)
-        self.exp_durations.append(duration)
-        if self.n_success % self.summary_freq == 0:
-            # Number of experiments scheduled to be executed
-            n_scheduled = self.n_exp - (self.n_fail + self.n_success)
-            # Compute ETA
-            n_cores = min(mp.cpu_count(), self.n_proc)
-            mean_duration = sum(self.exp_durations) / len(self.exp_durations)
-            eta = timestr(n_scheduled * mean_duration / n_cores, False)
+        else:
+            # Extract parameters
+            params, results, duration = args
+            self.n_success += 1
+            # Store results
+            self.results.add(params, results)
+            if self.journal is not None and exp_key is not None:
+                self.journal.append(exp_key, params, results)
+            if self.result_store is not None and exp_key is not None:
+                try:
+                    self.result_store.put(self.result_store.key(*exp_key),
+                                          params, results)
+                except (IOError, OSError) as e:
+                    logger.warning('Could not store results: %s', e)
+            if signatures is not None:
+                self.cost_model.add(signatures, cost_units, duration)
+            else:
+                self.cost_model.update(params, duration)
+        # Number of experiments scheduled to be executed
+        n_scheduled = self.n_exp - (self.n_fail + self.n_success)
+        # Update ETA after each completed experiment
+        if self.cost_model.history:
+            self.eta = self.remaining_time()
+        if args and self.n_success % self.summary_freq == 0:
             # Print summary
             logger.info('SUMMARY | Completed: %d, Failed: %d, Scheduled: %d, ETA: %s',
-                        self.n_success, self.n_fail, n_scheduled, eta)
+                        self.n_success, self.n_fail, n_scheduled,
+                        timestr(self.eta, False))
+            # Durations are also saved periodically, rather than when the
+            # orchestrator is stopped, e.g. from a signal handler, so that
+            # they survive an interruption
+            self.save_cost_model()
+
+
+# Maximum number of distinct topologies whose artifacts are computed before
+# forking worker processes. This bounds the memory used by the artifacts, which
+# are all kept by the main process and each worker process
+MAX_SHARED_TOPOLOGIES = 16
+
+# Artifacts used by strategies and cache placements besides shortest paths,
+# keyed by component and name. Each function returns, given the component
+# parameters, the link weights of the all-pair path lengths used and whether
+# betweenness centrality is used
+SHARED_ARTIFACTS = {
+    ('strategy', 'NRR'):
+        lambda params: (('delay',), False),
+    ('strategy', 'CL4M'):
+        lambda params: ((), not params.get('use_ego_betw', False)),
+    ('cache_placement', 'BETWEENNESS_CENTRALITY'):
+        lambda params: ((), True),
+    ('cache_placement', 'CONSOLIDATED'):
+        lambda params: ((), params.get('metric_dict') is None
+                            and params.get('spread', 0.5) < 1),
+    ('cache_placement', 'OPTIMAL_MEDIAN'):
+        lambda params: ((params.get('weight', 'delay'),), False),
+    ('cache_placement', 'OPTIMAL_HASHROUTING'):
+        lambda params: ((params.get('weight', 'delay'),), False),
+                    }
+
+# Rough cost of processing a request with a strategy relative to an on-path
+# strategy like LCE, used to estimate the duration of experiments. Strategies
+# not listed here have weight 1. Estimates are then corrected using the
+# duration of experiments run before
+STRATEGY_COST_WEIGHT = {
+    'NO_CACHE':       0.5,
+    'NRR':            2.0,
+    'HR_MULTICAST':   1.5,
+    'HR_HYBRID_AM':   1.5,
+    'HR_HYBRID_SM':   1.5,
+                        }
+
+
+class ExperimentCostModel(object):
+    """Model estimating the duration of experiments before running them.
+
+    The duration of an experiment is estimated as a number of cost units
+    derived from its parameters, i.e. number of requests, size of topology and
+    caches and strategy, multiplied by the duration per cost unit recorded for
+    the most similar experiments run before. Experiments are similar if they
+    share the same topology, strategy, cache policy and workload or a subset
+    of them.
+
+    If no duration was recorded, estimates are expressed in cost units, which
+    are only meaningful to compare experiments among each other.
+    """
+
+    def __init__(self, history=None):
+        """Constructor
+
+        Parameters
+        ----------
+        history : dict, optional
+            Durations recorded, as returned by the *history* attribute of
+            another model
+        """
+        # Total duration and cost units of experiments run, keyed by signature
+        self.history = {} if history is None else dict(history)
+
+    @classmethod
+    def load(cls, path):
+        """Load a model from the file where its history was saved
+
+        Parameters
+        ----------
+        path : str
+            The file path
+
+        Returns
+        -------
+        model : ExperimentCostModel
+            The model. If the file does not exist or cannot be read, the model
+            has no history
+        """
+        try:
+            with open(path) as f:
+                history = json.load(f)
+        except (IOError, OSError, ValueError):
+            history = None
+        return cls(history)
+
+    def save(self, path):
+        """Save the history of the model to a file
+
+        Parameters
+        ----------
+        path : str
+            The file path
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        # Write to a temporary file first so that an interrupted save never
+        # leaves a partially written file in place of the history
+        fd, tmp_path = tempfile.mkstemp(dir=directory or None, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.history, f)
+            os.rename(tmp_path, path)
+        except Exception:
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def signatures(experiment):
+        """Return the signatures identifying experiments similar to an
+        experiment, from the most to the least specific
+
+        Parameters
+        ----------
+        experiment : Tree
+            The experiment parameters
+
+        Returns
+        -------
+        signatures : tuple of str
+            The signatures
+        """
+        def name(component):
+            spec = experiment.get(component) or {}
+            return spec.get('name')
+        topology = repr(sorted((experiment.get('topology') or {}).items()))
+        components = (topology, name('strategy'), name('cache_policy'),
+                      name('workload'))
+        return tuple(repr(components[:i])
+                     for i in range(len(components), -1, -1))
+
+    @staticmethod
+    def cost_units(experiment):
+        """Return the number of cost units of an experiment
+
+        Parameters
+        ----------
+        experiment : Tree
+            The experiment parameters
+
+        Returns
+        -------
+        cost_units : float
+            The cost units
+        """
+        workload = experiment.get('workload') or {}
+        topology = experiment.get('topology') or {}
+        strategy = experiment.get('strategy') or {}
+        cache_placement = experiment.get('cache_placement') or {}
+        n_requests = workload.get('n_warmup', 10**5) + \
+                     workload.get('n_measured', 4 * 10**5)
+        # Topology size can only be derived from the parameters of synthetic
+        # topologies, others are accounted for by recorded durations
+        if 'n' in topology:
+            n_nodes = topology['n']
+        elif 'k' in topology and 'h' in topology:
+            n_nodes = topology['k'] ** (topology['h'] + 1)
+        else:
+            n_nodes = 0
+        cache_budget = cache_placement.get('network_cache', 0) * \
+                       workload.get('n_contents', 0)
+        return n_requests * STRATEGY_COST_WEIGHT.get(strategy.get('name'), 1) \
+               * math.log(2 + n_nodes, 2) * math.log(2 + cache_budget, 2)
+
+    def rate(self, signatures):
+        """Return the duration per cost unit recorded for the most similar
+        experiments
+
+        Parameters
+        ----------
+        signatures : tuple of str
+            The signatures of the experiment, as returned by `signatures`
+
+        Returns
+        -------
+        rate : float
+            The duration per cost unit, or 1 if no duration was recorded
+        """
+        for signature in signatures:
+            if signature in self.history:
+                duration, units = self.history[signature]
+                return duration / units
+        return 1.0
+
+    def estimate(self, experiment):
+        """Return the estimated duration of an experiment
+
+        Parameters
+        ----------
+        experiment : Tree
+            The experiment parameters
+
+        Returns
+        -------
+        duration : float
+            The estimated duration, in seconds if a duration was recorded,
+            otherwise in cost units
+        """
+        return self.cost_units(experiment) * \
+               self.rate(self.signatures(experiment))
+
+    def add(self, signatures, cost_units, duration):
+        """Record the duration of an experiment
+
+        Parameters
+        ----------
+        signatures : tuple of str
+            The signatures of the experiment, as returned by `signatures`
+        cost_units : float
+            The cost units of the experiment, as returned by `cost_units`
+        duration : float
+            The duration of the experiment, in seconds
+        """
+        for signature in signatures:
+            recorded = self.history.setdefault(signature, [0.0, 0.0])
+            recorded[0] += duration
+            recorded[1] += cost_units
+
+    def update(self, experiment, duration):
+        """Record the duration of an experiment
+
+        Parameters
+        ----------
+        experiment : Tree
+            The experiment parameters
+        duration : float
+            The duration of the experiment, in seconds
+        """
+        self.add(self.signatures(experiment), self.cost_units(experiment),
+                 duration)
+
+
+# Directory against which relative paths in the settings are resolved, i.e. the
+# root of the Icarus source tree, where the resources directory is located
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def settings_path(path):
+    """Return the absolute path of a file or directory given in the settings
+
+    Parameters
+    ----------
+    path : str
+        The path. If relative, it is relative to `ROOT_DIR`, so that it does
+        not depend on the current directory
+
+    Returns
+    -------
+    path : str
+        The absolute path
+    """
+    return os.path.join(ROOT_DIR, os.path.expanduser(path))
+
+
+def configure_topology_cache(settings):
+    """Enable the on-disk cache of parsed topologies if requested by the
+    settings
+
+    Parameters
+    ----------
+    settings : Settings
+        The simulator settings
+    """
+    if 'TOPOLOGY_CACHE_DIR' in settings:
+        paths = settings.TOPOLOGY_CACHE_PATHS \
+                if 'TOPOLOGY_CACHE_PATHS' in settings else True
+        set_topology_cache(settings_path(settings.TOPOLOGY_CACHE_DIR), paths)
+
+
+# Parameters defining the scenario of an experiment
+SCENARIO_PARAMS = ('topology', 'workload', 'cache_placement', 'content_placement')
+
+# Settings required by worker processes to run experiments
+WORKER_SETTINGS = ('DATA_COLLECTORS', 'TOPOLOGY_CACHE_DIR', 'TOPOLOGY_CACHE_PATHS')
+
+# Settings of the worker process, set by init_worker
+_worker_settings = None
+
+
+def worker_settings(settings):
+    """Return the subset of settings required by worker processes to run
+    experiments
+
+    Parameters
+    ----------
+    settings : Settings
+        The simulator settings
+
+    Returns
+    -------
+    worker_settings : Settings
+        The settings listed in `WORKER_SETTINGS`
+    """
+    subset = Settings()
+    for name in WORKER_SETTINGS:
+        if name in settings:
+            subset.set(name, settings.get(name))
+    return subset
+
+
+def init_worker(settings):
+    """Initialize a worker process
+
+    The settings are passed once to each worker process, rather than with
+    each experiment, which minimizes the data transferred to workers.
+
+    Parameters
+    ----------
+    settings : Settings
+        The settings required by workers, as returned by `worker_settings`
+    """
+    global _worker_settings
+    _worker_settings = settings
+    configure_topology_cache(settings)
+
+
+def run_scenario_job(args):
+    """Run a group of experiments in a worker process initialized by
+    `init_worker`
+
+    This function is meant to be mapped by a pool of worker processes over a
+    list of jobs.
+
+    Parameters
+    ----------
+    args : tuple
+        The (experiments, n_exp) arguments of `run_scenario_group`
+
+    Returns
+    -------
+    results : list
+        List of (curr_exp, results) 2-tuples, one per experiment, where
+        curr_exp is the sequence number of the experiment and results the
+        value returned by `run_scenario`
+    """
+    experiments, n_exp = args
+    results = run_scenario_group(_worker_settings, experiments, n_exp)
+    return [(curr_exp, result)
+            for (_, curr_exp), result in zip(experiments, results)]
+
+
+def scenario_fingerprint(params):
+    """Return a fingerprint of the scenario of an experiment
+
+    Experiments with the same scenario fingerprint have the same topology,
+    workload, cache placement and content placement parameters and can be run
+    on the same scenario by `run_scenario_group`.
+
+    Parameters
+    ----------
+    params : Tree
+        The experiment parameters
+
+    Returns
+    -------
+    fingerprint : str
+        The fingerprint of the scenario
+    """
+    return experiment_fingerprint(Tree({k: params[k] for k in SCENARIO_PARAMS
+                                        if k in params}))
+
+
+def _catch_failure(logger, curr_exp, n_exp, func, *args):
+    """Call a function and return its value, or log the failure of an
+    experiment and return None if the function raises an exception
+    """
+    try:
+        return func(*args)
+    except KeyboardInterrupt:
+        logger.error('Received keyboard interrupt. Terminating')
+        sys.exit(-signal.SIGINT)
+    except Exception as e:
+        logger.error('Experiment %d/%d | Failed | %s: %s\n%s',
+                     curr_exp, n_exp, type(e).__name__, e,
+                     traceback.format_exc())
+        return None
+
+
+def build_scenario(settings, params, logger):
+    """Build the scenario of an experiment, i.e. its topology, with caches
+    and contents placed, and its workload
+
+    Parameters
+    ----------
+    settings : Settings
+        The simulator settings
+    params : Tree
+        experiment parameters tree
+    logger : Logger
+        The logger to which errors are reported
+
+    Returns
+    -------
+    scenario : 2-tuple
+        A (topology, workload) 2-tuple, or None if the scenario parameters are
+        invalid
+    """
+    # Copy parameters so that they can be manipulated
+    tree = copy.deepcopy(params)
+
+    # Set topology
+    configure_topology_cache(settings)
+    topology_spec = tree['topology']
+    topology_name = topology_spec.pop('name')
+    if topology_name not in TOPOLOGY_FACTORY:
+        logger.error('No topology factory implementation for %s was found.'
+                     % topology_name)
+        return None
+    topology = TOPOLOGY_FACTORY[topology_name](**topology_spec)
+    workload_spec = tree['workload']
+    workload_name = workload_spec.pop('name')
+    if workload_name not in WORKLOAD:
+        logger.error('No workload implementation named %s was found.'
+                     % workload_name)
+        return None
+    workload = WORKLOAD[workload_name](topology, **workload_spec)
+
+    # Assign caches to nodes
+    if 'cache_placement' in tree:
+        cachepl_spec = tree['cache_placement']
+        cachepl_name = cachepl_spec.pop('name')
+        if cachepl_name not in CACHE_PLACEMENT:
+            logger.error('No cache placement named %s was found.'
+                         % cachepl_name)
+            return None
+        network_cache = cachepl_spec.pop('network_cache')
+        # Cache budget is the cumulative number of cache entries across
+        # the whole network
+        #change due to different rank
+        cachepl_spec['cache_budget'] = workload.contents_range * network_cache
+        CACHE_PLACEMENT[cachepl_name](topology, **cachepl_spec)
+
+    # Assign contents to sources
+    # If there are many contents, after doing this, performing operations
+    # requiring a topology deep copy, i.e. to_directed/undirected, will
+    # take long.
+    contpl_spec = tree['content_placement']
+    contpl_name = contpl_spec.pop('name')
+    if contpl_name not in CONTENT_PLACEMENT:
+        logger.error('No content placement implementation named %s was found.'
+                     % contpl_name)
+        return None
+    CONTENT_PLACEMENT[contpl_name](topology, workload.contents, **contpl_spec)
+    return topology, workload
+
+
+def run_experiment(settings, topology, workload, params, curr_exp, n_exp,
+                   logger, start_time):
+    """Run an experiment on a scenario built by `build_scenario`
+
+    Parameters
+    ----------
+    settings : Settings
+        The simulator settings
+    topology : Topology
+        The topology of the scenario
+    workload : iterable
+        The workload of the scenario
+    params : Tree
+        experiment parameters tree
+    curr_exp : int
+        sequence number of the experiment
+    n_exp : int
+        Number of scheduled experiments
+    logger : Logger
+        The logger to which progress and errors are reported
+    start_time : float
+        The time at which the experiment started, including the time spent
+        building its scenario
+
+    Returns
+    -------
+    results : 3-tuple
+        The value returned by `run_scenario`
+    """
+    # Get list of metrics required
+    metrics = settings.DATA_COLLECTORS
+
+    # Copy parameters so that they can be manipulated
+    tree = copy.deepcopy(params)
+
+    # caching and routing strategy definition
+    strategy = tree['strategy']
+    if strategy['name'] not in STRATEGY:
+        logger.error('No implementation of strategy %s was found.' % strategy['name'])
+        return None
+
+    # cache eviction policy definition
+    cache_policy = tree['cache_policy']
+    if cache_policy['name'] not in CACHE_POLICY:
+        logger.error('No implementation of cache policy %s was found.' % cache_policy['name'])
+        return None
+
+    # Configuration parameters of network model
+    netconf = tree['netconf']
+
+    # Text description of the scenario run to print on screen
+    scenario = tree['desc'] if 'desc' in tree else "Description N/A"
+
+    logger.info('Experiment %d/%d | Preparing scenario: %s', curr_exp, n_exp, scenario)
+
+    if any(m not in DATA_COLLECTOR for m in metrics):
+        logger.error('There are no implementations for at least one data collector specified')
+        return None
+
+    collectors = {m: {} for m in metrics}
+
+    #!!!!!!!!!!the key execution!!!!!!!!!!!!!!!!!#
+    logger.info('Experiment %d/%d | Start simulation', curr_exp, n_exp)
+    results = exec_experiment(topology, workload, netconf, strategy, cache_policy, collectors)
+
+    duration = time.time() - start_time
+    logger.info('Experiment %d/%d | End simulation | Duration %s.',
+                curr_exp, n_exp, timestr(duration, True))
+    return (params, results, duration)
 
 
 def run_scenario(settings, params, curr_exp, n_exp):
@@ -178,100 +921,66 @@ def run_scenario(settings, params, curr_exp, n_exp):
         integer expressing the wall-clock duration of the experiment (in
         seconds)
     """
-    try:
-        start_time = time.time()
-        proc_name = mp.current_process().name
-        logger = logging.getLogger('runner-%s' % proc_name)
-
-        # Get list of metrics required
-        metrics = settings.DATA_COLLECTORS
-
-        # Copy parameters so that they can be manipulated
-        tree = copy.deepcopy(params)
-
-        # Set topology
-        topology_spec = tree['topology']
-        topology_name = topology_spec.pop('name')
-        if topology_name not in TOPOLOGY_FACTORY:
-            logger.error('No topology factory implementation for %s was found.'
-                         % topology_name)
-            return None
-        topology = TOPOLOGY_FACTORY[topology_name](**topology_spec)
-        workload_spec = tree['workload']
-        workload_name = workload_spec.pop('name')
-        if workload_name not in WORKLOAD:
-            logger.error('No workload implementation named %s was found.'
-                         % workload_name)
-            return None
-        workload = WORKLOAD[workload_name](topology, **workload_spec)
-
-        # Assign caches to nodes
-        if 'cache_placement' in tree:
-            cachepl_spec = tree['cache_placement']
-            cachepl_name = cachepl_spec.pop('name')
-            if cachepl_name not in CACHE_PLACEMENT:
-                logger.error('No cache placement named %s was found.'
-                             % cachepl_name)
-                return None
-            network_cache = cachepl_spec.pop('network_cache')
-            # Cache budget is the cumulative number of cache entries across
-            # the whole network
-            #change due to different rank
-            cachepl_spec['cache_budget'] = workload.contents_range * network_cache
-            CACHE_PLACEMENT[cachepl_name](topology, **cachepl_spec)
-
-        # Assign contents to sources
-        # If there are many contents, after doing this, performing operations
-        # requiring a topology deep copy, i.e. to_directed/undirected, will
-        # take long.
-        contpl_spec = tree['content_placement']
-        contpl_name = contpl_spec.pop('name')
-        if contpl_name not in CONTENT_PLACEMENT:
-            logger.error('No content placement implementation named %s was found.'
-                         % contpl_name)
-            return None
-        CONTENT_PLACEMENT[contpl_name](topology, workload.contents, **contpl_spec)
-
-        # caching and routing strategy definition
-        strategy = tree['strategy']
-        if strategy['name'] not in STRATEGY:
-            logger.error('No implementation of strategy %s was found.' % strategy['name'])
-            return None
-
-        # cache eviction policy definition
-        cache_policy = tree['cache_policy']
-        if cache_policy['name'] not in CACHE_POLICY:
-            logger.error('No implementation of cache policy %s was found.' % cache_policy['name'])
-            return None
-
-        # Configuration parameters of network model
-        netconf = tree['netconf']
-
-        # Text description of the scenario run to print on screen
-        scenario = tree['desc'] if 'desc' in tree else "Description N/A"
+    start_time = time.time()
+    proc_name = mp.current_process().name
+    logger = logging.getLogger('runner-%s' % proc_name)
+    scenario = _catch_failure(logger, curr_exp, n_exp, build_scenario,
+                              settings, params, logger)
+    if scenario is None:
+        return None
+    topology, workload = scenario
+    return _catch_failure(logger, curr_exp, n_exp, run_experiment, settings,
+                          topology, workload, params, curr_exp, n_exp, logger,
+                          start_time)
+
+
+def run_scenario_group(settings, experiments, n_exp):
+    """Run a group of experiments sharing the same scenario
+
+    The scenario, i.e. the topology with caches and contents placed and the
+    workload, is built once for all experiments, which must have the same
+    scenario fingerprint. The events of the workload are generated once and
+    replayed to each experiment, so that all experiments are run with the
+    same requests. Each experiment is run on a new network model, hence
+    starting with empty caches.
 
-        logger.info('Experiment %d/%d | Preparing scenario: %s', curr_exp, n_exp, scenario)
-
-        if any(m not in DATA_COLLECTOR for m in metrics):
-            logger.error('There are no implementations for at least one data collector specified')
-            return None
-
-        collectors = {m: {} for m in metrics}
-        
-        #!!!!!!!!!!the key execution!!!!!!!!!!!!!!!!!#
-        logger.info('Experiment %d/%d | Start simulation', curr_exp, n_exp)
-        results = exec_experiment(topology, workload, netconf, strategy, cache_policy, collectors)
+    Parameters
+    ----------
+    settings : Settings
+        The simulator settings
+    experiments : list
+        List of (params, curr_exp) 2-tuples, where params is the experiment
+        parameters tree and curr_exp is the sequence number of the experiment
+    n_exp : int
+        Number of scheduled experiments
 
-        duration = time.time() - start_time
-        logger.info('Experiment %d/%d | End simulation | Duration %s.',
-                    curr_exp, n_exp, timestr(duration, True))
-        return (params, results, duration)
-    except KeyboardInterrupt:
-        logger.error('Received keyboard interrupt. Terminating')
-        sys.exit(-signal.SIGINT)
-    except Exception as e:
-        err_type = str(type(e)).split("'")[1].split(".")[1]
-        err_message = e.message
-        logger.error('Experiment %d/%d | Failed | %s: %s\n%s',
-                     curr_exp, n_exp, err_type, err_message,
-                     traceback.format_exc())
+    Returns
+    -------
+    results : list
+        The value returned by `run_scenario` for each experiment
+    """
+    if len(experiments) == 1:
+        params, curr_exp = experiments[0]
+        return [run_scenario(settings, params, curr_exp, n_exp)]
+    start_time = time.time()
+    proc_name = mp.current_process().name
+    logger = logging.getLogger('runner-%s' % proc_name)
+    params, curr_exp = experiments[0]
+    scenario = _catch_failure(logger, curr_exp, n_exp, build_scenario,
+                              settings, params, logger)
+    if scenario is None:
+        return [None] * len(experiments)
+    topology, workload = scenario
+    workload = _catch_failure(logger, curr_exp, n_exp, RecordedWorkload,
+                              workload)
+    if workload is None:
+        return [None] * len(experiments)
+    # Time spent building the scenario, accounted equally to all experiments
+    setup_duration = (time.time() - start_time) / len(experiments)
+    results = []
+    for params, curr_exp in experiments:
+        results.append(_catch_failure(logger, curr_exp, n_exp, run_experiment,
+                                      settings, topology, workload, params,
+                                      curr_exp, n_exp, logger,
+                                      time.time() - setup_duration))
+    return results
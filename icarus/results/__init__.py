@@ -1,5 +1,7 @@
 """This package contains the code in charge of processing experiment results.
 """
 from .readwrite import *
+from .journal import *
+from .store import *
 from .plot import *
 from .visualize import *
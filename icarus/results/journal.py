@@ -0,0 +1,160 @@
+"""Journal of experiment results.
+
+The results journal is an append-only file where the results of each
+experiment are written as soon as the experiment completes, so that they
+survive a crash of the simulator and an interrupted simulation campaign can be
+resumed without running completed experiments again.
+
+The journal consists of a header followed by a sequence of records, each
+framed by its length and checksum. A record only partially written when the
+simulator was killed is detected and discarded when the journal is read.
+"""
+import hashlib
+import os
+import struct
+import zlib
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+
+__all__ = [
+    'experiment_fingerprint',
+    'ResultsJournal',
+    'read_results_journal',
+           ]
+
+
+# Header identifying a results journal
+_MAGIC = b'ICARUS-RESULTS-JOURNAL-1\n'
+
+# Frame preceding each record: length and CRC-32 checksum of the record
+_FRAME = struct.Struct('>II')
+
+
+def experiment_fingerprint(params):
+    """Return a fingerprint of the parameters of an experiment
+
+    Two experiments have the same fingerprint if they have the same parameter
+    trees.
+
+    Parameters
+    ----------
+    params : Tree
+        The experiment parameters
+
+    Returns
+    -------
+    fingerprint : str
+        The fingerprint of the experiment
+    """
+    h = hashlib.sha1()
+    h.update(repr(sorted(params.paths().items())).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _read_records(f):
+    """Read the records of a journal open for reading
+
+    Returns
+    -------
+    records : list
+        The records read
+    end : int
+        The offset of the end of the last record read correctly
+    """
+    if f.read(len(_MAGIC)) != _MAGIC:
+        raise ValueError('%s is not a results journal' % f.name)
+    records = []
+    end = f.tell()
+    while True:
+        frame = f.read(_FRAME.size)
+        if len(frame) < _FRAME.size:
+            break
+        length, checksum = _FRAME.unpack(frame)
+        data = f.read(length)
+        if len(data) < length or zlib.crc32(data) & 0xffffffff != checksum:
+            break
+        records.append(pickle.loads(data))
+        end = f.tell()
+    return records, end
+
+
+def read_results_journal(path):
+    """Read all records written to a results journal
+
+    Parameters
+    ----------
+    path : str
+        The path of the journal
+
+    Returns
+    -------
+    records : list
+        List of (key, params, results) 3-tuples, one per experiment, where key
+        is the key passed to `ResultsJournal.append`. A record partially
+        written is ignored
+    """
+    with open(path, 'rb') as f:
+        return _read_records(f)[0]
+
+
+class ResultsJournal(object):
+    """Append-only journal of experiment results.
+
+    Each record is written and synced to disk as soon as it is appended.
+    """
+
+    def __init__(self, path, resume=False):
+        """Constructor
+
+        Parameters
+        ----------
+        path : str
+            The path of the journal
+        resume : bool, optional
+            If *True* and the journal exists, its records are read and made
+            available in the *records* attribute and new records are appended
+            to them. Otherwise, the journal is created and must not exist
+        """
+        self.path = path
+        self.records = []
+        if not resume and os.path.exists(path):
+            raise ValueError('Journal %s already exists and resume is not '
+                             'requested' % path)
+        if resume and os.path.isfile(path):
+            self._file = open(path, 'r+b')
+            self.records, end = _read_records(self._file)
+            # Discard a record partially written
+            self._file.seek(end)
+            self._file.truncate()
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(_MAGIC)
+            self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, key, params, results):
+        """Append the results of an experiment to the journal
+
+        Parameters
+        ----------
+        key : object
+            The key identifying the experiment. It must be picklable
+        params : Tree
+            Tree of experiment parameters
+        results : Tree
+            Tree of experiment results
+        """
+        data = pickle.dumps((key, params, results), pickle.HIGHEST_PROTOCOL)
+        self._file.write(_FRAME.pack(len(data), zlib.crc32(data) & 0xffffffff))
+        self._file.write(data)
+        self._sync()
+
+    def close(self):
+        """Close the journal"""
+        self._file.close()
@@ -0,0 +1,204 @@
+"""Content-addressed store of experiment results.
+
+The results of an experiment are stored under a key computed from its
+parameters, its replication index and the version of Icarus, so that
+experiments already run by earlier simulation campaigns, for example
+overlapping parameter sweeps, do not need to be run again.
+
+Results are stored in a local directory, one file per experiment. If the
+size of the directory exceeds a limit, the least recently used results are
+removed.
+
+Notes
+-----
+Results are not invalidated when the code of the simulator changes without
+its version being updated. The store must be cleared in that case.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from icarus import __version__
+
+
+__all__ = ['ResultStore']
+
+
+logger = logging.getLogger('results-store')
+
+
+class ResultStore(object):
+    """Store of experiment results on a local directory.
+    """
+
+    # Extension of the files storing results
+    extension = '.pickle'
+
+    def __init__(self, directory, max_size=None):
+        """Constructor
+
+        Parameters
+        ----------
+        directory : str
+            The directory where results are stored. It is created if it does
+            not exist
+        max_size : int, optional
+            The maximum size of all stored results, in bytes. If *None*, the
+            size is unlimited
+        """
+        if max_size is not None and max_size < 0:
+            raise ValueError('max_size must be positive')
+        self.directory = directory
+        self.max_size = max_size
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._size = sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def key(fingerprint, replication):
+        """Return the key of the results of an experiment
+
+        Parameters
+        ----------
+        fingerprint : str
+            The fingerprint of the experiment parameters, as returned by
+            `experiment_fingerprint`
+        replication : int
+            The replication index of the experiment
+
+        Returns
+        -------
+        key : str
+            The key
+        """
+        h = hashlib.sha1()
+        h.update(repr((fingerprint, replication, __version__)).encode('utf-8'))
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.extension)
+
+    def _entries(self):
+        """Return (path, time of last use, size) 3-tuples of all stored
+        results"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.extension):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def __len__(self):
+        """Return the number of stored results"""
+        return len(self._entries())
+
+    def __contains__(self, key):
+        return os.path.isfile(self._path(key))
+
+    @property
+    def size(self):
+        """Return the size of all stored results, in bytes"""
+        return self._size
+
+    def get(self, key):
+        """Return the results stored under a key
+
+        Parameters
+        ----------
+        key : str
+            The key, as returned by `key`
+
+        Returns
+        -------
+        params : Tree
+            Tree of experiment parameters, or *None* if no results are stored
+            under the key
+        results : Tree
+            Tree of experiment results, or *None* if no results are stored
+            under the key
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                params, results = pickle.load(f)
+        except (IOError, OSError):
+            return None, None
+        except Exception:
+            logger.warning('Could not read stored results %s, removing them',
+                           path)
+            self._remove(path)
+            return None, None
+        # Mark results as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return params, results
+
+    def put(self, key, params, results):
+        """Store the results of an experiment
+
+        Parameters
+        ----------
+        key : str
+            The key, as returned by `key`
+        params : Tree
+            Tree of experiment parameters
+        results : Tree
+            Tree of experiment results
+        """
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((params, results), f, pickle.HIGHEST_PROTOCOL)
+            if os.path.isfile(path):
+                self._remove(path)
+            size = os.path.getsize(tmp_path)
+            # Renaming makes results visible only once completely written
+            os.rename(tmp_path, path)
+        except Exception:
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._size += size
+        if self.max_size is not None and self._size > self.max_size:
+            self.evict(self.max_size)
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        self._size -= size
+
+    def evict(self, size):
+        """Remove the least recently used results until the size of all
+        stored results does not exceed a given size
+
+        Parameters
+        ----------
+        size : int
+            The size, in bytes
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        self._size = sum(entry_size for _, _, entry_size in entries)
+        for path, _, _ in entries:
+            if self._size <= size:
+                break
+            self._remove(path)
+
+    def clear(self):
+        """Remove all stored results"""
+        self.evict(0)
@@ -0,0 +1,68 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from icarus.results import ResultsJournal, read_results_journal, \
+                           experiment_fingerprint
+from icarus.util import Tree
+
+
+class TestResultsJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'results.journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_append_read(self):
+        journal = ResultsJournal(self.path)
+        journal.append(('a', 0), Tree({'alpha': 1}), Tree({'m': {'x': 1}}))
+        journal.append(('a', 1), Tree({'alpha': 1}), Tree({'m': {'x': 2}}))
+        records = read_results_journal(self.path)
+        journal.close()
+        self.assertEqual(2, len(records))
+        key, params, results = records[1]
+        self.assertEqual(('a', 1), key)
+        self.assertEqual(1, params['alpha'])
+        self.assertEqual(2, results['m']['x'])
+
+    def test_resume(self):
+        journal = ResultsJournal(self.path)
+        journal.append(1, Tree({'alpha': 1}), Tree())
+        journal.close()
+        journal = ResultsJournal(self.path, resume=True)
+        self.assertEqual([1], [r[0] for r in journal.records])
+        journal.append(2, Tree({'alpha': 2}), Tree())
+        journal.close()
+        self.assertEqual([1, 2], [r[0] for r in read_results_journal(self.path)])
+        # Without resume, an existing journal is never overwritten
+        self.assertRaises(ValueError, ResultsJournal, self.path)
+        self.assertEqual([1, 2], [r[0] for r in read_results_journal(self.path)])
+
+    def test_partial_record(self):
+        journal = ResultsJournal(self.path)
+        journal.append(1, Tree({'alpha': 1}), Tree())
+        journal.append(2, Tree({'alpha': 2}), Tree())
+        journal.close()
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+        self.assertEqual([1], [r[0] for r in read_results_journal(self.path)])
+        journal = ResultsJournal(self.path, resume=True)
+        journal.append(3, Tree({'alpha': 3}), Tree())
+        journal.close()
+        self.assertEqual([1, 3], [r[0] for r in read_results_journal(self.path)])
+
+    def test_invalid_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a journal')
+        self.assertRaises(ValueError, read_results_journal, self.path)
+
+    def test_fingerprint(self):
+        a = Tree({'topology': {'name': 'PATH', 'n': 3}, 'alpha': 1})
+        b = Tree({'alpha': 1, 'topology': {'n': 3, 'name': 'PATH'}})
+        c = Tree({'alpha': 1, 'topology': {'n': 4, 'name': 'PATH'}})
+        self.assertEqual(experiment_fingerprint(a), experiment_fingerprint(b))
+        self.assertNotEqual(experiment_fingerprint(a), experiment_fingerprint(c))
@@ -0,0 +1,66 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+
+from icarus.results import ResultStore
+from icarus.util import Tree
+
+
+class TestResultStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.directory = os.path.join(self.tmp_dir, 'store')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_key(self):
+        self.assertEqual(ResultStore.key('a', 0), ResultStore.key('a', 0))
+        self.assertNotEqual(ResultStore.key('a', 0), ResultStore.key('a', 1))
+        self.assertNotEqual(ResultStore.key('a', 0), ResultStore.key('b', 0))
+
+    def test_put_get(self):
+        store = ResultStore(self.directory)
+        key = ResultStore.key('a', 0)
+        self.assertNotIn(key, store)
+        self.assertEqual((None, None), store.get(key))
+        store.put(key, Tree({'alpha': 1}), Tree({'m': {'x': 1}}))
+        self.assertIn(key, store)
+        params, results = store.get(key)
+        self.assertEqual(1, params['alpha'])
+        self.assertEqual(1, results['m']['x'])
+        # Results are found by another store on the same directory
+        store = ResultStore(self.directory)
+        self.assertEqual(1, len(store))
+        self.assertGreater(store.size, 0)
+        self.assertEqual(1, store.get(key)[0]['alpha'])
+        store.clear()
+        self.assertEqual(0, len(store))
+        self.assertEqual(0, store.size)
+
+    def test_eviction(self):
+        store = ResultStore(self.directory)
+        store.put('a', Tree({'alpha': 1}), Tree({'x': 1}))
+        entry_size = store.size
+        store = ResultStore(self.directory, max_size=int(2.5 * entry_size))
+        now = time.time()
+        os.utime(os.path.join(self.directory, 'a.pickle'), (now - 20, now - 20))
+        store.put('b', Tree({'alpha': 1}), Tree({'x': 2}))
+        os.utime(os.path.join(self.directory, 'b.pickle'), (now - 10, now - 10))
+        # Using results makes them the most recently used
+        store.get('a')
+        store.put('c', Tree({'alpha': 1}), Tree({'x': 3}))
+        self.assertIn('a', store)
+        self.assertNotIn('b', store)
+        self.assertIn('c', store)
+        self.assertLessEqual(store.size, store.max_size)
+
+    def test_corrupted(self):
+        store = ResultStore(self.directory)
+        with open(os.path.join(self.directory, 'a.pickle'), 'wb') as f:
+            f.write(b'corrupted')
+        self.assertEqual((None, None), store.get('a'))
+        self.assertNotIn('a', store)
@@ -10,10 +10,11 @@ import multiprocessing as mp
 
 from icarus.util import Settings, config_logging
 from icarus.registry import RESULTS_WRITER
+from icarus.results import ResultsJournal
 from icarus.orchestration import Orchestrator
 
 
-__all__ = ['run', 'handler']
+__all__ = ['run', 'handler', 'journal_path']
 
 
 logger = logging.getLogger('main')
@@ -25,7 +26,9 @@ def handler(settings, orch, output, signum=None, frame=None):
     This function is called when the simulator receive SIGTERM, SIGHUP, SIGKILL
     or SIGQUIT from the OS.
 
-    Its function is simply to write on a file the partial results.
+    It stops the orchestrator. The results of completed experiments are not
+    written here, as they are already in the journal, from which they are
+    read by running the simulator again with --resume.
 
     Parameters
     ----------
@@ -37,9 +40,10 @@ def handler(settings, orch, output, signum=None, frame=None):
         The output file
     """
     logger.error('Received signal %d. Terminating' % signum)
-    RESULTS_WRITER[settings.RESULTS_FORMAT](orch.results, output)
-    logger.info('Saved intermediate results to file %s' % os.path.abspath(output))
     orch.stop()
+    logger.info('Results of completed experiments are in journal %s'
+                % os.path.abspath(journal_path(output)))
+    logger.info('Run again with --resume to resume the simulation')
     sys.exit(-signum)
 
 
@@ -76,11 +80,32 @@ def _validate_settings(settings, freeze=True):
         settings.freeze()
 
 
-def run(config_file, output, config_override):
+def journal_path(output):
+    """Return the path of the journal of the results saved to a file
+
+    Parameters
+    ----------
+    output : str
+        The file name where results are saved
+
+    Returns
+    -------
+    path : str
+        The path of the journal
+    """
+    return output + '.journal'
+
+
+def run(config_file, output, config_override, resume=False):
     """
     Run function. It starts the simulator.
     experiments
 
+    The results of each experiment are also written to a journal as soon as
+    the experiment completes. The journal is removed once all results are
+    saved. If a journal left by an interrupted execution exists, the
+    simulator does not start unless resuming it.
+
     Parameters
     ----------
     config : str
@@ -89,6 +114,9 @@ def run(config_file, output, config_override):
         The file name where results will be saved
     config_override : dict, optional
         Configuration parameters overriding parameters in the file
+    resume : bool, optional
+        If True, the experiments whose results were written to the journal by
+        an interrupted execution are not run again
     """
     # Read settings from file and save them in icarus.conf.settings
     settings = Settings()
@@ -105,7 +133,13 @@ def run(config_file, output, config_override):
     # Validate settings
     _validate_settings(settings, freeze=True)
     # set up orchestration
-    orch = Orchestrator(settings)
+    if not resume and os.path.exists(journal_path(output)):
+        logger.error('Journal %s of an interrupted execution exists. Run with '
+                     '--resume to resume it or remove the journal. Exiting'
+                     % os.path.abspath(journal_path(output)))
+        sys.exit(-1)
+    journal = ResultsJournal(journal_path(output), resume=resume)
+    orch = Orchestrator(settings, journal=journal)
     for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGQUIT, signal.SIGABRT):
         signal.signal(sig, functools.partial(handler, settings, orch, output))
     logger.info('Launching orchestrator')
@@ -114,3 +148,5 @@ def run(config_file, output, config_override):
     results = orch.results
     RESULTS_WRITER[settings.RESULTS_FORMAT](results, output)
     logger.info('Saved results to file %s' % os.path.abspath(output))
+    journal.close()
+    os.remove(journal.path)
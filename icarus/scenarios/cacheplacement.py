@@ -10,6 +10,8 @@ import networkx as nx
 
 from icarus.util import iround
 from icarus.registry import register_cache_placement
+from icarus.tools.artifacts import shared_path_lengths, \
+                                      shared_betweenness_centrality
 from icarus.scenarios.algorithms import compute_clusters, compute_p_median, deploy_clusters
 
 __all__ = [
@@ -69,7 +71,7 @@ def betweenness_centrality_cache_placement(topology, cache_budget, **kwargs):
     cache_budget : int
         The cumulative cache budget
     """
-    betw = nx.betweenness_centrality(topology)
+    betw = shared_betweenness_centrality(topology)
     total_betw = sum(betw.values())
     icr_candidates = topology.graph['icr_candidates']
     for v in icr_candidates:
@@ -108,7 +110,7 @@ def uniform_consolidated_cache_placement(topology, cache_budget, spread=0.5,
     if target not in ('top', 'bottom'):
         raise ValueError('target argument must be either "top" or "bottom"')
     if metric_dict is None and spread < 1:
-        metric_dict = nx.betweenness_centrality(topology)
+        metric_dict = shared_betweenness_centrality(topology)
 
     icr_candidates = topology.graph['icr_candidates']
     if spread == 1:
@@ -205,7 +207,7 @@ def optimal_median_cache_placement(topology, cache_budget, n_cache_nodes,
                             for v in topology.receivers()}
     else:
         # Need to optimally allocate caching nodes
-        distances = nx.all_pairs_dijkstra_path_length(topology, weight=weight)
+        distances = shared_path_lengths(topology, weight=weight)
         sources = topology.sources()
         d = {u: {} for u in icr_candidates}
         for u in icr_candidates:
@@ -258,7 +260,7 @@ def optimal_hashrouting_cache_placement(topology, cache_budget, n_cache_nodes,
         caches = list(icr_candidates)
     else:
         # Need to optimally allocate caching nodes
-        distances = nx.all_pairs_dijkstra_path_length(topology, weight=weight)
+        distances = shared_path_lengths(topology, weight=weight)
         d = {}
         for v in icr_candidates:
             d[v] = 0
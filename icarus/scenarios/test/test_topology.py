@@ -1,6 +1,11 @@
+import os
+import shutil
+import tempfile
 import unittest
 
 import icarus.scenarios as topology
+import icarus.scenarios.topology as topology_module
+import icarus.tools.artifacts as artifacts
 
 
 class TestTree(unittest.TestCase):
@@ -55,3 +60,55 @@ class TestRocketFuel(unittest.TestCase):
     def test_rocketfuel(self):
         t = topology.topology_rocketfuel_latency(1221, 0.1, 20)
         self.assertEqual(len(t.receivers()), len(t.graph['icr_candidates']))
+
+
+class TestTopologyCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        topology.set_topology_cache(self.cache_dir)
+        artifacts.clear_shared_artifacts()
+
+    def tearDown(self):
+        topology.set_topology_cache(None)
+        artifacts.clear_shared_artifacts()
+        shutil.rmtree(self.cache_dir)
+
+    def test_cache(self):
+        t = topology.topology_rocketfuel_latency(1221, 0.1, 20)
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+        shortest_paths = artifacts.shared_shortest_paths(t)
+        artifacts.clear_shared_artifacts()
+        t_cached = topology.topology_rocketfuel_latency(1221, source_ratio=0.1,
+                                                        ext_delay=20)
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+        self.assertIsNot(t, t_cached)
+        self.assertEqual(list(t.nodes(data=True)), list(t_cached.nodes(data=True)))
+        self.assertEqual(list(t.edges(data=True)), list(t_cached.edges(data=True)))
+        self.assertEqual(t.graph, t_cached.graph)
+        # Shortest paths are loaded with the topology
+        cached_paths = artifacts.shared_shortest_paths(t_cached)
+        self.assertIsNot(shortest_paths, cached_paths)
+        self.assertTrue((shortest_paths.next_hop == cached_paths.next_hop).all())
+
+    def test_arguments(self):
+        topology.topology_rocketfuel_latency(1221, 0.1, 20)
+        topology.topology_rocketfuel_latency(1221, 0.2, 20)
+        self.assertEqual(2, len(os.listdir(self.cache_dir)))
+
+    def test_constants(self):
+        internal_link_delay = topology_module.INTERNAL_LINK_DELAY
+        try:
+            topology.topology_geant()
+            topology_module.INTERNAL_LINK_DELAY = internal_link_delay + 1
+            t = topology.topology_geant()
+        finally:
+            topology_module.INTERNAL_LINK_DELAY = internal_link_delay
+        self.assertEqual(2, len(os.listdir(self.cache_dir)))
+        self.assertIn(internal_link_delay + 1,
+                      [d for _, _, d in t.edges_iter(data='delay')])
+
+    def test_disabled(self):
+        topology.set_topology_cache(None)
+        topology.topology_rocketfuel_latency(1221, 0.1, 20)
+        self.assertEqual(0, len(os.listdir(self.cache_dir)))
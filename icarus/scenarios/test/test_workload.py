@@ -1,5 +1,8 @@
+import random
 import unittest
 
+import fnss
+
 import icarus.scenarios as workload
 
 
@@ -69,3 +72,64 @@ class TestYCBS(unittest.TestCase):
         self.assertTrue(ev_3['log'])
         self.assertIn(ev_3['item'], range(1, n_items + 1))
         self.assertEqual(ev_3['op'], "READ")
+
+
+class TestDiffrank(unittest.TestCase):
+
+    @classmethod
+    def diffrank_topology(cls):
+        topology = fnss.Topology()
+        topology.add_path([0, 1, 2, 3, 4])
+        fnss.add_stack(topology, 0, 'source')
+        for v in (1, 2, 3, 4):
+            fnss.add_stack(topology, v, 'receiver')
+            topology.node[v]['group'] = v
+        return topology
+
+    def test_vectorized(self):
+        n_contents = 10
+        wl = workload.DiffrankWorkload(self.diffrank_topology(), n_contents,
+                                       n_rank=4, rank_per_group=1, alpha=0.8,
+                                       n_warmup=30, n_measured=70, seed=1,
+                                       vectorized=True, block_size=16)
+        events = list(wl)
+        self.assertEqual(100, len(events))
+        self.assertEqual(30, len([e for _, e in events if not e['log']]))
+        self.assertFalse(any(e['log'] for _, e in events[:30]))
+        times = [t for t, _ in events]
+        self.assertEqual(sorted(times), times)
+        for _, e in events:
+            rank = wl.topology.node[e['receiver']]['rank']
+            self.assertIn(e['content'], range(n_contents * (rank - 1) + 1,
+                                              n_contents * rank + 1))
+
+    def test_vectorized_seed(self):
+        def events(seed, block_size):
+            return list(workload.DiffrankWorkload(
+                            self.diffrank_topology(), 10, n_rank=4,
+                            rank_per_group=1, alpha=0.8, n_warmup=10,
+                            n_measured=40, seed=seed, vectorized=True,
+                            block_size=block_size))
+        self.assertEqual(events(3, 8), events(3, 8))
+        self.assertNotEqual(events(3, 8), events(4, 8))
+
+    def test_scalar_seed(self):
+        # The scalar generator is seeded after receiver ranks are assigned
+        wl = workload.DiffrankWorkload(self.diffrank_topology(), 10, n_rank=8,
+                                       rank_per_group=2, alpha=0.8, rate=2.0,
+                                       n_warmup=10, n_measured=40, seed=5)
+        t_event = next(iter(wl))[0]
+        random.seed(5)
+        self.assertEqual(random.expovariate(2.0), t_event)
+
+    def test_flat_events(self):
+        def events(vectorized, flat_events):
+            return list(workload.DiffrankWorkload(
+                            self.diffrank_topology(), 10, n_rank=4,
+                            rank_per_group=1, alpha=0.8, n_warmup=10,
+                            n_measured=40, seed=2, vectorized=vectorized,
+                            flat_events=flat_events))
+        flat = events(True, True)
+        self.assertEqual(50, len(flat))
+        self.assertEqual([(t, e['receiver'], e['content'], e['log'])
+                          for t, e in events(True, False)], flat)
@@ -11,16 +11,28 @@ A valid ICN topology must have the following attributes:
 """
 from __future__ import division
 
+import os
 from os import path
+import functools
+import hashlib
+import inspect
+import logging
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
 
 import networkx as nx
 import fnss
 
+from icarus import __version__
 from icarus.registry import register_topology_factory
+from icarus.tools.artifacts import shared_shortest_paths, share_shortest_paths
 
 
 __all__ = [
         'IcnTopology',
+        'set_topology_cache',
         'topology_tree',
         'topology_path',
         'topology_ring',
@@ -46,6 +58,120 @@ TOPOLOGY_RESOURCES_DIR = path.abspath(path.join(path.dirname(__file__),
                                                 path.pardir, path.pardir,
                                                 'resources', 'topologies'))
 
+# Directory where topologies parsed from resource files are cached and whether
+# their shortest paths are cached as well. If the directory is None,
+# topologies are parsed every time they are requested
+TOPOLOGY_CACHE_DIR = None
+TOPOLOGY_CACHE_PATHS = True
+
+logger = logging.getLogger('topology')
+
+
+def set_topology_cache(directory, paths=True):
+    """Enable or disable the on-disk cache of parsed topologies
+
+    Parameters
+    ----------
+    directory : str
+        The directory where topologies are cached. If *None*, the cache is
+        disabled
+    paths : bool, optional
+        If *True*, the shortest paths of cached topologies are cached as well
+        and shared by all experiments loading them
+    """
+    global TOPOLOGY_CACHE_DIR, TOPOLOGY_CACHE_PATHS
+    TOPOLOGY_CACHE_DIR = directory
+    TOPOLOGY_CACHE_PATHS = paths
+
+
+def _update_code_hash(h, code):
+    """Update a hash with the bytecode and constants of a code object and of
+    the code objects nested in it, e.g. those of generator expressions"""
+    h.update(code.co_code)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            _update_code_hash(h, const)
+        else:
+            h.update(repr(const).encode('utf-8'))
+
+
+def _factory_hash(factory):
+    """Return a hash of the code of a topology factory, of the module
+    constants it references, e.g. link delays, and of the version of Icarus
+    """
+    h = hashlib.sha1()
+    h.update(repr(__version__).encode('utf-8'))
+    code = factory.__code__
+    _update_code_hash(h, code)
+    module_globals = factory.__globals__
+    for name in code.co_names:
+        value = module_globals.get(name)
+        if isinstance(value, (bool, int, float, str, tuple)):
+            h.update(repr((name, value)).encode('utf-8'))
+    return h
+
+
+def cached_topology(*resources):
+    """Decorator caching on disk the topologies built by a factory parsing
+    resource files
+
+    Cached topologies are stored in `TOPOLOGY_CACHE_DIR` and keyed by the
+    arguments of the factory, the content of the resource files, the code of
+    the factory, the module constants it references and the version of
+    Icarus, so that a topology is rebuilt if any of them changes. Each call
+    returns a new topology object, which can be freely modified.
+
+    Changes to functions called by the factory do not invalidate cached
+    topologies, unless the version of Icarus changes as well.
+
+    Parameters
+    ----------
+    *resources : str
+        Paths of the resource files parsed by the factory, relative to
+        `TOPOLOGY_RESOURCES_DIR`. They may contain replacement fields
+        referring to arguments of the factory, e.g. '{asn}'
+    """
+    def decorator(factory):
+        @functools.wraps(factory)
+        def wrapper(*args, **kwargs):
+            if TOPOLOGY_CACHE_DIR is None:
+                return factory(*args, **kwargs)
+            callargs = inspect.getcallargs(factory, *args, **kwargs)
+            h = _factory_hash(factory)
+            h.update(repr(sorted(callargs.items())).encode('utf-8'))
+            for resource in resources:
+                with open(path.join(TOPOLOGY_RESOURCES_DIR,
+                                    resource.format(**callargs)), 'rb') as f:
+                    h.update(f.read())
+            cache_file = path.join(TOPOLOGY_CACHE_DIR, '%s-%s.pickle'
+                                   % (factory.__name__, h.hexdigest()))
+            if path.isfile(cache_file):
+                try:
+                    with open(cache_file, 'rb') as f:
+                        topology, shortest_paths = pickle.load(f)
+                except Exception:
+                    logger.warning('Could not load cached topology %s, '
+                                   'rebuilding it', cache_file)
+                else:
+                    if shortest_paths is not None:
+                        share_shortest_paths(topology, shortest_paths)
+                    return topology
+            topology = factory(*args, **kwargs)
+            shortest_paths = shared_shortest_paths(topology) \
+                             if TOPOLOGY_CACHE_PATHS else None
+            if not path.isdir(TOPOLOGY_CACHE_DIR):
+                os.makedirs(TOPOLOGY_CACHE_DIR)
+            # Write to a temporary file first so that concurrent processes
+            # never read a partially written file
+            tmp_file = '%s.%d' % (cache_file, os.getpid())
+            with open(tmp_file, 'wb') as f:
+                pickle.dump((topology, shortest_paths), f,
+                            pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_file, cache_file)
+            return topology
+        return wrapper
+    return decorator
+
 
 class IcnTopology(fnss.Topology):
     """Class modelling an ICN topology
@@ -258,6 +384,7 @@ def topology_mesh(n, m, delay_int=1, delay_ext=5, **kwargs):
 
 
 @register_topology_factory('GEANT')
+@cached_topology('Geant2012.graphml')
 def topology_geant(**kwargs):
     """Return a scenario based on GEANT topology
     Parameters
@@ -309,6 +436,7 @@ def topology_geant(**kwargs):
 
 
 @register_topology_factory('TISCALI')
+@cached_topology('3257.r0.cch')
 def topology_tiscali(**kwargs):
     """Return a scenario based on Tiscali topology, parsed from RocketFuel dataset
     Parameters
@@ -387,6 +515,7 @@ def topology_tiscali(**kwargs):
 
 
 @register_topology_factory('WIDE')
+@cached_topology('WideJpn.graphml')
 def topology_wide(**kwargs):
     """Return a scenario based on GARR topology
     Parameters
@@ -431,6 +560,7 @@ def topology_wide(**kwargs):
 
 
 @register_topology_factory('GARR')
+@cached_topology('Garr201201.graphml')
 def topology_garr(**kwargs):
     """Return a scenario based on GARR topology
     Parameters
@@ -476,6 +606,7 @@ def topology_garr(**kwargs):
 
 
 @register_topology_factory('GARR_2')
+@cached_topology('Garr201201.graphml')
 def topology_garr2(**kwargs):
     """Return a scenario based on GARR topology.
     Differently from plain GARR, this topology some receivers are appended to
@@ -531,6 +662,7 @@ def topology_garr2(**kwargs):
 
 
 @register_topology_factory('GEANT_2')
+@cached_topology('Geant2012.graphml')
 def topology_geant2(**kwargs):
     """Return a scenario based on GEANT topology.
     Differently from plain GEANT, this topology some receivers are appended to
@@ -589,6 +721,7 @@ def topology_geant2(**kwargs):
     return IcnTopology(topology)
 
 @register_topology_factory('TISCALI_2')
+@cached_topology('3257.r0.cch')
 def topology_tiscali2(**kwargs):
     """Return a scenario based on Tiscali topology, parsed from RocketFuel dataset
     Differently from plain Tiscali, this topology some receivers are appended to
@@ -675,6 +808,7 @@ def topology_tiscali2(**kwargs):
 
 
 @register_topology_factory('ROCKET_FUEL')
+@cached_topology(path.join('rocketfuel-latency', '{asn}', 'latencies.intra'))
 def topology_rocketfuel_latency(asn, source_ratio=0.1, ext_delay=EXTERNAL_LINK_DELAY, **kwargs):
     """Parse a generic RocketFuel topology with annotated latencies
     To each node of the parsed topology it is attached an artificial receiver
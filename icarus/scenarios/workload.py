@@ -14,6 +14,10 @@ following attributes:
  * log: A boolean value indicating whether this request should be logged or not
    for measurement purposes.
 
+Alternatively, a workload may return flat (time, receiver, content, log)
+4-tuples, which spare the simulation engine building and unpacking a
+dictionary for every event. All events of a workload must have the same format.
+
 Each workload must expose the `contents` attribute which is an iterable of
 all content identifiers. This is needed for content placement.
 """
@@ -21,13 +25,16 @@ import random
 import csv
 import array
 import math
+
+import numpy as np
 import networkx as nx
 
 from icarus.tools import TruncatedZipfDist
 from icarus.registry import register_workload
 
 __all__ = [
-        'DiffrankWorkload'
+        'DiffrankWorkload',
+        'RecordedWorkload',
            ]
 
 
@@ -35,7 +42,8 @@ __all__ = [
 class DiffrankWorkload(object):
     #different rankings with same alpha
     def __init__(self, topology,  n_contents, n_rank, rank_per_group, alpha, beta=0, 
-            rate=1.0, n_warmup=10**5, n_measured=4*10**5, seed=None, **kwargs):
+            rate=1.0, n_warmup=10**5, n_measured=4*10**5, seed=None,
+            vectorized=False, block_size=2**16, flat_events=False, **kwargs):
         if alpha < 0:
             raise ValueError('alpha must be positive')
         if beta < 0:
@@ -43,6 +51,11 @@ class DiffrankWorkload(object):
         self.receivers = [v for v in topology.nodes_iter() 
                 if topology.node[v]['stack'][0] == 'receiver']
         self.topology = topology
+        if vectorized:
+            # Seed before ranks are assigned so that the seed also determines
+            # the rank of each receiver. The scalar generator is seeded after
+            # ranks are assigned, as it always was, to reproduce earlier runs
+            random.seed(seed)
         rank_lst = array.array('i',(i for i in range(1,(n_rank+1))))
         
         
@@ -62,6 +75,16 @@ class DiffrankWorkload(object):
         self.n_warmup = n_warmup
         self.n_measured = n_measured
         random.seed(seed)
+        self.seed = seed
+        # If vectorized, events are generated in blocks of block_size events
+        # using NumPy, from a random number generator seeded with seed
+        self.vectorized = vectorized
+        self.block_size = int(block_size)
+        if self.block_size <= 0:
+            raise ValueError('block_size must be positive')
+        # If flat_events, events are (time, receiver, content, log) tuples
+        # instead of (time, event) tuples
+        self.flat_events = flat_events
         self.beta = beta
         if beta != 0:
             degree = nx.degree(self.topology)
@@ -69,6 +92,9 @@ class DiffrankWorkload(object):
             self.receiver_dist = TruncatedZipfDist(beta, len(self.receivers))
 
     def __iter__(self):
+        return self._vectorized_iter() if self.vectorized else self._iter()
+
+    def _iter(self):
         req_counter = 0
         t_event = 0.0
         while req_counter < self.n_warmup + self.n_measured:
@@ -82,7 +108,114 @@ class DiffrankWorkload(object):
             content = int(self.zipf.rv()) + self.n_contents * rank_receiver
             #print ("content:%d, self.n_contents:%d, rank_receiver:%d") % (content, self.n_contents, rank_receiver)
             log = (req_counter >= self.n_warmup)
-            event = {'receiver': receiver, 'content': content, 'log': log}
-            yield (t_event, event)
+            if self.flat_events:
+                yield (t_event, receiver, content, log)
+            else:
+                event = {'receiver': receiver, 'content': content, 'log': log}
+                yield (t_event, event)
             req_counter += 1
         raise StopIteration()
+
+    def _vectorized_iter(self):
+        """Generate events in blocks using NumPy.
+
+        Inter-arrival times, receivers and content ranks of a whole block are
+        drawn at once and events are then yielded from the block. Given the
+        same seed, the same sequence of events is generated.
+        """
+        rng = np.random.RandomState(self.seed)
+        n_events = self.n_warmup + self.n_measured
+        n_receivers = len(self.receivers)
+        # Offset of the content identifiers requested by each receiver
+        offset = self.n_contents * np.array([self.topology.node[v]['rank'] - 1
+                                             for v in self.receivers])
+        receivers = self.receivers
+        n_warmup = self.n_warmup
+        req_counter = 0
+        t_event = 0.0
+        while req_counter < n_events:
+            size = min(self.block_size, n_events - req_counter)
+            t = t_event + np.cumsum(rng.exponential(1.0 / self.rate, size))
+            t_event = t[-1]
+            if self.beta == 0:
+                receiver = rng.randint(0, n_receivers, size)
+            else:
+                receiver = np.searchsorted(self.receiver_dist.cdf,
+                                           rng.random_sample(size))
+            content = np.searchsorted(self.zipf.cdf, rng.random_sample(size)) \
+                      + 1 + offset[receiver]
+            events = zip(t.tolist(), receiver.tolist(), content.tolist())
+            if self.flat_events:
+                for t_ev, i, c in events:
+                    yield (t_ev, receivers[i], c, req_counter >= n_warmup)
+                    req_counter += 1
+            else:
+                for t_ev, i, c in events:
+                    log = (req_counter >= n_warmup)
+                    event = {'receiver': receivers[i], 'content': c, 'log': log}
+                    yield (t_ev, event)
+                    req_counter += 1
+
+
+class RecordedWorkload(object):
+    """Workload replaying the events generated by another workload.
+
+    The events of the wrapped workload are generated once, when this object
+    is created, and stored compactly. Each iteration then returns the same
+    events, as flat (time, receiver, content, log) 4-tuples, so that
+    experiments run on this workload are run with the same requests.
+
+    All other attributes, e.g. `contents`, are those of the wrapped workload.
+    """
+
+    def __init__(self, workload):
+        """Constructor
+
+        Parameters
+        ----------
+        workload : iterable
+            The workload whose events are recorded
+        """
+        self.workload = workload
+        self._time = array.array('d')
+        # Receivers are stored as indexes of the list of all receivers
+        self._receiver = array.array('i')
+        self._receivers = []
+        self._content = array.array('q')
+        self._log = bytearray()
+        receiver_index = {}
+        for event in workload:
+            if len(event) == 4:
+                t, receiver, content, log = event
+            else:
+                t, event = event
+                receiver = event['receiver']
+                content = event['content']
+                log = event['log']
+            if receiver not in receiver_index:
+                receiver_index[receiver] = len(self._receivers)
+                self._receivers.append(receiver)
+            try:
+                self._content.append(content)
+            except (TypeError, OverflowError):
+                # Content identifiers are not all integers
+                self._content = list(self._content)
+                self._content.append(content)
+            self._time.append(t)
+            self._receiver.append(receiver_index[receiver])
+            self._log.append(1 if log else 0)
+
+    def __len__(self):
+        return len(self._time)
+
+    def __iter__(self):
+        receivers = self._receivers
+        for t, i, content, log in zip(self._time, self._receiver,
+                                      self._content, self._log):
+            yield (t, receivers[i], content, log == 1)
+
+    def __getattr__(self, name):
+        if name == 'workload':
+            # Not set yet, e.g. while unpickling
+            raise AttributeError(name)
+        return getattr(self.workload, name)
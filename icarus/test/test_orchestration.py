@@ -0,0 +1,285 @@
+import unittest
+import copy
+import os
+import random
+import shutil
+import tempfile
+
+import icarus.orchestration as orchestration
+from icarus.execution import DataCollector
+from icarus.orchestration import ExperimentCostModel, Orchestrator
+from icarus.registry import DATA_COLLECTOR, WORKLOAD
+from icarus.results import ResultsJournal, read_results_journal
+from icarus.scenarios import RecordedWorkload
+import icarus.tools.artifacts as artifacts
+from icarus.util import Settings, Tree
+
+
+def experiment(n_measured, strategy='LCE', topology='PATH'):
+    return Tree({'topology': {'name': topology},
+                 'workload': {'name': 'STATIONARY', 'n_warmup': 0,
+                              'n_measured': n_measured, 'n_contents': 100},
+                 'cache_placement': {'name': 'UNIFORM', 'network_cache': 0.1},
+                 'strategy': {'name': strategy},
+                 'cache_policy': {'name': 'LRU'}})
+
+
+class TestExperimentCostModel(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_cost_units(self):
+        model = ExperimentCostModel()
+        self.assertGreater(model.estimate(experiment(20)),
+                           model.estimate(experiment(10)))
+        self.assertGreater(model.estimate(experiment(10, 'NRR')),
+                           model.estimate(experiment(10)))
+        exp = experiment(10)
+        exp['topology']['n'] = 100
+        self.assertGreater(model.estimate(exp),
+                           model.estimate(experiment(10)))
+        self.assertGreater(model.estimate(Tree()), 0)
+
+    def test_recorded_durations(self):
+        model = ExperimentCostModel()
+        model.update(experiment(10), 30)
+        model.update(experiment(10, 'NRR'), 5)
+        self.assertAlmostEqual(30, model.estimate(experiment(10)))
+        self.assertAlmostEqual(60, model.estimate(experiment(20)))
+        self.assertAlmostEqual(10, model.estimate(experiment(20, 'NRR')))
+        # No duration recorded on this topology, use those of all experiments
+        rate = 35 / (ExperimentCostModel.cost_units(experiment(10)) +
+                     ExperimentCostModel.cost_units(experiment(10, 'NRR')))
+        self.assertAlmostEqual(
+            rate * ExperimentCostModel.cost_units(experiment(10, 'LCE', 'TREE')),
+            model.estimate(experiment(10, 'LCE', 'TREE')))
+
+    def test_save_load(self):
+        path = os.path.join(self.tmp_dir, 'durations', 'durations.json')
+        model = ExperimentCostModel()
+        model.update(experiment(10), 30)
+        model.save(path)
+        model = ExperimentCostModel.load(path)
+        self.assertAlmostEqual(60, model.estimate(experiment(20)))
+        # Saving again replaces the file and leaves no temporary file behind
+        model.update(experiment(10), 40)
+        model.save(path)
+        self.assertEqual(['durations.json'], os.listdir(os.path.dirname(path)))
+        self.assertEqual(model.history, ExperimentCostModel.load(path).history)
+        model = ExperimentCostModel.load(os.path.join(self.tmp_dir, 'none'))
+        self.assertEqual({}, model.history)
+
+
+class TestWorkerSettings(unittest.TestCase):
+
+    def test_worker_settings(self):
+        settings = Settings()
+        settings.DATA_COLLECTORS = ['LATENCY']
+        settings.TOPOLOGY_CACHE_DIR = 'cache'
+        settings.EXPERIMENT_QUEUE = [Tree({'alpha': i}) for i in range(3)]
+        subset = orchestration.worker_settings(settings)
+        self.assertEqual(['LATENCY'], subset.DATA_COLLECTORS)
+        self.assertEqual('cache', subset.TOPOLOGY_CACHE_DIR)
+        self.assertNotIn('TOPOLOGY_CACHE_PATHS', subset)
+        self.assertNotIn('EXPERIMENT_QUEUE', subset)
+
+    def test_settings_path(self):
+        self.assertEqual(os.path.join(orchestration.ROOT_DIR, 'resources', 'x'),
+                         orchestration.settings_path('resources/x'))
+        self.assertTrue(os.path.isdir(orchestration.settings_path('resources')))
+        self.assertEqual('/tmp/x', orchestration.settings_path('/tmp/x'))
+
+
+class TestOrchestrator(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'results.journal')
+        self.run_scenario = orchestration.run_scenario
+        self.executed = []
+        def run_scenario(settings, params, curr_exp, n_exp):
+            self.executed.append(params['alpha'])
+            if params['alpha'] == 2 and self.failing:
+                return None
+            return (params, Tree({'x': params['alpha']}), 0.1)
+        orchestration.run_scenario = run_scenario
+        self.settings = Settings()
+        self.settings.PARALLEL_EXECUTION = False
+        self.settings.N_REPLICATIONS = 2
+        self.settings.EXPERIMENT_QUEUE = [Tree({'alpha': i}) for i in range(3)]
+
+    def tearDown(self):
+        orchestration.run_scenario = self.run_scenario
+        shutil.rmtree(self.tmp_dir)
+
+    def test_resume(self):
+        self.failing = True
+        orch = Orchestrator(self.settings, journal=ResultsJournal(self.path))
+        orch.run()
+        orch.journal.close()
+        self.assertEqual([0, 0, 1, 1, 2, 2], self.executed)
+        self.assertEqual(4, len(read_results_journal(self.path)))
+        self.failing = False
+        self.executed = []
+        journal = ResultsJournal(self.path, resume=True)
+        orch = Orchestrator(self.settings, journal=journal)
+        orch.run()
+        journal.close()
+        self.assertEqual([2, 2], self.executed)
+        self.assertEqual(6, len(orch.results))
+        self.assertEqual(6, len(read_results_journal(self.path)))
+        self.assertEqual([0, 0, 1, 1, 2, 2],
+                         sorted(params['alpha'] for params, _ in orch.results))
+
+    def test_durations_file(self):
+        self.failing = False
+        path = os.path.join(self.tmp_dir, 'durations.json')
+        self.settings.EXPERIMENT_DURATIONS_FILE = path
+        # Stopping does not write files, as it may be called by a signal handler
+        Orchestrator(self.settings).stop()
+        self.assertFalse(os.path.exists(path))
+        Orchestrator(self.settings).run()
+        self.assertTrue(os.path.isfile(path))
+
+    def test_results_cache(self):
+        self.failing = True
+        self.settings.RESULTS_CACHE_DIR = os.path.join(self.tmp_dir, 'cache')
+        Orchestrator(self.settings).run()
+        self.assertEqual([0, 0, 1, 1, 2, 2], self.executed)
+        self.failing = False
+        self.executed = []
+        self.settings.N_REPLICATIONS = 3
+        self.settings.EXPERIMENT_QUEUE.append(Tree({'alpha': 3}))
+        orch = Orchestrator(self.settings)
+        orch.run()
+        self.assertEqual([0, 1, 2, 2, 2, 3, 3, 3], self.executed)
+        self.assertEqual(12, len(orch.results))
+
+
+class TestPrecomputeArtifacts(unittest.TestCase):
+
+    def setUp(self):
+        artifacts.clear_shared_artifacts()
+        self.cache_size = artifacts.CACHE_SIZE
+
+    def tearDown(self):
+        artifacts.clear_shared_artifacts()
+        artifacts.set_shared_artifacts_cache_size(self.cache_size)
+
+    def test_precompute(self):
+        settings = Settings()
+        settings.PARALLEL_EXECUTION = False
+        settings.EXPERIMENT_QUEUE = [experiment(10, 'NRR'),
+                                     experiment(10, 'CL4M'),
+                                     experiment(10, 'LCE', 'TREE')]
+        settings.EXPERIMENT_QUEUE[0]['topology']['n'] = 4
+        settings.EXPERIMENT_QUEUE[1]['topology']['n'] = 4
+        settings.EXPERIMENT_QUEUE[2]['topology'].update({'k': 2, 'h': 2})
+        Orchestrator(settings).precompute_artifacts()
+        # Shortest paths of both topologies, path lengths and betweenness
+        # centrality of the path topology
+        self.assertEqual(4, len(artifacts._artifacts))
+        self.assertEqual(4, artifacts.CACHE_SIZE)
+
+
+class RandomWorkload(object):
+    """Workload whose requests differ at every iteration"""
+
+    def __init__(self, topology, n_contents=20, n_requests=100, **kwargs):
+        self.receivers = [v for v in topology.nodes_iter()
+                          if topology.node[v]['stack'][0] == 'receiver']
+        self.contents = range(1, n_contents + 1)
+        self.contents_range = n_contents
+        self.n_requests = n_requests
+
+    def __iter__(self):
+        for i in range(self.n_requests):
+            event = {'receiver': random.choice(self.receivers),
+                     'content': random.choice(self.contents), 'log': i % 2 == 0}
+            yield (float(i), event)
+
+
+class RequestCollector(DataCollector):
+    """Collector recording all requests"""
+
+    name = 'TEST_REQUESTS'
+
+    def __init__(self, view, **params):
+        self.view = view
+        self.requests = []
+
+    def start_session(self, timestamp, receiver, content):
+        self.requests.append((timestamp, receiver, content))
+
+    def results(self):
+        return Tree({'REQUESTS': self.requests})
+
+
+class TestScenarioGroup(unittest.TestCase):
+
+    def setUp(self):
+        WORKLOAD['TEST_RANDOM'] = RandomWorkload
+        DATA_COLLECTOR['TEST_REQUESTS'] = RequestCollector
+        self.settings = Settings()
+        self.settings.DATA_COLLECTORS = ['TEST_REQUESTS']
+        self.experiment = Tree({
+            'topology': {'name': 'TREE', 'k': 2, 'h': 3},
+            'workload': {'name': 'TEST_RANDOM'},
+            'cache_placement': {'name': 'UNIFORM', 'network_cache': 0.5},
+            'content_placement': {'name': 'UNIFORM'},
+            'strategy': {'name': 'LCE'},
+            'cache_policy': {'name': 'LRU'}})
+
+    def tearDown(self):
+        del WORKLOAD['TEST_RANDOM']
+        del DATA_COLLECTOR['TEST_REQUESTS']
+
+    def test_recorded_workload(self):
+        events = [(0.5, {'receiver': 'a', 'content': 3, 'log': False}),
+                  (1.5, {'receiver': 'b', 'content': 4, 'log': True})]
+        workload = RecordedWorkload(events)
+        self.assertEqual(2, len(workload))
+        self.assertEqual([(0.5, 'a', 3, False), (1.5, 'b', 4, True)],
+                         list(workload))
+        self.assertEqual(list(workload), list(workload))
+        workload = RecordedWorkload([(0.5, 'a', 'x', True)])
+        self.assertEqual([(0.5, 'a', 'x', True)], list(workload))
+
+    def test_fingerprint(self):
+        other = copy.deepcopy(self.experiment)
+        other['strategy']['name'] = 'LCD'
+        other['desc'] = 'LCD'
+        self.assertEqual(orchestration.scenario_fingerprint(self.experiment),
+                         orchestration.scenario_fingerprint(other))
+        other['workload']['n_requests'] = 10
+        self.assertNotEqual(orchestration.scenario_fingerprint(self.experiment),
+                            orchestration.scenario_fingerprint(other))
+
+    def test_common_requests(self):
+        other = copy.deepcopy(self.experiment)
+        other['strategy']['name'] = 'LCD'
+        invalid = copy.deepcopy(self.experiment)
+        invalid['strategy']['name'] = 'UNKNOWN'
+        results = orchestration.run_scenario_group(
+                    self.settings, [(self.experiment, 1), (invalid, 2),
+                                    (other, 3)], 3)
+        self.assertIsNone(results[1])
+        params, first, _ = results[0]
+        self.assertEqual('LCE', params['strategy']['name'])
+        params, second, _ = results[2]
+        self.assertEqual('LCD', params['strategy']['name'])
+        first = first.getval(('TEST_REQUESTS', 'REQUESTS'))
+        self.assertEqual(50, len(first))
+        self.assertEqual(first, second.getval(('TEST_REQUESTS', 'REQUESTS')))
+        # Experiments run individually are run with different requests
+        _, third, _ = orchestration.run_scenario(self.settings, other, 1, 1)
+        self.assertNotEqual(first, third.getval(('TEST_REQUESTS', 'REQUESTS')))
+
+    def test_invalid_scenario(self):
+        self.experiment['topology']['name'] = 'UNKNOWN'
+        self.assertEqual([None, None], orchestration.run_scenario_group(
+                    self.settings, [(self.experiment, 1), (self.experiment, 2)], 2))
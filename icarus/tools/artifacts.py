@@ -0,0 +1,224 @@
+"""Scenario artifacts shared across experiments.
+
+Many experiments of a simulation campaign, e.g. all replications and all
+strategies evaluated on the same topology, need the same data derived from
+the topology, like all-pair shortest paths, path lengths and betweenness
+centralities. This module computes them once per process and returns the same
+read-only instance to all experiments run on an identical topology.
+
+Artifacts are keyed by a fingerprint of the topology that captures everything
+they depend on, i.e. nodes and links, their ordering and link weights, so that
+a topology built from scratch by each experiment is matched to artifacts
+computed on an identical topology built before.
+
+If artifacts are computed in the parent process before a pool of worker
+processes is forked (see `precompute_shared_artifacts`), workers share them
+through copy-on-write memory rather than computing them again.
+
+Notes
+-----
+Artifacts returned by this module are shared and must not be modified.
+"""
+import collections
+import hashlib
+
+import networkx as nx
+
+from icarus.util import ShortestPaths
+
+__all__ = [
+    'topology_fingerprint',
+    'shared_shortest_paths',
+    'share_shortest_paths',
+    'shared_path_lengths',
+    'shared_betweenness_centrality',
+    'precompute_shared_artifacts',
+    'set_shared_artifacts_cache_size',
+    'clear_shared_artifacts',
+          ]
+
+
+# Maximum number of artifacts kept in memory by each process, unless changed
+# with set_shared_artifacts_cache_size
+CACHE_SIZE = 16
+
+# Artifacts keyed by (artifact type, topology fingerprint, arguments), in
+# least-recently used order
+_artifacts = collections.OrderedDict()
+
+
+def topology_fingerprint(topology, weight=None):
+    """Return a fingerprint of a topology
+
+    Two topologies have the same fingerprint if they have the same nodes and
+    links, added in the same order, and the same link weights.
+
+    Parameters
+    ----------
+    topology : Topology
+        The topology object
+    weight : str, optional
+        The link attribute used as link weight. If *None*, link attributes are
+        ignored
+
+    Returns
+    -------
+    fingerprint : str
+        The fingerprint of the topology
+    """
+    h = hashlib.sha1()
+    h.update(repr((topology.is_directed(), weight)).encode('utf-8'))
+    for u in topology.nodes_iter():
+        adj = topology.adj[u]
+        if weight is None:
+            neighbors = list(adj)
+        else:
+            neighbors = [(v, adj[v].get(weight, 1)) for v in adj]
+        h.update(repr((u, neighbors)).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _shared(key, compute):
+    """Return the artifact stored under a key, computing it if needed"""
+    if key in _artifacts:
+        artifact = _artifacts.pop(key)
+    else:
+        artifact = compute()
+    _artifacts[key] = artifact
+    while len(_artifacts) > CACHE_SIZE:
+        _artifacts.popitem(last=False)
+    return artifact
+
+
+def shared_shortest_paths(topology, weight='weight'):
+    """Return the all-pair shortest paths of a topology
+
+    Parameters
+    ----------
+    topology : Topology
+        The topology object
+    weight : str, optional
+        The link attribute used as link weight
+
+    Returns
+    -------
+    shortest_paths : ShortestPaths
+        The shortest paths of the topology. The instance is read-only and
+        must be copied before being updated
+    """
+    def compute():
+        shortest_paths = ShortestPaths(topology, weight=weight)
+        shortest_paths.read_only = True
+        return shortest_paths
+    key = ('shortest_paths', topology_fingerprint(topology, weight), weight)
+    return _shared(key, compute)
+
+
+def share_shortest_paths(topology, shortest_paths, weight='weight'):
+    """Share shortest paths of a topology computed elsewhere, e.g. loaded
+    from disk, so that they are returned by `shared_shortest_paths`
+
+    Parameters
+    ----------
+    topology : Topology
+        The topology object
+    shortest_paths : ShortestPaths
+        The shortest paths of the topology
+    weight : str, optional
+        The link attribute used as link weight
+    """
+    shortest_paths.read_only = True
+    key = ('shortest_paths', topology_fingerprint(topology, weight), weight)
+    _shared(key, lambda: shortest_paths)
+
+
+def shared_path_lengths(topology, weight='weight'):
+    """Return the lengths of the shortest paths between all pairs of nodes
+    of a topology
+
+    Parameters
+    ----------
+    topology : Topology
+        The topology object
+    weight : str, optional
+        The link attribute used as link weight
+
+    Returns
+    -------
+    lengths : dict of dicts
+        Path lengths keyed by origin and destination node
+    """
+    key = ('path_lengths', topology_fingerprint(topology, weight), weight)
+    return _shared(key, lambda: nx.all_pairs_dijkstra_path_length(topology,
+                                                                  weight=weight))
+
+
+def shared_betweenness_centrality(topology):
+    """Return the betweenness centrality of all nodes of a topology
+
+    Parameters
+    ----------
+    topology : Topology
+        The topology object
+
+    Returns
+    -------
+    betweenness : dict
+        Betweenness centrality keyed by node
+    """
+    key = ('betweenness_centrality', topology_fingerprint(topology), None)
+    return _shared(key, lambda: nx.betweenness_centrality(topology))
+
+
+def precompute_shared_artifacts(topology, path_lengths=(),
+                                betweenness_centrality=False):
+    """Compute the artifacts required by all experiments run on a topology
+
+    This function is meant to be called before forking worker processes so
+    that they inherit the artifacts instead of computing them.
+
+    Parameters
+    ----------
+    topology : Topology
+        The topology object
+    path_lengths : iterable of str, optional
+        The link weights for which all-pair path lengths are computed
+    betweenness_centrality : bool, optional
+        If *True*, the betweenness centrality of all nodes is computed
+
+    Returns
+    -------
+    n_artifacts : int
+        The number of artifacts computed
+    """
+    shared_shortest_paths(topology)
+    path_lengths = set(path_lengths)
+    for weight in path_lengths:
+        shared_path_lengths(topology, weight=weight)
+    if betweenness_centrality:
+        shared_betweenness_centrality(topology)
+    return 1 + len(path_lengths) + int(bool(betweenness_centrality))
+
+
+def set_shared_artifacts_cache_size(size):
+    """Set the maximum number of artifacts kept in memory by the current
+    process
+
+    Least recently used artifacts in excess are removed.
+
+    Parameters
+    ----------
+    size : int
+        The maximum number of artifacts
+    """
+    global CACHE_SIZE
+    if size < 1:
+        raise ValueError('size must be positive')
+    CACHE_SIZE = int(size)
+    while len(_artifacts) > CACHE_SIZE:
+        _artifacts.popitem(last=False)
+
+
+def clear_shared_artifacts():
+    """Remove all artifacts stored by the current process"""
+    _artifacts.clear()
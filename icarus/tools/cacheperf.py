@@ -576,20 +576,13 @@ def numeric_per_content_cache_hit_ratio(pdf, cache, warmup=None, measure=None,
     if warmup is None: warmup = 10 * len(pdf)
     if measure is None: measure = 30 * len(pdf)
     z = DiscreteDist(pdf, seed)
-    for _ in range(warmup):
-        content = z.rv()
-        if not cache.get(content):
-            cache.put(content)
-    cache_hits = np.zeros(len(pdf))
-    requests = np.zeros(len(pdf))
-    for _ in range(measure):
-        content = z.rv()
-        requests[content - 1] += 1
-        if cache.get(content):
-            cache_hits[content - 1] += 1
-        else:
-            cache.put(content)
-    hit_ratio = np.where(requests > 0, cache_hits / requests, requests)
+    contents = [z.rv() for _ in range(warmup + measure)]
+    hits = cache.replay(contents, warmup)
+    measured = np.asarray(contents[warmup:], dtype=int) - 1
+    cache_hits = np.bincount(measured, weights=hits, minlength=len(pdf))
+    requests = np.bincount(measured, minlength=len(pdf)).astype(float)
+    hit_ratio = np.where(requests > 0, cache_hits / np.maximum(requests, 1),
+                         requests)
     return hit_ratio if target is None else hit_ratio[target - 1]
 
 
@@ -621,18 +614,8 @@ def numeric_cache_hit_ratio(pdf, cache, warmup=None, measure=None, seed=None):
     if warmup is None: warmup = 10 * len(pdf)
     if measure is None: measure = 30 * len(pdf)
     z = DiscreteDist(pdf, seed)
-    for _ in range(warmup):
-        content = z.rv()
-        if not cache.get(content):
-            cache.put(content)
-    cache_hits = 0
-    for _ in range(measure):
-        content = z.rv()
-        if cache.get(content):
-            cache_hits += 1
-        else:
-            cache.put(content)
-    return cache_hits / measure
+    contents = [z.rv() for _ in range(warmup + measure)]
+    return np.count_nonzero(cache.replay(contents, warmup)) / measure
 
 
 def numeric_cache_hit_ratio_2_layers(pdf, l1_cache, l2_cache,
@@ -717,14 +700,5 @@ def trace_driven_cache_hit_ratio(workload, cache, warmup_ratio=0.25):
     if warmup_ratio < 0 or warmup_ratio > 1:
         raise ValueError("warmup_ratio must be comprised between 0 and 1")
     n = len(workload)
-    cache_hits = 0
     n_warmup = int(warmup_ratio * n)
-    n_req = 0
-    for content in workload:
-        if cache.get(content):
-            if n_req >= n_warmup:
-                cache_hits += 1
-        else:
-            cache.put(content)
-        n_req += 1
-    return cache_hits / (n - n_warmup)
+    return np.count_nonzero(cache.replay(workload, n_warmup)) / (n - n_warmup)
@@ -0,0 +1,110 @@
+import unittest
+
+import fnss
+
+from icarus.scenarios import IcnTopology
+import icarus.tools.artifacts as artifacts
+import icarus.execution.network as network
+
+
+class TestSharedArtifacts(unittest.TestCase):
+
+    @classmethod
+    def build_topology(cls, weight=1):
+        # Topology sketch
+        #
+        # 0 ---- 1 ---- 2
+        #        |      |
+        #        3 ---- 4
+        #
+        topology = IcnTopology()
+        topology.add_path([0, 1, 2, 4, 3, 1])
+        fnss.set_weights_constant(topology, weight)
+        fnss.set_delays_constant(topology, 2, 'ms')
+        fnss.add_stack(topology, 0, 'receiver', {})
+        fnss.add_stack(topology, 4, 'source', {'contents': [1, 2, 3]})
+        for v in (1, 2, 3):
+            fnss.add_stack(topology, v, 'router', {})
+        return topology
+
+    def setUp(self):
+        artifacts.clear_shared_artifacts()
+
+    def tearDown(self):
+        artifacts.clear_shared_artifacts()
+
+    def test_fingerprint(self):
+        fingerprint = artifacts.topology_fingerprint(self.build_topology())
+        self.assertEqual(fingerprint,
+                         artifacts.topology_fingerprint(self.build_topology()))
+        topology = self.build_topology()
+        topology.remove_edge(1, 3)
+        self.assertNotEqual(fingerprint, artifacts.topology_fingerprint(topology))
+
+    def test_fingerprint_weight(self):
+        fingerprint = artifacts.topology_fingerprint(self.build_topology(1), 'weight')
+        self.assertNotEqual(fingerprint,
+                            artifacts.topology_fingerprint(self.build_topology(2), 'weight'))
+        self.assertEqual(artifacts.topology_fingerprint(self.build_topology(1)),
+                         artifacts.topology_fingerprint(self.build_topology(2)))
+
+    def test_shortest_paths_shared(self):
+        shortest_paths = artifacts.shared_shortest_paths(self.build_topology())
+        self.assertTrue(shortest_paths.read_only)
+        self.assertIs(shortest_paths,
+                      artifacts.shared_shortest_paths(self.build_topology()))
+        self.assertIsNot(shortest_paths,
+                         artifacts.shared_shortest_paths(self.build_topology(2)))
+        self.assertEqual([0, 1, 2, 4], shortest_paths[0][4])
+
+    def test_path_lengths_shared(self):
+        lengths = artifacts.shared_path_lengths(self.build_topology(), weight='delay')
+        self.assertEqual(6, lengths[0][4])
+        self.assertIs(lengths, artifacts.shared_path_lengths(self.build_topology(),
+                                                             weight='delay'))
+
+    def test_betweenness_shared(self):
+        betw = artifacts.shared_betweenness_centrality(self.build_topology())
+        self.assertEqual(max(betw.values()), betw[1])
+        self.assertIs(betw, artifacts.shared_betweenness_centrality(self.build_topology()))
+
+    def test_cache_size(self):
+        for w in range(artifacts.CACHE_SIZE + 1):
+            artifacts.shared_shortest_paths(self.build_topology(w + 1))
+        self.assertEqual(artifacts.CACHE_SIZE, len(artifacts._artifacts))
+
+    def test_set_cache_size(self):
+        cache_size = artifacts.CACHE_SIZE
+        try:
+            for w in range(3):
+                artifacts.shared_shortest_paths(self.build_topology(w + 1))
+            artifacts.set_shared_artifacts_cache_size(2)
+            self.assertEqual(2, len(artifacts._artifacts))
+            self.assertRaises(ValueError,
+                              artifacts.set_shared_artifacts_cache_size, 0)
+        finally:
+            artifacts.set_shared_artifacts_cache_size(cache_size)
+
+    def test_precompute(self):
+        topology = self.build_topology()
+        self.assertEqual(3, artifacts.precompute_shared_artifacts(
+                                topology, ['delay', 'delay'], True))
+        self.assertEqual(3, len(artifacts._artifacts))
+        lengths = artifacts.shared_path_lengths(self.build_topology(), 'delay')
+        betw = artifacts.shared_betweenness_centrality(self.build_topology())
+        self.assertEqual(3, len(artifacts._artifacts))
+        self.assertEqual(6, lengths[0][4])
+        self.assertEqual(max(betw.values()), betw[1])
+
+    def test_copy_on_write(self):
+        topology = self.build_topology()
+        shortest_paths = artifacts.shared_shortest_paths(topology)
+        model = network.NetworkModel(topology, cache_policy={'name': 'LRU'},
+                                     shortest_path=shortest_paths)
+        view = network.NetworkView(model)
+        controller = network.NetworkController(model)
+        controller.remove_link(2, 4)
+        self.assertEqual([0, 1, 3, 4], view.shortest_path(0, 4))
+        self.assertEqual([0, 1, 2, 4], shortest_paths[0][4])
+        self.assertIs(shortest_paths,
+                      artifacts.shared_shortest_paths(self.build_topology()))
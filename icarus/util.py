@@ -24,7 +24,8 @@ __all__ = [
         'overlay_betweenness_centrality',
         'path_links',
         'multicast_tree',
-        'apportionment'
+        'apportionment',
+        'ShortestPaths'
            ]
 
 class Tree(collections.defaultdict):
@@ -743,3 +744,351 @@ def apportionment(n, fracs):
     for i in idx:
         ints[i] += 1
     return ints
+
+
+class ShortestPaths(object):
+    """All-pair shortest paths of a network stored as a next-hop matrix
+
+    Nodes are mapped to integer identifiers and, for each destination, the
+    shortest path tree rooted at it is stored as a row of a NumPy matrix
+    whose entry for a node is the identifier of its next hop towards the
+    destination. Paths are rebuilt from the matrix the first time they are
+    looked up and memoized afterwards, so that only the paths actually used
+    are ever stored as lists of nodes.
+
+    Paths are identical to those returned by `symmetrify_paths` of
+    `icarus.execution.network` applied to `nx.all_pairs_dijkstra_path` and
+    can be accessed in the same way, i.e. `shortest_paths[s][t]`.
+
+    Changes to the topology can be applied incrementally by notifying them
+    with `remove_edge`, `add_edge`, `remove_node` and `add_node` and then
+    calling `update`. Only the shortest path trees that may be affected by
+    the changes are recomputed and the result is the same as that of
+    computing all shortest paths from scratch on the updated topology.
+
+    Instances flagged as `read_only` are shared across experiments and
+    must be copied with `copy` before being updated.
+
+    Notes
+    -----
+    Incremental updates assume that the topology is undirected.
+    """
+
+    def __init__(self, topology, weight='weight'):
+        """Constructor
+
+        Parameters
+        ----------
+        topology : fnss.Topology
+            The topology object
+        weight : str, optional
+            The link attribute used as link weight
+        """
+        self.topology = topology
+        self.weight = weight
+        self.read_only = False
+        self._build()
+
+    def copy(self, topology=None):
+        """Return a writable copy of these shortest paths
+
+        Parameters
+        ----------
+        topology : fnss.Topology, optional
+            The topology that the copy refers to, if different from the one
+            of this instance, e.g., an identical topology built by another
+            experiment
+
+        Returns
+        -------
+        shortest_paths : ShortestPaths
+            The copy
+        """
+        shortest_paths = copy.copy(self)
+        if topology is not None:
+            shortest_paths.topology = topology
+        shortest_paths.read_only = False
+        shortest_paths.next_hop = self.next_hop.copy()
+        shortest_paths._rank = dict(self._rank)
+        shortest_paths._path = {}
+        shortest_paths._stale = set(self._stale)
+        return shortest_paths
+
+    def _build(self):
+        """Compute all shortest paths from scratch"""
+        self.nodes = list(self.topology.nodes())
+        self.node_index = {v: i for i, v in enumerate(self.nodes)}
+        # Position of each node currently in the topology in the order of
+        # topology nodes. It is used to select which of the two shortest path
+        # trees rooted at the endpoints of a path is used, as the ordering of
+        # nodes changes when nodes are removed and restored
+        self._rank = dict(self.node_index)
+        self._next_rank = len(self.nodes)
+        n = len(self.nodes)
+        dtype = np.int16 if n < 2**15 else np.int32
+        # next_hop[t, v] is the identifier of the next hop from v towards t or
+        # -1 if t cannot be reached from v
+        self.next_hop = np.empty((n, n), dtype=dtype)
+        self._path = {}
+        # Roots of the trees to recompute at the next update and flag
+        # indicating whether all paths must be recomputed from scratch
+        self._stale = set()
+        self._rebuild = False
+        for t in self.nodes:
+            self._compute_tree(t)
+
+    def _compute_tree(self, t):
+        """Compute the shortest path tree rooted at node *t*
+
+        Parameters
+        ----------
+        t : any hashable type
+            The root of the tree
+        """
+        index = self.node_index
+        row = self.next_hop[index[t]]
+        row.fill(-1)
+        paths = nx.single_source_dijkstra_path(self.topology, t, weight=self.weight)
+        for v, path in paths.items():
+            # The path from v to t is the reverse of the path from t to v
+            row[index[v]] = index[path[-2]] if len(path) > 1 else index[v]
+
+    def _edge_weight(self, u, v):
+        return self.topology.adj[u][v].get(self.weight, 1)
+
+    def _distance(self, j, i):
+        """Return the distance of node *i* from the root *j* of a shortest
+        path tree, where *i* and *j* are integer node identifiers.
+
+        Link weights are summed starting from the root, as done by Dijkstra's
+        algorithm, so that the result is exactly the same.
+        """
+        path = self._tree_path(i, j)
+        distance = 0
+        for k in range(len(path) - 1, 0, -1):
+            distance = distance + self._edge_weight(path[k], path[k - 1])
+        return distance
+
+    def _current_trees(self):
+        """Return the integer identifiers of the roots of all trees which are
+        up to date
+        """
+        stale = self._stale
+        index = self.node_index
+        return [index[t] for t in self._rank if t not in stale]
+
+    def remove_edge(self, u, v):
+        """Notify that edge *(u, v)* has been removed from the topology
+
+        Parameters
+        ----------
+        u, v : any hashable type
+            The endpoints of the removed edge
+        """
+        if self._rebuild:
+            return
+        i, j = self.node_index[u], self.node_index[v]
+        next_hop = self.next_hop
+        # Only trees including the edge are affected by its removal
+        affected = np.nonzero((next_hop[:, i] == j) | (next_hop[:, j] == i))[0]
+        self._stale.update(self.nodes[t] for t in affected)
+
+    def add_edge(self, u, v):
+        """Notify that edge *(u, v)* has been added to the topology
+
+        Parameters
+        ----------
+        u, v : any hashable type
+            The endpoints of the added edge
+        """
+        if self._rebuild:
+            return
+        if u not in self._rank or v not in self._rank:
+            self._rebuild = True
+            return
+        i, j = self.node_index[u], self.node_index[v]
+        w_uv, w_vu = self._edge_weight(u, v), self._edge_weight(v, u)
+        next_hop = self.next_hop
+        for t in self._current_trees():
+            reach_u, reach_v = next_hop[t, i] >= 0, next_hop[t, j] >= 0
+            if not reach_u and not reach_v:
+                continue
+            if reach_u and reach_v:
+                d_u, d_v = self._distance(t, i), self._distance(t, j)
+                # A tree is not affected by the new edge only if the edge does
+                # not provide a path to either endpoint as short as the current
+                if d_u + w_uv > d_v and d_v + w_vu > d_u:
+                    continue
+            self._stale.add(self.nodes[t])
+
+    def remove_node(self, v):
+        """Notify that node *v* and all its edges have been removed from the
+        topology
+
+        Parameters
+        ----------
+        v : any hashable type
+            The removed node
+        """
+        if self._rebuild:
+            return
+        del self._rank[v]
+        self._stale.discard(v)
+        i = self.node_index[v]
+        next_hop = self.next_hop
+        next_hop[i].fill(-1)
+        for t in self._current_trees():
+            if next_hop[t, i] < 0:
+                continue
+            if np.any(next_hop[t] == i):
+                self._stale.add(self.nodes[t])
+            else:
+                # Removing a leaf does not affect the rest of the tree
+                next_hop[t, i] = -1
+
+    def add_node(self, v):
+        """Notify that node *v* and all its edges have been added to the
+        topology
+
+        Parameters
+        ----------
+        v : any hashable type
+            The added node
+        """
+        if self._rebuild:
+            return
+        neighbors = list(self.topology.adj[v])
+        if v not in self.node_index or v in self._rank or \
+                any(u not in self._rank for u in neighbors):
+            self._rebuild = True
+            return
+        self._rank[v] = self._next_rank
+        self._next_rank += 1
+        i = self.node_index[v]
+        next_hop = self.next_hop
+        for t in self._current_trees():
+            candidates = [(self._distance(t, self.node_index[u]), u)
+                          for u in neighbors
+                          if next_hop[t, self.node_index[u]] >= 0]
+            if not candidates:
+                continue
+            # The new node can be attached to the tree as a leaf if it does
+            # not connect it to new nodes, it is reached through a single
+            # neighbor and does not provide a path to any of its neighbors as
+            # short as the current one
+            d_v = [d_u + self._edge_weight(u, v) for d_u, u in candidates]
+            d_min = min(d_v)
+            if len(candidates) == len(neighbors) and d_v.count(d_min) == 1 and \
+                    all(d_min + self._edge_weight(v, u) > d_u
+                        for d_u, u in candidates):
+                u = candidates[d_v.index(d_min)][1]
+                next_hop[t, i] = self.node_index[u]
+            else:
+                self._stale.add(self.nodes[t])
+        self._stale.add(v)
+
+    def update(self):
+        """Recompute the shortest paths affected by the changes notified
+        since the last update
+        """
+        if self._rebuild:
+            self._build()
+            return
+        for t in self._stale:
+            self._compute_tree(t)
+        self._stale.clear()
+        self._path.clear()
+
+    def path(self, s, t):
+        """Return the shortest path from *s* to *t*
+
+        Parameters
+        ----------
+        s : any hashable type
+            Origin node
+        t : any hashable type
+            Destination node
+
+        Returns
+        -------
+        shortest_path : list
+            List of nodes of the shortest path (origin and destination
+            included)
+
+        Raises
+        ------
+        KeyError
+            If any of the nodes is not in the network or *t* cannot be
+            reached from *s*
+        """
+        try:
+            return self._path[(s, t)]
+        except KeyError:
+            pass
+        i, j = self.node_index[s], self.node_index[t]
+        # Paths between a pair of nodes are those computed from the node that
+        # comes last in the node ordering, as done by symmetrify_paths
+        if self._rank[s] <= self._rank[t]:
+            path = self._tree_path(i, j)
+        else:
+            path = self._tree_path(j, i)
+            path.reverse()
+        self._path[(s, t)] = path
+        return path
+
+    def _tree_path(self, i, j):
+        """Return the path from node *i* to the root *j* of a shortest path
+        tree, where *i* and *j* are integer node identifiers
+        """
+        row = self.next_hop[j]
+        if row[i] < 0:
+            raise KeyError(self.nodes[j])
+        nodes = self.nodes
+        path = [nodes[i]]
+        while i != j:
+            i = int(row[i])
+            path.append(nodes[i])
+        return path
+
+    def __getitem__(self, s):
+        if s not in self._rank:
+            raise KeyError(s)
+        return _ShortestPathsFrom(self, s)
+
+    def __contains__(self, s):
+        return s in self._rank
+
+    def __iter__(self):
+        return iter(sorted(self._rank, key=self._rank.get))
+
+    def __len__(self):
+        return len(self._rank)
+
+
+class _ShortestPathsFrom(object):
+    """Shortest paths from a single origin node, backed by a `ShortestPaths`
+    instance
+    """
+
+    def __init__(self, shortest_paths, s):
+        self._shortest_paths = shortest_paths
+        self._s = s
+
+    def _destinations(self):
+        sp = self._shortest_paths
+        column = sp.next_hop[:, sp.node_index[self._s]]
+        return [sp.nodes[i] for i in np.nonzero(column >= 0)[0]]
+
+    def __getitem__(self, t):
+        return self._shortest_paths.path(self._s, t)
+
+    def __contains__(self, t):
+        sp = self._shortest_paths
+        return t in sp.node_index and \
+            sp.next_hop[sp.node_index[t], sp.node_index[self._s]] >= 0
+
+    def __iter__(self):
+        return iter(self._destinations())
+
+    def __len__(self):
+        return len(self._destinations())